@@ -0,0 +1,64 @@
+"""
+concurrency.py
+Dedicated executors for the async prediction routes.
+
+Sync route handlers (entries, triggers, medications, ...) run on anyio's shared
+threadpool. The prediction routes are async and never take a slot there:
+  - CPU work (SQLite context loads, pandas feature building, model scoring)
+    runs on a small CPU executor, so scoring bursts cannot oversubscribe cores.
+  - Blocking network calls (only when no async HTTP client is available) run
+    on a separate I/O executor, so a slow Open-Meteo only ever ties up I/O threads.
+
+Both helpers copy the caller's contextvars into the worker thread.
+"""
+
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+CPU_WORKERS = max(1, min(4, (os.cpu_count() or 2) // 2))
+IO_WORKERS = 8
+
+_lock = threading.Lock()
+_executors = {"cpu": None, "io": None}
+
+
+def _get_executor(kind: str) -> ThreadPoolExecutor:
+    with _lock:
+        executor: Optional[ThreadPoolExecutor] = _executors[kind]
+        if executor is None:
+            executor = ThreadPoolExecutor(
+                max_workers=CPU_WORKERS if kind == "cpu" else IO_WORKERS,
+                thread_name_prefix=f"prediction-{kind}"
+            )
+            _executors[kind] = executor
+        return executor
+
+
+async def _run_in(kind: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    call = functools.partial(ctx.run, func, *args, **kwargs)
+    return await loop.run_in_executor(_get_executor(kind), call)
+
+
+async def run_cpu(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Runs func on the CPU executor and awaits its result."""
+    return await _run_in("cpu", func, *args, **kwargs)
+
+
+async def run_io(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Runs a blocking I/O call on the I/O executor and awaits its result."""
+    return await _run_in("io", func, *args, **kwargs)
+
+
+def shutdown() -> None:
+    with _lock:
+        for kind, executor in _executors.items():
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+            _executors[kind] = None
@@ -6,10 +6,26 @@ try:
 except Exception:
     pass
 
-from fastapi import FastAPI
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 
-app = FastAPI(title="Migraine Navigator API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Keep tomorrow / weekly / hourly forecasts warm for the default profile
+    from forecasting import precompute
+    from api.utils import get_db_path
+    precompute.start(get_db_path())
+    yield
+    precompute.stop()
+    
+    from api import concurrency
+    from services.weather_service import close_async_client
+    concurrency.shutdown()
+    await close_async_client()
+
+app = FastAPI(title="Migraine Navigator API", lifespan=lifespan)
 
 # Add CORS middleware to allow requests from standard localhost ports
 app.add_middleware(
@@ -24,9 +40,30 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Forecast freshness metadata (stale-while-revalidate) and per-stage timings
+    expose_headers=["Age", "X-Computed-At", "X-Stale", "Server-Timing"],
 )
 
-from api.routes import entries, analysis, prediction, medications, location, user, data, triggers, training
+@app.middleware("http")
+async def server_timing(request: Request, call_next):
+    """
+    Collects the pipeline spans recorded while serving a prediction request
+    and reports them in a Server-Timing header.
+    """
+    from services import metrics
+    if not metrics.SERVER_TIMING_ENABLED or not request.url.path.startswith("/api/v1/prediction"):
+        return await call_next(request)
+    
+    token = metrics.begin_request()
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        spans = metrics.end_request(token)
+    response.headers["Server-Timing"] = metrics.server_timing_header(spans, (time.perf_counter() - start) * 1000.0)
+    return response
+
+from api.routes import entries, analysis, prediction, medications, location, user, data, triggers, training, metrics
 
 app.include_router(entries.router, prefix="/api/v1")
 app.include_router(analysis.router, prefix="/api/v1")
@@ -37,6 +74,7 @@ app.include_router(user.router, prefix="/api/v1")
 app.include_router(data.router, prefix="/api/v1")
 app.include_router(triggers.router, prefix="/api/v1")
 app.include_router(training.router, prefix="/api/v1")
+app.include_router(metrics.router, prefix="/api/v1")
 
 
 @app.get("/")
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, Union, List
+from typing import Optional, Union, List, Dict
 
 class Medication(BaseModel):
     id: Optional[int] = None
@@ -30,3 +30,24 @@ class MigraineEntry(BaseModel):
     Latitude: Optional[float] = None
     Longitude: Optional[float] = None
     Timezone: Optional[str] = ""
+
+class SimulationRange(BaseModel):
+    start: float
+    stop: float  # Inclusive
+    step: float
+
+class SimulationRequest(BaseModel):
+    date: Optional[str] = None  # Base day (YYYY-MM-DD); defaults to tomorrow
+    # Feature -> list of values or range, e.g. {"tavg": [5, 15, 25, 35], "Sleep": {"start": 1, "stop": 3, "step": 1}}
+    overrides: Dict[str, Union[List[float], SimulationRange]]
+    surface_axes: Optional[List[str]] = None  # Two swept features for the response surface
+
+class ItineraryLeg(BaseModel):
+    start_date: str  # YYYY-MM-DD
+    end_date: Optional[str] = None  # Inclusive; defaults to start_date
+    lat: float
+    lon: float
+    label: Optional[str] = None
+
+class ItineraryRequest(BaseModel):
+    legs: List[ItineraryLeg]
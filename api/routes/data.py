@@ -63,6 +63,7 @@ async def import_csv(file: UploadFile = File(...), db_path: str = Depends(get_db
 
         total_rows = pd.read_sql("SELECT COUNT(*) as c FROM migraine_log", conn)['c'][0]
         conn.close()
+        EntryService.notify_entries_changed(db_path)
 
         return {
             "status": "success",
@@ -130,6 +131,7 @@ async def import_db(file: UploadFile = File(...), db_path: str = Depends(get_db_
         conn.execute("DETACH DATABASE source_db")
         conn.close()
         os.remove(temp_path)
+        EntryService.notify_entries_changed(db_path)
 
         return {
             "status": "success",
@@ -176,6 +178,9 @@ async def import_db_separate(file: UploadFile = File(...)):
     try:
         with open(dest_path, "wb") as buffer:
             shutil.copyfileobj(file.file, buffer)
+        # A replaced database must not be served the old file's snapshot
+        from services import log_snapshot
+        log_snapshot.remove(dest_path)
 
         # Validate it's actually a SQLite DB
         try:
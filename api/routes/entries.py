@@ -99,7 +99,7 @@ def add_entry(entry: MigraineEntry, db_path: str = Depends(get_db_path_dep)): #
         EntryService.add_entry(data, db_path)
         try:
             from forecasting.inference import clear_prediction_cache
-            clear_prediction_cache()
+            clear_prediction_cache(db_path)
         except ImportError:
             pass
         return {"message": "Entry added successfully"}
@@ -112,7 +112,7 @@ def delete_entry(entry_id: int, db_path: str = Depends(get_db_path_dep)):
         EntryService.delete_entry(entry_id, db_path)
         try:
             from forecasting.inference import clear_prediction_cache
-            clear_prediction_cache()
+            clear_prediction_cache(db_path)
         except ImportError:
             pass
         return {"message": f"Entry {entry_id} deleted successfully"}
@@ -130,7 +130,7 @@ def update_entry(entry_id: int, entry: MigraineEntry, db_path: str = Depends(get
         EntryService.update_entry(entry_id, data, db_path)
         try:
             from forecasting.inference import clear_prediction_cache
-            clear_prediction_cache()
+            clear_prediction_cache(db_path)
         except ImportError:
             pass
         return {"message": "Entry updated successfully"}
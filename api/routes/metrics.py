@@ -0,0 +1,23 @@
+"""
+api/routes/metrics.py
+Per-stage latency histograms for the prediction pipeline (see services/metrics.py).
+"""
+
+from fastapi import APIRouter
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics")
+def get_metrics():
+    """
+    Latency per pipeline stage (count, mean, p50, p95, max in milliseconds)
+    plus prediction cache hit rates, since process start.
+    """
+    from services import metrics
+    from forecasting.inference import get_prediction_cache_stats
+
+    return {
+        "stages": metrics.snapshot(),
+        "prediction_cache": get_prediction_cache_stats(),
+    }
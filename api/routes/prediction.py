@@ -1,4 +1,6 @@
-from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi import APIRouter, HTTPException, Query, Depends, Response
+import asyncio
+import time
 from datetime import datetime, timedelta
 import sys
 import os
@@ -12,6 +14,9 @@ import logging
 import os
 from api.utils import get_data_dir
 from api.dependencies import get_db_path_dep
+from api.models import SimulationRequest, ItineraryRequest
+from api.concurrency import run_cpu
+from forecasting import precompute
 
 # Setup logger
 logger = logging.getLogger("prediction_route")
@@ -26,27 +31,79 @@ console_handler.setFormatter(formatter)
 logger.addHandler(console_handler)
 logger.setLevel(logging.DEBUG)
 
+def _with_freshness(response: Response, snapshot: "precompute.Snapshot", in_body: bool = False):
+    """
+    Attaches cache-age metadata. List payloads carry it in headers (Age, X-Computed-At,
+    X-Stale); object payloads also get computed_at / cache_age_seconds / stale fields.
+    """
+    computed_at = datetime.fromtimestamp(snapshot.computed_at).isoformat(timespec='seconds')
+    age = snapshot.age_seconds
+    response.headers["Age"] = str(int(age))
+    response.headers["X-Computed-At"] = computed_at
+    response.headers["X-Stale"] = "true" if snapshot.stale else "false"
+    if not in_body:
+        return snapshot.result
+    return {
+        **snapshot.result,
+        "computed_at": computed_at,
+        "cache_age_seconds": round(age, 1),
+        "stale": snapshot.stale,
+    }
+
+async def _load_context(db_path: str):
+    from forecasting.inference import get_prediction_context
+    return await run_cpu(get_prediction_context, db_path)
+
+async def _daily_prediction(date: str, db_path: str, context=None, explain: bool = False):
+    """
+    Daily prediction without blocking the event loop: cache check, async weather
+    fetch, then feature building and scoring on the CPU executor.
+    """
+    from forecasting.inference import get_cached_prediction, get_prediction_for_date
+    from services.weather_service import WeatherService
+    
+    if context is None:
+        context = await _load_context(db_path)
+    
+    cached = get_cached_prediction(date, context)
+    if cached is not None and not explain:
+        return cached
+    
+    live_weather = None
+    lat, lon = context.location
+    if lat and lon:
+        weather = await WeatherService.fetch_forecast_async(lat, lon, datetime.strptime(date, "%Y-%m-%d"))
+        live_weather = weather if weather is not None else {}
+    
+    return await run_cpu(get_prediction_for_date, date, context=context, live_weather=live_weather, explain=explain)
+
 @router.get("/future")
-def get_future_prediction(date: str = Query(None, description="Date in YYYY-MM-DD format. Defaults to tomorrow."), db_path: str = Depends(get_db_path_dep)):
+async def get_future_prediction(response: Response, date: str = Query(None, description="Date in YYYY-MM-DD format. Defaults to tomorrow."), db_path: str = Depends(get_db_path_dep)):
     """
     Get migraine risk prediction for a specific date.
     """
+    tomorrow = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
     if date is None:
-        tomorrow = datetime.now() + timedelta(days=1)
-        date = tomorrow.strftime("%Y-%m-%d")
+        date = tomorrow
     
     try:
         logger.info(f"GET /prediction/future request for {date}")
         # Validate date format
         datetime.strptime(date, "%Y-%m-%d")
         
-        logger.debug("Importing inference...")
-        from forecasting.inference import get_prediction_for_date
-        logger.debug("Calling get_prediction_for_date...")
+        # Tomorrow is precomputed in the background (possibly served stale while it refreshes)
+        if date == tomorrow:
+            precompute.track(db_path)
+            snapshot = precompute.lookup(db_path, 'future')
+            if snapshot is not None:
+                return _with_freshness(response, snapshot, in_body=True)
+            token = precompute.begin(db_path, 'future')
+            snapshot = precompute.store(token, await _daily_prediction(date, db_path))
+        else:
+            snapshot = precompute.Snapshot(await _daily_prediction(date, db_path), time.time(), False)
         
-        result = get_prediction_for_date(date, db_path=db_path)
         logger.info("Prediction successful")
-        return result
+        return _with_freshness(response, snapshot, in_body=True)
     except ValueError:
         logger.warning(f"Invalid date format: {date}")
         raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD.")
@@ -56,39 +113,160 @@ def get_future_prediction(date: str = Query(None, description="Date in YYYY-MM-D
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/forecast")
-def get_weekly_forecast(db_path: str = Depends(get_db_path_dep)):
+async def get_weekly_forecast(response: Response, explain: bool = Query(False, description="Attach per-day TreeSHAP explanations (ML days only)."), db_path: str = Depends(get_db_path_dep)):
     """
     Get migraine risk prediction for the next 7 days (Starting Tomorrow).
     """
     try:
-        start_date = datetime.now() + timedelta(days=1)
-        forecasts = []
+        precompute.track(db_path)
+        token = None
+        if not explain:
+            snapshot = precompute.lookup(db_path, 'forecast')
+            if snapshot is not None:
+                return _with_freshness(response, snapshot)
+            token = precompute.begin(db_path, 'forecast')
         
-        # 1. Use Recursive Forecasting Logic to ensure future lags are populated
         from forecasting.inference import get_weekly_forecast
+        from services.weather_service import WeatherService
+        
+        start_date = datetime.now() + timedelta(days=1)
+        context = await _load_context(db_path)
+        
+        # One async fetch for the whole week, then a single batched scoring pass
+        weather_map = {}
+        lat, lon = context.location
+        if lat and lon:
+            weather_map = await WeatherService.fetch_weekly_async(start_date, lat, lon)
         
-        forecasts = get_weekly_forecast(start_date, db_path=db_path)
-            
-        return forecasts
+        forecasts = await run_cpu(get_weekly_forecast, start_date, context=context, weather_map=weather_map, explain=explain)
+        if token is not None:
+            return _with_freshness(response, precompute.store(token, forecasts))
+        return _with_freshness(response, precompute.Snapshot(forecasts, time.time(), False))
     except Exception as e:
         logger.error(f"Forecast Error: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/explain")
+async def explain_prediction(response: Response, date: str = Query(None, description="Date in YYYY-MM-DD format. Defaults to tomorrow."), db_path: str = Depends(get_db_path_dep)):
+    """
+    Daily prediction with a TreeSHAP risk decomposition (Issue #62).
+    'explanation.contributions' are log-odds shifts from 'explanation.base_value', largest first.
+    Heuristic predictions keep their 'components' breakdown instead.
+    """
+    if date is None:
+        date = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
+    try:
+        datetime.strptime(date, "%Y-%m-%d")
+        result = await _daily_prediction(date, db_path, explain=True)
+        return _with_freshness(response, precompute.Snapshot(result, time.time(), False), in_body=True)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD.")
+    except Exception as e:
+        logger.error(f"Explain Error: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/simulate")
+async def simulate_prediction(request: SimulationRequest, db_path: str = Depends(get_db_path_dep)):
+    """
+    What-if simulation (Issue #63): scores every combination of the override values
+    on top of the real feature row for the base date, in batched NumPy passes.
+    """
+    date = request.date or (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
+    try:
+        datetime.strptime(date, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD.")
+    
+    try:
+        from forecasting.simulator import run_simulation, ModelUnavailableError
+        from services.weather_service import WeatherService
+        
+        context = await _load_context(db_path)
+        live_weather = None
+        lat, lon = context.location
+        if lat and lon:
+            weather = await WeatherService.fetch_forecast_async(lat, lon, datetime.strptime(date, "%Y-%m-%d"))
+            live_weather = weather if weather is not None else {}
+        
+        return await run_cpu(
+            run_simulation, date, request.overrides, request.surface_axes,
+            context=context, live_weather=live_weather
+        )
+    except ModelUnavailableError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Simulation Error: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/itinerary")
+async def forecast_itinerary(request: ItineraryRequest, db_path: str = Depends(get_db_path_dep)):
+    """
+    Travel risk forecast (Issue #51) for an itinerary of (date range, lat, lon) legs.
+    Legs sharing a ~0.1° grid cell share one weather fetch; all fetches run
+    concurrently and every (leg, day) is scored in one batch.
+    """
+    from forecasting import travel
+    from services.weather_service import WeatherService
+    
+    try:
+        legs = travel.parse_itinerary(request.legs)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        context = await _load_context(db_path)
+        plan = travel.plan_fetches(legs)
+        weather_maps = await asyncio.gather(
+            *(WeatherService.fetch_range_async(start, end, lat, lon) for (lat, lon), (start, end) in plan.items())
+        )
+        weather_by_cell = dict(zip(plan, weather_maps))
+        return await run_cpu(travel.forecast_itinerary, legs, context, weather_by_cell)
+    except Exception as e:
+        logger.error(f"Itinerary Forecast Error: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/hourly")
-def get_hourly_prediction(date: str = Query(None, description="Start date/time in YYYY-MM-DD HH:MM format (optional)"), hours: int = 24, db_path: str = Depends(get_db_path_dep)):
+async def get_hourly_prediction(response: Response, date: str = Query(None, description="Start date/time in YYYY-MM-DD HH:MM format (optional)"), hours: int = 24, db_path: str = Depends(get_db_path_dep)):
     """
     Get hourly risk forecast for the next 24 (or N) hours.
     """
     try:
+        # If date is not provided, use current time (the precomputed product)
+        token = None
+        if not date:
+            precompute.track(db_path)
+            snapshot = precompute.lookup(db_path, 'hourly')
+            if snapshot is not None:
+                return _with_freshness(response, snapshot)
+            token = precompute.begin(db_path, 'hourly')
+            date = datetime.now().strftime("%Y-%m-%d %H:%M")
+        
         from forecasting.inference import get_hourly_forecast
+        from services.weather_service import WeatherService
+        
+        start_dt = datetime.fromisoformat(date)
+        context = await _load_context(db_path)
+        lat, lon = context.location
+        if not lat: lat, lon = 34.05, -118.25 # Default LA
         
-        # If date is not provided, use current time
-        # The underlying function handles None/empty string by using now()
+        hourly_weather = await WeatherService.fetch_hourly_async(start_dt, lat, lon, hours=24)
         
-        forecast = get_hourly_forecast(date, db_path=db_path)
-        return forecast
+        # Warm the daily anchors used for calibration so scoring never hits the network
+        day_keys = sorted({h['time'].split('T')[0] for h in hourly_weather})
+        await asyncio.gather(
+            *(_daily_prediction(d, db_path, context) for d in day_keys),
+            return_exceptions=True
+        )
         
+        forecast = await run_cpu(get_hourly_forecast, date, context=context, hourly_weather=hourly_weather)
+        if token is not None:
+            return _with_freshness(response, precompute.store(token, forecast))
+        return _with_freshness(response, precompute.Snapshot(forecast, time.time(), False))
+        
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD HH:MM.")
     except Exception as e:
         logger.error(f"Hourly Forecast Error: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
-
@@ -24,7 +24,7 @@ def training_status(db_path: str = Depends(get_db_path_dep)):
     )
 
     entries_since = get_entries_since_last_training(db_path)
-    last_trained = get_last_trained_date()
+    last_trained = get_last_trained_date(db_path)
 
     return {
         "needs_retraining": entries_since >= RETRAIN_THRESHOLD,
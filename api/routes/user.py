@@ -93,7 +93,7 @@ async def update_user_priors(priors: UserPriors, db_path: str = Depends(get_db_p
         # Invalidate prediction cache if we update settings
         try:
              from forecasting.inference import clear_prediction_cache
-             clear_prediction_cache()
+             clear_prediction_cache(db_path)
         except ImportError:
              pass # Might happen if module not loaded yet
              
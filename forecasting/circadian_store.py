@@ -0,0 +1,273 @@
+"""
+circadian_store.py
+Persisted 24-bin histogram of migraine onset hours, maintained incrementally.
+
+`circadian_daily` holds the onsets (entries with pain > 0 and a parseable
+Time) per (Date, hour); `circadian_histogram` holds their weighted sum per
+hour. Adding, editing or deleting an entry recounts only the touched days and
+applies the difference to the 24 bins. Bulk changes, and a mismatched entry
+count (e.g. after an external write), rebuild both on the next read.
+
+With a half-life, an onset on day D weighs 2 ** ((D - anchor) / half_life):
+recent onsets weigh more. The prior is normalised by its peak, so the common
+factor that would age every onset to "today" cancels and the stored weights
+never need rewriting. The anchor moves (one rebuild) before weights overflow.
+
+The smoothed prior (FeatureEngine.smooth_circadian_priors) is kept in memory
+per database and re-read only after the file changed, so the hourly forecast
+does no history scan.
+
+Public API:
+  get_priors(db_path, half_life_days=HALF_LIFE_DAYS) -> [24 floats] or None
+  apply_entry_change(db_path, dates=None)
+  rebuild(conn, half_life_days=HALF_LIFE_DAYS)
+  invalidate(db_path)
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    from forecasting.feature_engine import FeatureEngine
+except ImportError:
+    # Running as a script from forecasting/
+    from feature_engine import FeatureEngine
+
+logger = logging.getLogger(__name__)
+
+TABLE = 'circadian_histogram'
+DAILY_TABLE = 'circadian_daily'
+META_TABLE = 'circadian_meta'
+# Default decay: None weighs every onset equally
+HALF_LIFE_DAYS: Optional[float] = None
+# Re-anchor before 2 ** exponent gets anywhere near float overflow
+MAX_EXPONENT = 512.0
+
+_memory: Dict[str, Tuple[Tuple[int, int], Optional[float], List[float]]] = {}
+_memory_lock = threading.Lock()
+
+
+def _table_exists(conn, name: str) -> bool:
+    row = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).fetchone()
+    return row is not None
+
+
+def _read_meta(conn) -> Dict[str, str]:
+    if not _table_exists(conn, META_TABLE):
+        return {}
+    return dict(conn.execute(f"SELECT key, value FROM {META_TABLE}").fetchall())
+
+
+def _write_meta(conn, **values) -> None:
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {META_TABLE} (key TEXT PRIMARY KEY, value TEXT)")
+    conn.executemany(
+        f"INSERT OR REPLACE INTO {META_TABLE} (key, value) VALUES (?, ?)",
+        [(k, str(v)) for k, v in values.items()]
+    )
+
+
+def _entry_count(conn) -> int:
+    return conn.execute("SELECT COUNT(*) FROM migraine_log").fetchone()[0]
+
+
+def _half_life_key(half_life_days: Optional[float]) -> str:
+    return '' if half_life_days is None else repr(float(half_life_days))
+
+
+def _onset_hour(pain, time_str) -> Optional[int]:
+    """Hour of an onset, or None if the entry is pain-free or its Time does not parse."""
+    try:
+        if pain is None or float(pain) <= 0:
+            return None
+        hour = int(str(time_str).split(':')[0])
+    except (TypeError, ValueError):
+        return None
+    return hour if 0 <= hour < 24 else None
+
+
+def _day_number(date_str: str) -> Optional[int]:
+    try:
+        return datetime.strptime(str(date_str)[:10], '%Y-%m-%d').date().toordinal()
+    except ValueError:
+        return None
+
+
+def _weight(day: Optional[int], anchor: int, half_life_days: Optional[float]) -> float:
+    if half_life_days is None or day is None:
+        return 1.0
+    return 2.0 ** ((day - anchor) / half_life_days)
+
+
+def _count_days(conn, dates: Optional[List[str]] = None) -> Dict[Tuple[str, int], int]:
+    """
+    Onsets per (Date, hour) in migraine_log, for all days or only `dates`. Rows
+    are streamed from the cursor: memory grows with days, not entries.
+    """
+    if dates is None:
+        rows = conn.execute('SELECT Date, Time, "Pain Level" FROM migraine_log')
+    else:
+        placeholders = ', '.join('?' for _ in dates)
+        rows = conn.execute(
+            f'SELECT Date, Time, "Pain Level" FROM migraine_log WHERE Date IN ({placeholders})', dates
+        )
+    counts: Dict[Tuple[str, int], int] = {}
+    for date_str, time_str, pain in rows:
+        hour = _onset_hour(pain, time_str)
+        if hour is not None:
+            key = (str(date_str)[:10], hour)
+            counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+def rebuild(conn, half_life_days: Optional[float] = HALF_LIFE_DAYS) -> None:
+    """Recounts every onset in migraine_log."""
+    counts = _count_days(conn)
+    days = [d for d in (_day_number(date_str) for date_str, _ in counts) if d is not None]
+    anchor = max(days) if days else date.today().toordinal()
+
+    bins = [0.0] * 24
+    for (date_str, hour), n in counts.items():
+        bins[hour] += n * _weight(_day_number(date_str), anchor, half_life_days)
+
+    conn.execute(f"DROP TABLE IF EXISTS {DAILY_TABLE}")
+    conn.execute(f"CREATE TABLE {DAILY_TABLE} (Date TEXT, hour INTEGER, onsets INTEGER, PRIMARY KEY (Date, hour))")
+    conn.executemany(
+        f"INSERT INTO {DAILY_TABLE} (Date, hour, onsets) VALUES (?, ?, ?)",
+        [(d, h, n) for (d, h), n in counts.items()]
+    )
+    conn.execute(f"DROP TABLE IF EXISTS {TABLE}")
+    conn.execute(f"CREATE TABLE {TABLE} (hour INTEGER PRIMARY KEY, weight REAL)")
+    conn.executemany(f"INSERT INTO {TABLE} (hour, weight) VALUES (?, ?)", list(enumerate(bins)))
+    _write_meta(conn, entry_count=_entry_count(conn), half_life=_half_life_key(half_life_days), anchor=anchor)
+    logger.info(f"Rebuilt {TABLE}: {sum(counts.values())} onsets.")
+
+
+def _is_current(conn, half_life_days: Optional[float]) -> bool:
+    meta = _read_meta(conn)
+    return (
+        _table_exists(conn, TABLE)
+        and meta.get('entry_count') == str(_entry_count(conn))
+        and meta.get('half_life') == _half_life_key(half_life_days)
+    )
+
+
+def _apply(conn, dates: List[str]) -> None:
+    if not dates:
+        _write_meta(conn, entry_count=_entry_count(conn))
+        return
+    meta = _read_meta(conn)
+    half_life = float(meta['half_life']) if meta.get('half_life') else None
+    anchor = int(meta['anchor'])
+
+    old = {(d, h): n for d, h, n in conn.execute(
+        f"SELECT Date, hour, onsets FROM {DAILY_TABLE} WHERE Date IN ({', '.join('?' for _ in dates)})", dates
+    )}
+    new = _count_days(conn, dates)
+    if half_life is not None:
+        days = [d for d in (_day_number(date_str) for date_str, _ in new) if d is not None]
+        if days and (max(days) - anchor) / half_life > MAX_EXPONENT:
+            rebuild(conn, half_life)
+            return
+
+    deltas = [0.0] * 24
+    for key in set(old) | set(new):
+        change = new.get(key, 0) - old.get(key, 0)
+        if change:
+            deltas[key[1]] += change * _weight(_day_number(key[0]), anchor, half_life)
+    conn.executemany(f"DELETE FROM {DAILY_TABLE} WHERE Date = ?", [(d,) for d in dates])
+    conn.executemany(
+        f"INSERT INTO {DAILY_TABLE} (Date, hour, onsets) VALUES (?, ?, ?)",
+        [(d, h, n) for (d, h), n in new.items()]
+    )
+    conn.executemany(
+        f"UPDATE {TABLE} SET weight = MAX(weight + ?, 0.0) WHERE hour = ?",
+        [(delta, hour) for hour, delta in enumerate(deltas) if delta]
+    )
+    _write_meta(conn, entry_count=_entry_count(conn))
+
+
+def _file_version(db_path: str) -> Tuple[int, int]:
+    try:
+        stat = os.stat(db_path)
+        return stat.st_mtime_ns, stat.st_size
+    except OSError:
+        return 0, 0
+
+
+def _remember(db_path: str, half_life_days: Optional[float], bins: List[float]) -> List[float]:
+    priors = FeatureEngine.smooth_circadian_priors(bins)
+    with _memory_lock:
+        _memory[db_path] = (_file_version(db_path), half_life_days, priors)
+    return priors
+
+
+def get_priors(db_path: str, half_life_days: Optional[float] = HALF_LIFE_DAYS) -> Optional[List[float]]:
+    """
+    The smoothed 24h onset prior for a database, from memory unless the file
+    changed since it was read. None if the database has no migraine log.
+    """
+    with _memory_lock:
+        cached = _memory.get(db_path)
+    if cached is not None and cached[0] == _file_version(db_path) and cached[1] == half_life_days:
+        return cached[2]
+    if not os.path.exists(db_path):
+        return None
+
+    conn = sqlite3.connect(db_path)
+    try:
+        if not _table_exists(conn, 'migraine_log'):
+            return None
+        if not _is_current(conn, half_life_days):
+            with conn:
+                rebuild(conn, half_life_days)
+        bins = [w for _, w in conn.execute(f"SELECT hour, weight FROM {TABLE} ORDER BY hour")]
+    finally:
+        conn.close()
+    return _remember(db_path, half_life_days, bins)
+
+
+def apply_entry_change(db_path: str, dates: Optional[Iterable[str]] = None) -> None:
+    """
+    Updates the histogram after entries on `dates` (YYYY-MM-DD) were added, edited
+    or deleted. dates=None (bulk changes) rebuilds. Does nothing if it was never built.
+    """
+    clear_memory(db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        if not _table_exists(conn, TABLE) or not _table_exists(conn, 'migraine_log'):
+            return
+        with conn:
+            if dates is None:
+                meta = _read_meta(conn)
+                rebuild(conn, float(meta['half_life']) if meta.get('half_life') else None)
+            else:
+                _apply(conn, sorted({str(d)[:10] for d in dates if d}))
+    except Exception as e:
+        logger.warning(f"Incremental {TABLE} update failed ({e}); it will be rebuilt on next use.")
+        invalidate(db_path)
+    finally:
+        conn.close()
+
+
+def invalidate(db_path: str) -> None:
+    """Drops the histogram; the next read rebuilds it."""
+    clear_memory(db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        with conn:
+            conn.execute(f"DROP TABLE IF EXISTS {TABLE}")
+    finally:
+        conn.close()
+
+
+def clear_memory(db_path: Optional[str] = None) -> None:
+    """Forgets the in-memory prior of one database, or of all of them."""
+    with _memory_lock:
+        if db_path is None:
+            _memory.clear()
+        else:
+            _memory.pop(db_path, None)
@@ -1,5 +1,6 @@
 import os
 import sqlite3
+import threading
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
@@ -8,23 +9,37 @@ if TYPE_CHECKING:
 
 # Define paths
 from api.utils import get_data_dir
+from forecasting import feature_spec
+from forecasting.feature_spec import PAIN_LAG_COLUMNS
 
 # Define paths
 data_dir = get_data_dir()
 weather_data_filename = os.path.join(data_dir, 'weather_data.csv')
 migraine_data_filename = os.path.join(data_dir, 'migraine_log.csv')
+# Debug export only: training builds the combined timeline in memory
 combined_data_filename = os.path.join(data_dir, 'combined_data.csv')
+# Optional binary cache of the combined timeline (load_combined_data)
+combined_cache_dir = os.path.join(data_dir, 'cache')
+COMBINED_CACHE_VERSION = 1
 
-def load_migraine_log_from_db(db_path=None):
+# Latest location per database: {db_path: ((mtime_ns, size), (lat, lon))}
+_location_cache = {}
+_location_lock = threading.Lock()
+
+def load_migraine_log_from_db(db_path=None, conn=None):
     """
     Loads migraine log data from the SQLite database into a pandas DataFrame.
+    An open connection can be passed to share one round trip with other reads.
+    Holds every row and column in memory: for large logs use iter_migraine_log.
     """
     import pandas as pd
     from api.utils import get_db_path
     if db_path is None:
         db_path = get_db_path()
         
-    conn = sqlite3.connect(db_path)
+    owns_conn = conn is None
+    if owns_conn:
+        conn = sqlite3.connect(db_path)
     # c = conn.cursor() # Not needed for pandas read_sql
     query = "SELECT * FROM migraine_log"
     try:
@@ -38,24 +53,162 @@ def load_migraine_log_from_db(db_path=None):
             'Location', 'Timezone', 'Latitude', 'Longitude'
         ])
     finally:
-        conn.close()
+        if owns_conn:
+            conn.close()
     return df
 
-def merge_migraine_and_weather_data(migraine_log_file=migraine_data_filename, weather_data_file=weather_data_filename, output_file=combined_data_filename, db_path=None, return_df=False):
+# Rows per chunk when streaming migraine_log (iter_migraine_log)
+LOG_CHUNK_SIZE = 5000
+
+# Daily aggregates of migraine_log used for training (see daily_log_rows)
+DAILY_LOG_COLUMNS = ('Pain Level', 'Sleep', 'Physical Activity', 'id', 'Latitude', 'Longitude')
+
+def _sql_number(column):
+    """SQL for pd.to_numeric(errors='coerce'): numbers and numeric text, else NULL."""
+    return (
+        f"CASE WHEN typeof({column}) IN ('integer', 'real') THEN {column} "
+        f"WHEN typeof({column}) = 'text' AND trim({column}) GLOB '*[0-9]*' "
+        f"AND trim({column}) NOT GLOB '*[^0-9.eE+-]*' THEN CAST(trim({column}) AS REAL) END"
+    )
+
+_DAILY_LOG_QUERY = f"""
+    WITH days AS (
+        SELECT Date, MIN(id) AS id,
+               MAX({_sql_number('"Pain Level"')}) AS pain,
+               AVG({_sql_number('Sleep')}) AS sleep,
+               AVG({_sql_number('"Physical Activity"')}) AS activity,
+               MIN(CASE WHEN typeof(Latitude) IN ('integer', 'real') THEN id END) AS lat_id,
+               MIN(CASE WHEN typeof(Longitude) IN ('integer', 'real') THEN id END) AS lon_id
+        FROM migraine_log
+        WHERE date(Date) IS NOT NULL {{dates}}
+        GROUP BY Date
+    )
+    SELECT days.Date, days.pain, days.sleep, days.activity, days.id, lat.Latitude, lon.Longitude
+    FROM days
+    LEFT JOIN migraine_log AS lat ON lat.id = days.lat_id
+    LEFT JOIN migraine_log AS lon ON lon.id = days.lon_id
+    ORDER BY days.Date
+"""
+
+def iter_migraine_log(db_path=None, conn=None, columns=None, chunk_size=None):
     """
-    Merges migraine and weather data, ensuring a continuous daily timeline.
-    Crucially, it treats missing days in the migraine log as 'No Pain'.
-    Note: Reads from SQLite DB by default now, though allows file override if needed (but we ignore csv arg mostly).
+    Streams migraine_log in (Date, id) order as DataFrames of at most chunk_size
+    (default LOG_CHUNK_SIZE) rows via cursor.fetchmany, so memory is bounded by
+    the chunk, not the log.
+    `columns` limits the columns read (default: all). Yields nothing if there
+    is no migraine log.
+    """
+    import pandas as pd
+    from api.utils import get_db_path
+    if db_path is None and conn is None:
+        db_path = get_db_path()
+
+    selected = ', '.join('"' + c.replace('"', '""') + '"' for c in columns) if columns else '*'
+    owns_conn = conn is None
+    if owns_conn:
+        conn = sqlite3.connect(db_path)
+    try:
+        try:
+            cursor = conn.execute(f"SELECT {selected} FROM migraine_log ORDER BY Date, id")
+        except sqlite3.OperationalError:
+            # Table might not exist yet (Clean install or fresh reset)
+            return
+        names = [d[0] for d in cursor.description]
+        while True:
+            rows = cursor.fetchmany(chunk_size or LOG_CHUNK_SIZE)
+            if not rows:
+                break
+            yield pd.DataFrame.from_records(rows, columns=names)
+    finally:
+        if owns_conn:
+            conn.close()
+
+def daily_log_rows(conn, dates=None):
+    """
+    (Date, *DAILY_LOG_COLUMNS) per logged day, aggregated in one SQL GROUP BY:
+    max pain, mean Sleep / Physical Activity (non-numeric values ignored), and
+    the first id and numeric Latitude / Longitude of the day. Text columns are
+    never read. `dates` (YYYY-MM-DD) limits it to those days.
+    """
+    if dates is None:
+        return conn.execute(_DAILY_LOG_QUERY.format(dates='')).fetchall()
+    dates = list(dates)
+    if not dates:
+        return []
+    placeholders = ', '.join('?' for _ in dates)
+    return conn.execute(_DAILY_LOG_QUERY.format(dates=f'AND Date IN ({placeholders})'), dates).fetchall()
+
+def load_daily_log(db_path=None, conn=None):
+    """
+    The daily_log_rows of a database as a DataFrame (Date, *DAILY_LOG_COLUMNS),
+    ready for combine_daily. Empty if there is no migraine log.
+    """
+    import pandas as pd
+    from api.utils import get_db_path
+    if db_path is None and conn is None:
+        db_path = get_db_path()
+
+    owns_conn = conn is None
+    if owns_conn:
+        conn = sqlite3.connect(db_path)
+    try:
+        rows = daily_log_rows(conn)
+    except sqlite3.OperationalError:
+        # Table might not exist yet (Clean install or fresh reset)
+        rows = []
+    finally:
+        if owns_conn:
+            conn.close()
+
+    df = pd.DataFrame(rows, columns=['Date', *DAILY_LOG_COLUMNS])
+    df['Date'] = pd.to_datetime(df['Date'])
+    for column in DAILY_LOG_COLUMNS:
+        df[column] = pd.to_numeric(df[column], errors='coerce')
+    return df
+
+def load_weather_data(weather_data_file=weather_data_filename):
+    """
+    Loads the daily weather history CSV, or an empty frame if there is none.
     """
-    # Load from DB instead of CSV
     import pandas as pd
-    migraine_data = load_migraine_log_from_db(db_path)
     if os.path.exists(weather_data_file):
-        weather_data = pd.read_csv(weather_data_file)
-    else:
-        # Fallback if no weather data in test env
-        weather_data = pd.DataFrame({'date': [], 'tavg': []}) 
-        
+        return pd.read_csv(weather_data_file)
+    # Fallback if no weather data in test env
+    return pd.DataFrame({'date': [], 'tavg': []})
+
+def update_weather_history(lat, lon, start_date, end_date, weather_data_file=weather_data_filename):
+    """
+    Fetches observed weather for start_date..end_date from the Open-Meteo archive
+    and merges it into the weather history CSV (fetched dates replace existing rows).
+    Features come from the same hourly pipeline as forecasts (services.weather_features).
+    Returns the number of days fetched.
+    """
+    import pandas as pd
+    from services.weather_service import WeatherService
+
+    fetched = WeatherService.fetch_archive(start_date, end_date, lat, lon)
+    if not fetched:
+        return 0
+    new_rows = pd.DataFrame.from_dict(fetched, orient='index').drop(columns=['id', 'Latitude', 'Longitude'], errors='ignore')
+    new_rows.insert(0, 'date', new_rows.index)
+
+    existing = load_weather_data(weather_data_file)
+    if not existing.empty:
+        existing = existing[~existing['date'].astype(str).str[:10].isin(new_rows['date'])]
+        new_rows = pd.concat([existing, new_rows], ignore_index=True)
+    new_rows = new_rows.sort_values('date').reset_index(drop=True)
+    new_rows.to_csv(weather_data_file, index=False)
+    return len(fetched)
+
+def combine_daily(migraine_data, weather_data):
+    """
+    One row per calendar day from the first to the last logged (or weather) day.
+    Missing days in the migraine log are treated as 'No Pain'.
+    """
+    import pandas as pd
+    migraine_data = migraine_data.copy()
+    weather_data = weather_data.copy()
+
     # Standardize dates
     migraine_data['Date'] = pd.to_datetime(migraine_data['Date'])
     weather_data['date'] = pd.to_datetime(weather_data['date'])
@@ -63,12 +216,8 @@ def merge_migraine_and_weather_data(migraine_log_file=migraine_data_filename, we
     # create a full date range from the start of data to today (or max date)
     min_date = min(migraine_data['Date'].min(), weather_data['date'].min())
     max_date = max(migraine_data['Date'].max(), weather_data['date'].max())
-    full_date_range = pd.date_range(start=min_date, end=max_date, freq='D')
-    
-    # Create the template dataframe
-    full_df = pd.DataFrame({'Date': full_date_range})
+    full_date_range = pd.date_range(start=min_date, end=max_date, freq='D', name='Date')
     
-    # Merge migraine data onto the full timeline
     # Aggregation Strategy: Max for Pain, Mean for Sleep/Activity
     migraine_data['Pain Level'] = pd.to_numeric(migraine_data['Pain Level'], errors='coerce')
     migraine_data['Sleep'] = pd.to_numeric(migraine_data['Sleep'], errors='coerce')
@@ -85,9 +234,14 @@ def merge_migraine_and_weather_data(migraine_log_file=migraine_data_filename, we
         if col not in agg_dict and col != 'Date':
             agg_dict[col] = 'first'
 
-    migraine_data = migraine_data.groupby('Date', as_index=False).agg(agg_dict)
+    if migraine_data['Date'].is_unique:
+        # Already one row per day (load_daily_log)
+        migraine_data = migraine_data[['Date', *agg_dict]]
+    else:
+        migraine_data = migraine_data.groupby('Date', as_index=False).agg(agg_dict)
     
-    combined = pd.merge(full_df, migraine_data, on='Date', how='left')
+    # Place the logged days onto the full timeline
+    combined = migraine_data.set_index('Date').reindex(full_date_range).reset_index()
     
     # Fill missing Pain Level with 0 (Assumption: Missing Log = No Pain)
     combined['Pain Level'] = combined['Pain Level'].fillna(0)
@@ -95,14 +249,102 @@ def merge_migraine_and_weather_data(migraine_log_file=migraine_data_filename, we
     # Merge weather data
     combined = pd.merge(combined, weather_data, left_on='Date', right_on='date', how='left')
     
-    # Drop redundancy and save
+    # Drop redundancy
     if 'date' in combined.columns:
         combined.drop(columns=['date'], inplace=True)
-        
-    combined.to_csv(output_file, index=False)
-    
-    if return_df:
-        return combined
+    return combined
+
+def _combined_cache_key(version, weather_data_file):
+    """Hash of what the daily timeline is built from: the log's write version and the weather file."""
+    import hashlib
+    digest = hashlib.blake2b(f"combined-v{COMBINED_CACHE_VERSION}:{version[0]}:{version[1]}".encode(), digest_size=16)
+    if os.path.exists(weather_data_file):
+        with open(weather_data_file, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+def _read_combined_cache(path):
+    import numpy as np
+    import pandas as pd
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            names = list(data['names'])
+            return pd.DataFrame({name: data[f'c{i}'] for i, name in enumerate(names)})
+    except (OSError, ValueError, KeyError):
+        return None
+
+def _write_combined_cache(combined, path):
+    """Saves the frame as .npz (numeric and datetime columns only); False if it has other columns."""
+    import numpy as np
+    import pandas as pd
+    columns = {}
+    for i, name in enumerate(combined.columns):
+        values = combined[name].to_numpy()
+        if not (pd.api.types.is_numeric_dtype(values.dtype) or pd.api.types.is_datetime64_dtype(values.dtype)):
+            return False
+        columns[f'c{i}'] = values
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, names=np.array(combined.columns, dtype=str), **columns)
+    os.replace(tmp_path, path)
+    # One cached timeline per database
+    prefix = os.path.basename(path).rsplit('_', 1)[0] + '_'
+    for filename in os.listdir(directory):
+        if filename.startswith(prefix) and filename.endswith('.npz') and filename != os.path.basename(path):
+            try:
+                os.remove(os.path.join(directory, filename))
+            except OSError:
+                pass
+    return True
+
+def load_combined_data(db_path=None, weather_data_file=weather_data_filename, cache_dir=None):
+    """
+    The continuous daily timeline (combine_daily of the daily log rows and the
+    weather history), built in memory. With cache_dir, it is also kept there as
+    .npz, keyed by a hash of the log's write version (services.log_snapshot)
+    and the weather file, and read back while they are unchanged.
+    """
+    from api.utils import get_db_path
+    from services import log_snapshot
+    if db_path is None:
+        db_path = get_db_path()
+
+    cache_path = None
+    if cache_dir:
+        conn = sqlite3.connect(db_path)
+        try:
+            version = log_snapshot.write_version(conn)
+        finally:
+            conn.close()
+        if version is not None:
+            name = os.path.splitext(os.path.basename(db_path))[0]
+            cache_path = os.path.join(cache_dir, f"combined_{name}_{_combined_cache_key(version, weather_data_file)}.npz")
+        if cache_path and os.path.exists(cache_path):
+            cached = _read_combined_cache(cache_path)
+            if cached is not None:
+                return cached
+
+    combined = combine_daily(load_daily_log(db_path), load_weather_data(weather_data_file))
+    if cache_path:
+        try:
+            _write_combined_cache(combined, cache_path)
+        except OSError as e:
+            print(f"Warning: Could not cache the combined data: {e}")
+    return combined
+
+def merge_migraine_and_weather_data(migraine_log_file=migraine_data_filename, weather_data_file=weather_data_filename, output_file=None, db_path=None, return_df=False):
+    """
+    Merges migraine and weather data, ensuring a continuous daily timeline.
+    Crucially, it treats missing days in the migraine log as 'No Pain'.
+    Note: Reads from SQLite DB (migraine_log_file is ignored) and stays in memory;
+    pass output_file (e.g. combined_data_filename) to export the timeline as CSV for debugging.
+    """
+    combined = load_combined_data(db_path, weather_data_file)
+    if output_file:
+        combined.to_csv(output_file, index=False)
     return combined
 
 def convert_time_to_minutes(time_str):
@@ -115,17 +357,21 @@ def convert_time_to_minutes(time_str):
     except:
         return 0
 
-def process_combined_data(combined_data_filename=combined_data_filename, input_df=None):
+def process_combined_data(combined_data_filename=None, input_df=None, lags_precomputed=False):
     """
     Loads combined data, performs feature engineering including lags and rolling means.
-    Can accept a direct DataFrame for testing/pipeline integration without reading from CSV.
+    Works on input_df if given, else on a CSV export (combined_data_filename), else
+    builds the timeline in memory (load_combined_data).
+    lags_precomputed: input_df already holds PAIN_LAG_COLUMNS (e.g. from the daily feature store).
     """
     import pandas as pd
     import numpy as np
     if input_df is not None:
         df = input_df.copy()
-    else:
+    elif combined_data_filename:
         df = pd.read_csv(combined_data_filename)
+    else:
+        df = load_combined_data()
         
     if 'Date' in df.columns and not pd.api.types.is_datetime64_any_dtype(df['Date']):
         df['Date'] = pd.to_datetime(df['Date'])
@@ -135,51 +381,18 @@ def process_combined_data(combined_data_filename=combined_data_filename, input_d
 
     # --- Feature Engineering ---
 
-    # 1. Temporal Features
-    df['DayOfWeek'] = df['Date'].dt.dayofweek
-    df['Month'] = df['Date'].dt.month
-    
-    # Cyclical encoding for Time (DayOfWeek, Month)
-    df['DayOfWeek_sin'] = np.sin(2 * np.pi * df['DayOfWeek'] / 7)
-    df['DayOfWeek_cos'] = np.cos(2 * np.pi * df['DayOfWeek'] / 7)
-    df['Month_sin'] = np.sin(2 * np.pi * df['Month'] / 12)
-    df['Month_cos'] = np.cos(2 * np.pi * df['Month'] / 12)
-
-    # 2. Weather Features
     # Handle missing weather data (forward fill, then backward fill)
-    weather_cols = ['tavg', 'tmin', 'tmax', 'prcp', 'snow', 'wdir', 'wspd', 'wpgt', 'pres', 'tsun']
+    weather_cols = ['tavg', 'tmin', 'tmax', 'prcp', 'snow', 'wdir', 'wspd', 'wpgt', 'pres', 'tsun',
+                    'pres_drop_6h', 'pres_crash', 'temp_hourly_std', 'max_dew_point', 'max_wet_bulb',
+                    'temp_hourly_skew', 'temp_hourly_kurtosis', 'pres_hourly_skew']
     for col in weather_cols:
         if col in df.columns:
             df[col] = df[col].ffill().bfill() # Fill gaps
 
-    if 'tmax' in df.columns and 'tmin' in df.columns:
-        df['tdiff'] = df['tmax'] - df['tmin']
-        df['tavg'] = (df['tmax'] + df['tmin']) / 2
-    
-    # Weather Interaction
-    if 'average_humidity' in df.columns and 'tavg' in df.columns:
-        df['humid.*tavg'] = df['average_humidity'].fillna(0) * df['tavg']
-
-    # 3. Autoregressive Features (Lags)
-    df['Pain_Lag_1'] = df['Pain Level'].shift(1)
-    df['Pain_Lag_2'] = df['Pain Level'].shift(2)
-    df['Pain_Lag_3'] = df['Pain Level'].shift(3)
-    df['Pain_Lag_7'] = df['Pain Level'].shift(7) # Weekly pattern check
-
-    # Rolling stats
-    df['Pain_Rolling_Mean_3'] = df['Pain Level'].shift(1).rolling(window=3).mean()
-    df['Pain_Rolling_Mean_7'] = df['Pain Level'].shift(1).rolling(window=7).mean()
-    df['Pain_Rolling_Mean_30'] = df['Pain Level'].shift(1).rolling(window=30).mean()
-    
-    # Lagged Weather (Weather often triggers migraines with a delay)
-    if 'pres' in df.columns:
-        df['pres_change'] = df['pres'].diff()
-        df['pres_change_lag1'] = df['pres_change'].shift(1)
-    
-    if 'tavg' in df.columns:
-        df['tavg_lag1'] = df['tavg'].shift(1)
+    # Temporal, weather and autoregressive features: see feature_spec (shared with inference)
+    df = feature_spec.add_training_features(df, precomputed=PAIN_LAG_COLUMNS if lags_precomputed else ())
 
-    # 4. Target Transformations
+    # Target Transformations
     df['Pain_Level_Binary'] = (df['Pain Level'] > 0).astype(int)
     # Log transform for regression stability, but handle 0s
     df['Pain_Level_Log'] = np.log1p(df['Pain Level'])
@@ -189,47 +402,101 @@ def process_combined_data(combined_data_filename=combined_data_filename, input_d
 
     return df
 
-def get_recent_history(db_path=None, days=60):
+def get_recent_history(db_path=None, days=60, conn=None, end_date=None):
     """
-    Fetches the last N days of data from the DB to calculate lags.
+    Daily history for the last N calendar days up to and including end_date
+    (default: today), to calculate lags: one row per logged day with its max
+    'Pain Level' and the 'Time' of its first onset. Later entries are left out,
+    so a historical window never sees pain logged after it.
+    
+    The window and the per-day aggregation run in SQLite over the (Date, Time) index
+    (EntryService.ensure_indexes), so the cost depends on the window, not on
+    the size of the log.
     """
     import pandas as pd
+    from datetime import date, timedelta
+    from api.utils import get_db_path
+    if db_path is None:
+        db_path = get_db_path()
     
-    df = load_migraine_log_from_db(db_path)
-    # if df.empty: return df  <-- Removed to ensure column types are cast correctly below
-    
-    # Ensure Date is datetime (works even on empty)
-    if 'Date' in df.columns:
-        df['Date'] = pd.to_datetime(df['Date'])
+    end = end_date or date.today()
+    start = end - timedelta(days=days)
+    query = (
+        'SELECT Date, MAX(CAST("Pain Level" AS REAL)) AS "Pain Level", '
+        'MIN(CASE WHEN CAST("Pain Level" AS REAL) > 0 THEN Time END) AS Time '
+        'FROM migraine_log WHERE Date >= ? AND Date < ? GROUP BY Date ORDER BY Date'
+    )
+    owns_conn = conn is None
+    if owns_conn:
+        conn = sqlite3.connect(db_path)
+    try:
+        params = (start.strftime('%Y-%m-%d'), (end + timedelta(days=1)).strftime('%Y-%m-%d'))
+        df = pd.read_sql_query(query, conn, params=params)
+    except Exception:
+        # Table might not exist yet (Clean install or fresh reset)
+        df = pd.DataFrame(columns=['Date', 'Pain Level', 'Time'])
+    finally:
+        if owns_conn:
+            conn.close()
     
-    # Ensure numeric types
-    for col in ['Pain Level', 'Sleep', 'Physical Activity']:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-
-    # Sort and take recent
-    df = df.sort_values('Date').tail(days).reset_index(drop=True)
+    # Ensure types (works even on empty)
+    df['Date'] = pd.to_datetime(df['Date'])
+    df['Pain Level'] = pd.to_numeric(df['Pain Level'], errors='coerce')
     return df
 
-def get_latest_location_from_db(db_path=None):
+def _file_version(db_path):
+    try:
+        st = os.stat(db_path)
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+def get_latest_location_from_db(db_path=None, conn=None):
     """
     Fetches the most recent location (Lat/Lon) from the DB.
+    
+    One row is read, newest Date/Time first over the (Date, Time) index, skipping
+    entries without numeric coordinates. The result is kept per database until
+    the file changes or clear_location_cache() is called on a write.
     """
-    import pandas as pd
     import logging
+    from api.utils import get_db_path
     logger = logging.getLogger("data_loader")
+    if db_path is None:
+        db_path = get_db_path()
     
+    version = _file_version(db_path)
+    with _location_lock:
+        cached = _location_cache.get(db_path)
+    if cached is not None and version is not None and cached[0] == version:
+        return cached[1]
+    
+    query = (
+        'SELECT Latitude, Longitude FROM migraine_log '
+        "WHERE typeof(Latitude) IN ('real', 'integer') AND typeof(Longitude) IN ('real', 'integer') "
+        'ORDER BY Date DESC, Time DESC LIMIT 1'
+    )
+    owns_conn = conn is None
     try:
-        df = load_migraine_log_from_db(db_path)
-        # Drop rows with missing location
-        df = df.dropna(subset=['Latitude', 'Longitude'])
-        if df.empty:
-            return None, None
-        
-        # Sort by Date descending
-        df['Date'] = pd.to_datetime(df['Date'])
-        latest = df.sort_values('Date', ascending=False).iloc[0]
-        return latest['Latitude'], latest['Longitude']
+        if owns_conn:
+            conn = sqlite3.connect(db_path)
+        row = conn.execute(query).fetchone()
     except Exception as e:
         logger.error(f"Error fetching location: {e}")
-        return None, None
\ No newline at end of file
+        return None, None
+    finally:
+        if owns_conn and conn is not None:
+            conn.close()
+    
+    location = (float(row[0]), float(row[1])) if row else (None, None)
+    with _location_lock:
+        _location_cache[db_path] = (version, location)
+    return location
+
+def clear_location_cache(db_path=None):
+    """Forgets the latest location of one database, or of all of them."""
+    with _location_lock:
+        if db_path is None:
+            _location_cache.clear()
+        else:
+            _location_cache.pop(db_path, None)
\ No newline at end of file
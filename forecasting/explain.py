@@ -0,0 +1,198 @@
+"""
+explain.py — Issue #62
+Exact path-dependent TreeSHAP for the compiled classifier (see inference.CompiledEnsemble).
+
+For every leaf the root-to-leaf path is reduced, once per model, to its unique
+features. For feature j the path stores the cover fraction z_j (share of
+training rows that would reach the leaf if j were unknown) and the interval
+(lo, hi] plus missing-value direction a row must satisfy to follow the path.
+A row's one-fraction o_j is 1 if it satisfies that interval, else 0.
+
+The leaf's value function is the product over its unique features of
+(z_j + o_j * t), where t marks "feature known". The Shapley value of feature i is
+
+    v_leaf * (o_i - z_i) * sum_k W[d, k] * coef_k( prod_{j != i} (z_j + o_j t) ),
+    W[d, k] = k! (d - k - 1)! / d!
+
+with d the number of unique features on the path. This matches Lundberg's
+path-dependent algorithm and is evaluated for all rows x leaves at once.
+Values are in the model's raw (log-odds) units; base_value + sum(phi) equals
+the raw prediction for every row.
+"""
+
+import math
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from forecasting.prediction_cache import PredictionCache
+
+SHAP_CACHE_MAX_ENTRIES = 512
+SHAP_CACHE_TTL_SECONDS = 24 * 3600
+# One set of tables per loaded model (profile), least recently used dropped first
+MAX_TABLES = 4
+
+_shap_cache = PredictionCache(max_entries=SHAP_CACHE_MAX_ENTRIES, ttl_seconds=SHAP_CACHE_TTL_SECONDS)
+_tables_lock = threading.Lock()
+_tables: "OrderedDict[Any, TreeShapTables]" = OrderedDict()
+
+
+class TreeShapTables:
+    """
+    Per-leaf unique-feature path tables for a compiled ensemble, padded to the
+    deepest path. Padding slots are neutral factors (z=1, o=0) and masked out.
+    """
+
+    def __init__(self, ensemble):
+        import numpy as np
+
+        leaf_paths = []  # (tree root, leaf node, {feature: [z, lo, hi, nan_ok]})
+        for root in ensemble.roots:
+            root = int(root)
+            stack = [(root, {})]
+            while stack:
+                node, path = stack.pop()
+                if ensemble.is_leaf[node]:
+                    leaf_paths.append((root, node, path))
+                    continue
+                feature = int(ensemble.feature[node])
+                threshold = float(ensemble.threshold[node])
+                parent_count = float(ensemble.count[node])
+                for child, went_left in ((int(ensemble.left[node]), True), (int(ensemble.right[node]), False)):
+                    z, lo, hi, nan_ok = path.get(feature, (1.0, -np.inf, np.inf, True))
+                    child_path = dict(path)
+                    child_path[feature] = (
+                        z * float(ensemble.count[child]) / parent_count,
+                        lo if went_left else max(lo, threshold),
+                        min(hi, threshold) if went_left else hi,
+                        nan_ok and bool(ensemble.missing_left[node]) == went_left,
+                    )
+                    stack.append((child, child_path))
+
+        n_leaves = len(leaf_paths)
+        depth = max([len(path) for _, _, path in leaf_paths] + [1])
+
+        self.n_features = len(ensemble.feature_names_in_)
+        self.feature_names = list(ensemble.feature_names_in_)
+        self.feature = np.zeros((n_leaves, depth), dtype=np.int64)
+        self.z = np.ones((n_leaves, depth))
+        self.lo = np.full((n_leaves, depth), -np.inf)
+        self.hi = np.full((n_leaves, depth), np.inf)
+        self.nan_ok = np.ones((n_leaves, depth), dtype=bool)
+        self.valid = np.zeros((n_leaves, depth), dtype=bool)
+        self.value = np.empty(n_leaves)
+        self.n_unique = np.empty(n_leaves, dtype=np.int64)
+
+        base = float(ensemble.baseline)
+        for leaf_idx, (root, node, path) in enumerate(leaf_paths):
+            self.value[leaf_idx] = ensemble.value[node]
+            self.n_unique[leaf_idx] = len(path)
+            base += float(ensemble.value[node]) * float(ensemble.count[node]) / float(ensemble.count[root])
+            for slot, (feature, (z, lo, hi, nan_ok)) in enumerate(sorted(path.items())):
+                self.feature[leaf_idx, slot] = feature
+                self.z[leaf_idx, slot] = z
+                self.lo[leaf_idx, slot] = lo
+                self.hi[leaf_idx, slot] = hi
+                self.nan_ok[leaf_idx, slot] = nan_ok
+                self.valid[leaf_idx, slot] = True
+        self.base_value = base
+
+        # Shapley weights per leaf: W[l, k] = k! (d_l - k - 1)! / d_l!
+        weights = np.zeros((depth + 1, depth))
+        for d in range(1, depth + 1):
+            for k in range(d):
+                weights[d, k] = math.factorial(k) * math.factorial(d - k - 1) / math.factorial(d)
+        self.weights = weights[self.n_unique]
+
+    def shap_values(self, X):
+        """
+        (N x F) SHAP values in raw model units for an (N x F) float matrix.
+        """
+        import numpy as np
+
+        X = np.asarray(X, dtype=np.float64).reshape(-1, self.n_features)
+        n_rows = X.shape[0]
+        depth = self.feature.shape[1]
+
+        values = X[:, self.feature]  # (N, L, D)
+        one = np.where(np.isnan(values), self.nan_ok, (values > self.lo) & (values <= self.hi))
+        one = np.where(self.valid, one, False).astype(np.float64)
+        zero = np.broadcast_to(self.z, one.shape)
+
+        phi = np.zeros(n_rows * self.n_features)
+        row_offsets = (np.arange(n_rows) * self.n_features)[:, np.newaxis]
+        for i in range(depth):
+            # Coefficients of prod_{j != i} (z_j + o_j t), lowest degree first
+            coef = np.zeros(one.shape[:2] + (depth,))
+            coef[..., 0] = 1.0
+            for j in range(depth):
+                if j == i:
+                    continue
+                shifted = coef[..., :-1] * one[..., j, np.newaxis]
+                coef *= zero[..., j, np.newaxis]
+                coef[..., 1:] += shifted
+            weighted = (coef * self.weights).sum(axis=-1)
+            contrib = self.value * (one[..., i] - zero[..., i]) * weighted
+            contrib = np.where(self.valid[:, i], contrib, 0.0)
+            index = row_offsets + self.feature[:, i]
+            phi += np.bincount(index.ravel(), weights=contrib.ravel(), minlength=phi.size)
+        return phi.reshape(n_rows, self.n_features)
+
+
+def get_tables(ensemble, model_version: Optional[str] = None) -> TreeShapTables:
+    """
+    Path tables for an ensemble, built once per model version (or per object if unversioned).
+    """
+    key = model_version if model_version is not None else id(ensemble)
+    with _tables_lock:
+        tables = _tables.get(key)
+        if tables is not None:
+            _tables.move_to_end(key)
+    if tables is None:
+        tables = TreeShapTables(ensemble)
+        with _tables_lock:
+            _tables[key] = tables
+            while len(_tables) > MAX_TABLES:
+                _tables.popitem(last=False)
+    return tables
+
+
+def _row_key(model_version, row) -> tuple:
+    import numpy as np
+    # NaN payloads differ bitwise; canonicalise before hashing
+    row = np.where(np.isnan(row), np.nan, row)
+    return (model_version, hash(row.tobytes()))
+
+
+def explain_rows(ensemble, X, model_version: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Explanations for an (N x F) matrix in the ensemble's feature order. Rows already
+    explained for this model version come from cache; the rest are computed in one pass.
+    """
+    import numpy as np
+
+    X = np.asarray(X, dtype=np.float64).reshape(-1, len(ensemble.feature_names_in_))
+    keys = [_row_key(model_version, row) for row in X]
+    results: List[Optional[Dict[str, Any]]] = [_shap_cache.get(k) for k in keys]
+
+    missing = [i for i, r in enumerate(results) if r is None]
+    if missing:
+        tables = get_tables(ensemble, model_version)
+        phi = tables.shap_values(X[missing])
+        for row_idx, row_phi in zip(missing, phi):
+            order = np.argsort(-np.abs(row_phi), kind='stable')
+            explanation = {
+                "method": "tree_shap",
+                "units": "log_odds",
+                "base_value": round(tables.base_value, 4),
+                "contributions": {tables.feature_names[j]: round(float(row_phi[j]), 4) for j in order},
+            }
+            _shap_cache.set(keys[row_idx], explanation)
+            results[row_idx] = explanation
+    return results
+
+
+def clear_cache() -> None:
+    _shap_cache.clear()
+    with _tables_lock:
+        _tables.clear()
@@ -1,9 +1,25 @@
+from collections import OrderedDict
 from datetime import timedelta
 from typing import Dict, Any, Tuple, Optional, List
 import logging
+import threading
+
+try:
+    from forecasting import feature_spec
+except ImportError:
+    # Running as a script from forecasting/
+    import feature_spec
+
+try:
+    from services.metrics import timed
+except ImportError:
+    # Running as a script from forecasting/: no instrumentation
+    def timed(name):
+        return lambda func: func
 
 logger = logging.getLogger("feature_engine")
 
+
 class FeatureEngine:
     @staticmethod
     def get_pain_lag(target_date, pain_map, days_ago):
@@ -20,8 +36,12 @@ class FeatureEngine:
         
         Returns (selected_cols, dropped_cols) as lists of column names.
         Skips filtering entirely if fewer than 30 rows (unreliable correlations).
+        
+        Correlations are pairwise-complete, as DataFrame.corr(). Their sums are cached
+        per column set and extended when X starts with rows seen before, so the
+        expanding-window CV folds and the final fit only add their new rows.
         """
-        import pandas as pd
+        import numpy as np
 
         MIN_ROWS = 30
 
@@ -33,36 +53,13 @@ class FeatureEngine:
         if numeric_X.empty:
             return list(X.columns), []
 
-        corr_matrix = numeric_X.corr(method='pearson').abs()
-
-        # Collect correlated pairs from upper triangle
-        pairs = []
-        cols = corr_matrix.columns
-        for i in range(len(cols)):
-            for j in range(i + 1, len(cols)):
-                val = corr_matrix.iloc[i, j]
-                if pd.isna(val) or val <= threshold:
-                    continue
-                pairs.append((cols[i], cols[j], val))
-
-        # Sort for deterministic iteration order
-        pairs.sort(key=lambda x: (x[0], x[1]))
-
-        to_drop = set()
-        for col_a, col_b, val in pairs:
-            if col_a in to_drop or col_b in to_drop:
-                continue
-
-            nans_a = numeric_X[col_a].isna().sum()
-            nans_b = numeric_X[col_b].isna().sum()
-
-            if nans_a > nans_b:
-                to_drop.add(col_a)
-            elif nans_b > nans_a:
-                to_drop.add(col_b)
-            else:
-                # Alphabetical tie-break: drop the one that sorts last
-                to_drop.add(max(col_a, col_b))
+        cols = list(numeric_X.columns)
+        stats = _correlation_stats(cols, numeric_X.to_numpy(dtype=np.float64, na_value=np.nan))
+        result = stats.results.get(threshold)
+        if result is None:
+            result = _drop_correlated(cols, stats, threshold)
+            stats.results[threshold] = result
+        to_drop = set(result)
 
         dropped = sorted(to_drop)
         selected = [c for c in X.columns if c not in to_drop]
@@ -73,62 +70,58 @@ class FeatureEngine:
         return selected, dropped
 
     @staticmethod
-    def construct_features(target_date, history_df, weather_data: Optional[Dict[str, Any]] = None) -> Tuple[Any, Dict[str, Any]]:
+    def construct_features(target_date, history_df, weather_data: Optional[Dict[str, Any]] = None,
+                           pain_map: Optional[Dict[Any, float]] = None,
+                           feature_names: Optional[List[str]] = None) -> Tuple[Any, Dict[str, Any]]:
         """
         Builds a single-row DataFrame of features for the target_date.
-        Uses history_df to calculate lags.
+        Uses pain_map (date -> daily max pain, e.g. from the feature store) to calculate
+        lags, or history_df if none is given. See construct_features_batch.
+        """
+        X, rows = FeatureEngine.construct_features_batch(
+            [target_date], history_df, [weather_data], pain_map=pain_map, feature_names=feature_names
+        )
+        return X, rows[0]
+
+    @staticmethod
+    @timed("features.construct")
+    def construct_features_batch(target_dates, history_df, weather_data: Optional[List[Optional[Dict[str, Any]]]] = None,
+                                 pain_map: Optional[Dict[Any, float]] = None,
+                                 feature_names: Optional[List[str]] = None) -> Tuple[Any, List[Dict[str, Any]]]:
+        """
+        Builds an N-row DataFrame of features for N target dates, plus the per-row
+        feature dicts (each date's weather dict, annotated in place with 'source',
+        updated with the features). weather_data holds one weather dict (or None) per date.
+        
+        Features are evaluated from feature_spec, the same definitions training uses,
+        over a dense daily timeline covering every target's lookback. With
+        feature_names (a model's feature_names_in_), only those features and their
+        inputs are computed. Weather features a row has no weather for are left out
+        of its dict (NaN in the DataFrame).
         
         LAZY LOADING: Imports pandas/numpy internally to avoid blocking app startup.
         """
         import pandas as pd
-        import numpy as np
-        
-        features = {}
-        
-        # 1. Temporal Features (Cyclical Encoding)
-        features['DayOfWeek'] = target_date.dayofweek
-        features['Month'] = target_date.month
-        features['DayOfWeek_sin'] = np.sin(2 * np.pi * features['DayOfWeek'] / 7)
-        features['DayOfWeek_cos'] = np.cos(2 * np.pi * features['DayOfWeek'] / 7)
-        features['Month_sin'] = np.sin(2 * np.pi * features['Month'] / 12)
-        features['Month_cos'] = np.cos(2 * np.pi * features['Month'] / 12)
-        
-        # 2. Weather Integration
-        weather = weather_data if weather_data else {}
-        if 'source' not in weather:
-             # If caller passed None/empty, we assume it's missing or handled upstream
-             # But for feature construction we just set defaults if missing
-             weather['source'] = 'unknown'
-
-        features.update(weather)
-        
-        # Derived Weather
-        features['tdiff'] = features.get('tmax', 25) - features.get('tmin', 15)
-        features['humid.*tavg'] = features.get('average_humidity', 50) * features.get('tavg', 20)
-        features['pres_change_lag1'] = 0.0 
-        features['tavg_lag1'] = features.get('tavg', 20)
         
-        # 3. Autoregressive (Lags)
-        pain_map = dict(zip(history_df['Date'].dt.date, history_df['Pain Level']))
+        dates = pd.DatetimeIndex(pd.to_datetime(list(target_dates)))
+        if weather_data is None:
+            weather_data = [None] * len(dates)
         
-        features['Pain_Lag_1'] = FeatureEngine.get_pain_lag(target_date, pain_map, 1)
-        features['Pain_Lag_2'] = FeatureEngine.get_pain_lag(target_date, pain_map, 2)
-        features['Pain_Lag_3'] = FeatureEngine.get_pain_lag(target_date, pain_map, 3)
-        features['Pain_Lag_7'] = FeatureEngine.get_pain_lag(target_date, pain_map, 7)
+        weathers = []
+        for weather in weather_data:
+            weather = weather if weather else {}
+            if 'source' not in weather:
+                 # If caller passed None/empty, we assume it's missing or handled upstream
+                 # But for feature construction we just set defaults if missing
+                 weather['source'] = 'unknown'
+            weathers.append(weather)
         
-        last_30_vals = []
-        for i in range(1, 31):
-            last_30_vals.append(FeatureEngine.get_pain_lag(target_date, pain_map, i))
+        if pain_map is None:
+            pain_map = dict(zip(history_df['Date'].dt.date, history_df['Pain Level']))
         
-        features['Pain_Rolling_Mean_3'] = np.mean(last_30_vals[:3])
-        features['Pain_Rolling_Mean_7'] = np.mean(last_30_vals[:7])
-        features['Pain_Rolling_Mean_30'] = np.mean(last_30_vals)
-        
-        # Defaults
-        features['Sleep'] = 2.0 
-        features['Physical Activity'] = 1.5 
-        
-        return pd.DataFrame([features]), features
+        features = feature_spec.compile_features(feature_names)
+        rows = feature_spec.inference_rows(dates.values, weathers, pain_map, features)
+        return pd.DataFrame(rows), rows
 
     @staticmethod
     def get_circadian_priors(df) -> List[float]:
@@ -157,16 +150,23 @@ class FeatureEngine:
         if not valid_hours:
             return [0.1] * 24
             
-        counts = np.bincount(valid_hours, minlength=24)
-        total = len(valid_hours)
+        return FeatureEngine.smooth_circadian_priors(np.bincount(valid_hours, minlength=24))
+
+    @staticmethod
+    def smooth_circadian_priors(counts) -> List[float]:
+        """
+        24h risk distribution from (possibly weighted) onset counts per hour:
+        neighbouring hours blended 0.2 / 0.6 / 0.2, peak scaled to 0.8.
+        """
+        import numpy as np
+        
+        counts = np.asarray(counts, dtype=np.float64)
+        total = counts.sum()
+        if total <= 0:
+            return [0.1] * 24
         probs = counts / total
         
-        smoothed_probs = np.zeros(24)
-        for i in range(24):
-            prev_i = (i - 1) % 24
-            next_i = (i + 1) % 24
-            p = (probs[prev_i]*0.2) + (probs[i]*0.6) + (probs[next_i]*0.2)
-            smoothed_probs[i] = p
+        smoothed_probs = np.roll(probs, 1) * 0.2 + probs * 0.6 + np.roll(probs, -1) * 0.2
             
         max_p = np.max(smoothed_probs)
         if max_p > 0:
@@ -175,3 +175,134 @@ class FeatureEngine:
             smoothed_probs = np.full(24, 0.1)
             
         return smoothed_probs.tolist()
+
+
+# --- Correlation-based feature selection ---
+# Pairwise-complete sums over rows 0..n_rows-1 of a column set, kept for a few
+# prefixes per column set (expanding-window CV folds share their first rows).
+_CORRELATION_CACHE_SIZE = 4
+_correlation_cache: "OrderedDict[Tuple[str, ...], List[_CorrelationStats]]" = OrderedDict()
+_correlation_lock = threading.Lock()
+
+
+class _CorrelationStats:
+    """
+    Sums for pairwise-complete Pearson correlation: with V the validity mask and
+    Z the (shifted, NaN -> 0) values, count = V'V, sum_x = Z'V, sum_xx = (Z*Z)'V,
+    sum_xy = Z'Z. All are additive over rows. Columns are shifted by their first
+    value to keep the one-pass formula numerically stable.
+    """
+
+    def __init__(self, shift, n_cols):
+        import numpy as np
+        self.shift = shift
+        self.n_rows = 0
+        self.digest = None
+        self.count = np.zeros((n_cols, n_cols))
+        self.sum_x = np.zeros((n_cols, n_cols))
+        self.sum_xx = np.zeros((n_cols, n_cols))
+        self.sum_xy = np.zeros((n_cols, n_cols))
+        self.results: Dict[float, List[str]] = {}
+
+    def extended(self, values, digest):
+        """A copy covering values (whose first n_rows rows are the ones already summed)."""
+        import numpy as np
+        new = _CorrelationStats(self.shift, len(self.shift))
+        valid = ~np.isnan(values[self.n_rows:])
+        z = np.where(valid, values[self.n_rows:] - self.shift, 0.0)
+        v = valid.astype(np.float64)
+        new.count = self.count + v.T @ v
+        new.sum_x = self.sum_x + z.T @ v
+        new.sum_xx = self.sum_xx + (z * z).T @ v
+        new.sum_xy = self.sum_xy + z.T @ z
+        new.n_rows = len(values)
+        new.digest = digest
+        return new
+
+    def nan_counts(self):
+        import numpy as np
+        return self.n_rows - np.diag(self.count)
+
+    def abs_corr(self):
+        """|Pearson r| per column pair; NaN where undefined (constant or < 2 shared rows)."""
+        import numpy as np
+        n = self.count
+        cov = n * self.sum_xy - self.sum_x * self.sum_x.T
+        var_x = n * self.sum_xx - self.sum_x ** 2
+        var_y = var_x.T
+        # Treat variances lost in rounding as zero (DataFrame.corr gives NaN)
+        tiny = 1e-12 * n * np.maximum(self.sum_xx, self.sum_xx.T)
+        defined = (n >= 2) & (var_x > tiny) & (var_y > tiny)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = np.abs(cov) / np.sqrt(var_x * var_y)
+        return np.where(defined, np.minimum(corr, 1.0), np.nan)
+
+
+def _rows_digest(values) -> bytes:
+    import hashlib
+    import numpy as np
+    return hashlib.blake2b(np.ascontiguousarray(values).tobytes(), digest_size=16).digest()
+
+
+def _correlation_stats(cols: List[str], values) -> _CorrelationStats:
+    """
+    Correlation sums for values (rows x cols), extending the longest cached
+    prefix of the same columns with identical rows.
+    """
+    import numpy as np
+
+    key = tuple(cols)
+    digest = _rows_digest(values)
+    with _correlation_lock:
+        entries = list(_correlation_cache.get(key, []))
+
+    base = None
+    for entry in sorted(entries, key=lambda e: -e.n_rows):
+        if entry.n_rows == len(values) and entry.digest == digest:
+            return entry
+        if entry.n_rows < len(values) and _rows_digest(values[:entry.n_rows]) == entry.digest:
+            base = entry
+            break
+    if base is None:
+        finite = ~np.isnan(values)
+        first = np.where(finite.any(axis=0), values[finite.argmax(axis=0), np.arange(len(cols))], 0.0)
+        base = _CorrelationStats(first, len(cols))
+
+    stats = base.extended(values, digest)
+    with _correlation_lock:
+        entries = [e for e in _correlation_cache.pop(key, []) if e.digest != digest] + [stats]
+        _correlation_cache[key] = entries[-_CORRELATION_CACHE_SIZE:]
+        while len(_correlation_cache) > _CORRELATION_CACHE_SIZE:
+            _correlation_cache.popitem(last=False)
+    return stats
+
+
+def _drop_correlated(cols: List[str], stats: _CorrelationStats, threshold: float) -> List[str]:
+    """Columns to drop: one per pair above threshold (more NaNs, then alphabetically last)."""
+    import numpy as np
+
+    # NaN compares False: undefined correlations never pair up
+    with np.errstate(invalid='ignore'):
+        above = np.triu(stats.abs_corr() > threshold, k=1)
+    rows, columns = np.nonzero(above)
+    # Sort for deterministic iteration order
+    pairs = sorted((cols[i], cols[j], i, j) for i, j in zip(rows, columns))
+    nans = stats.nan_counts()
+
+    to_drop = set()
+    for col_a, col_b, i, j in pairs:
+        if col_a in to_drop or col_b in to_drop:
+            continue
+        if nans[i] > nans[j]:
+            to_drop.add(col_a)
+        elif nans[j] > nans[i]:
+            to_drop.add(col_b)
+        else:
+            # Alphabetical tie-break: drop the one that sorts last
+            to_drop.add(max(col_a, col_b))
+    return sorted(to_drop)
+
+
+def clear_correlation_cache() -> None:
+    with _correlation_lock:
+        _correlation_cache.clear()
@@ -0,0 +1,302 @@
+"""
+feature_spec.py
+The model's features, defined once and compiled for training and for inference.
+
+Every Feature is a vectorised expression over a *daily timeline*: arrays with
+one element per consecutive calendar day, holding the day's 'Date', its
+'Pain Level' (daily max, 0 without entries), the raw weather columns and the
+logged Sleep / Physical Activity / location.
+
+  Training  (add_training_features)  evaluates the spec over the full history.
+  Inference (inference_rows)         evaluates it over the lookback days plus
+                                     the target days, one timeline per location.
+
+So lags, rolling means and day-to-day weather changes mean the same thing in
+both paths. What inference cannot know is declared per feature as `fallback`
+and applied only at inference where the expression has no value: a target
+day's own log values (Sleep, Physical Activity) and the weather of the day
+before the first target day.
+
+compile_features(names) returns the features needed for a model's
+feature_names_in_ (plus their inputs), so features the correlation filter
+dropped are never computed at inference.
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+# Autoregressive pain features
+LAG_DAYS = (1, 2, 3, 7)
+ROLLING_WINDOWS = (3, 7, 30)
+MAX_LOOKBACK_DAYS = max(LAG_DAYS + ROLLING_WINDOWS)
+PAIN_LAG_COLUMNS = [f'Pain_Lag_{k}' for k in LAG_DAYS] + [f'Pain_Rolling_Mean_{n}' for n in ROLLING_WINDOWS]
+
+# Inputs of the heuristic fallback, computed even when the model does not use them
+HEURISTIC_FEATURES = ('Pain_Lag_1',)
+
+# Sources: 'calendar' (the date), 'pain' (the pain series), 'weather', 'log' (logged on the day)
+
+
+class Feature(NamedTuple):
+    name: str
+    inputs: Tuple[str, ...]  # Timeline columns or earlier features
+    source: str
+    compute: Optional[Callable[[Dict[str, Any]], Any]] = None  # None: the raw column itself
+    fallback: Optional[Callable[[Dict[str, Any]], Any]] = None  # Inference only
+
+    @property
+    def is_raw(self) -> bool:
+        return self.compute is None
+
+
+# --- Timeline helpers (NaN-propagating, like their pandas counterparts) ---
+
+def shift(values, periods: int):
+    import numpy as np
+    out = np.full(len(values), np.nan)
+    if periods < len(values):
+        out[periods:] = values[:len(values) - periods]
+    return out
+
+
+def rolling_mean(values, window: int):
+    """Series.rolling(window).mean(): NaN until the window is full or if it holds a NaN."""
+    import numpy as np
+    missing = np.isnan(values)
+    sums = np.concatenate(([0.0], np.cumsum(np.where(missing, 0.0, values))))
+    gaps = np.concatenate(([0], np.cumsum(missing)))
+    out = np.full(len(values), np.nan)
+    if window <= len(values):
+        end = np.arange(window, len(values) + 1)
+        means = (sums[end] - sums[end - window]) / window
+        out[window - 1:] = np.where(gaps[end] - gaps[end - window] > 0, np.nan, means)
+    return out
+
+
+def _day_of_week(c):
+    import numpy as np
+    # 1970-01-01 was a Thursday; Monday = 0
+    return (c['Date'].astype('datetime64[D]').astype(np.int64) + 3) % 7
+
+
+def _month(c):
+    import numpy as np
+    return c['Date'].astype('datetime64[M]').astype(np.int64) % 12 + 1
+
+
+def _cyclic(column, period, fn):
+    def compute(c):
+        import numpy as np
+        return getattr(np, fn)(2 * np.pi * c[column] / period)
+    return compute
+
+
+def _constant(value):
+    import numpy as np
+    return lambda c: np.full(len(c['Date']), value)
+
+
+def _tavg(c):
+    import numpy as np
+    # Mid-range of the day (as training always did); the reported mean where min / max are missing
+    mid = (c['tmax'] + c['tmin']) / 2
+    return np.where(np.isnan(mid), c['tavg'], mid) if 'tavg' in c else mid
+
+
+def _humid_tavg(c):
+    import numpy as np
+    return np.nan_to_num(c['average_humidity'], nan=0.0) * c['tavg']
+
+
+def _pres_change(c):
+    import numpy as np
+    diff = c['pres'] - shift(c['pres'], 1)
+    if 'pres_change' in c:
+        # Forecast weather arrives with the change already computed from hourly pressure
+        return np.where(np.isnan(c['pres_change']), diff, c['pres_change'])
+    return diff
+
+
+def _lag(k):
+    return lambda c: shift(c['Pain Level'], k)
+
+
+def _rolling(window):
+    return lambda c: rolling_mean(shift(c['Pain Level'], 1), window)
+
+
+def _raw(name, source, fallback=None):
+    return Feature(name, (name,), source, fallback=fallback)
+
+
+FEATURES: Tuple[Feature, ...] = (
+    # Logged on the day: unknown when forecasting, so inference uses typical values
+    _raw('Sleep', 'log', _constant(2.0)),
+    _raw('Physical Activity', 'log', _constant(1.5)),
+    _raw('Latitude', 'log'),
+    _raw('Longitude', 'log'),
+    # Raw weather
+    *(_raw(name, 'weather') for name in (
+        'tmin', 'tmax', 'prcp', 'snow', 'wdir', 'wspd', 'wpgt', 'pres', 'tsun',
+        'average_humidity', 'midday_humidity'
+    )),
+    # Hourly-derived weather (services.weather_features)
+    *(_raw(name, 'weather') for name in (
+        'pres_drop_6h', 'pres_crash', 'temp_hourly_std', 'max_dew_point', 'max_wet_bulb',
+        'temp_hourly_skew', 'temp_hourly_kurtosis', 'pres_hourly_skew'
+    )),
+    # Calendar (cyclical encoding)
+    Feature('DayOfWeek', ('Date',), 'calendar', _day_of_week),
+    Feature('Month', ('Date',), 'calendar', _month),
+    Feature('DayOfWeek_sin', ('DayOfWeek',), 'calendar', _cyclic('DayOfWeek', 7, 'sin')),
+    Feature('DayOfWeek_cos', ('DayOfWeek',), 'calendar', _cyclic('DayOfWeek', 7, 'cos')),
+    Feature('Month_sin', ('Month',), 'calendar', _cyclic('Month', 12, 'sin')),
+    Feature('Month_cos', ('Month',), 'calendar', _cyclic('Month', 12, 'cos')),
+    # Derived weather
+    Feature('tdiff', ('tmax', 'tmin'), 'weather', lambda c: c['tmax'] - c['tmin']),
+    Feature('tavg', ('tmin', 'tmax'), 'weather', _tavg),
+    Feature('humid.*tavg', ('average_humidity', 'tavg'), 'weather', _humid_tavg),
+    # Autoregressive pain
+    *(Feature(f'Pain_Lag_{k}', ('Pain Level',), 'pain', _lag(k)) for k in LAG_DAYS),
+    *(Feature(f'Pain_Rolling_Mean_{n}', ('Pain Level',), 'pain', _rolling(n)) for n in ROLLING_WINDOWS),
+    # Lagged weather (weather often triggers migraines with a delay)
+    Feature('pres_change', ('pres',), 'weather', _pres_change),
+    Feature('pres_change_lag1', ('pres_change',), 'weather', lambda c: shift(c['pres_change'], 1), _constant(0.0)),
+    Feature('tavg_lag1', ('tavg',), 'weather', lambda c: shift(c['tavg'], 1), lambda c: c['tavg']),
+)
+FEATURE_NAMES = tuple(f.name for f in FEATURES)
+_INTEGER_FEATURES = ('DayOfWeek', 'Month')
+_BY_NAME = {f.name: f for f in FEATURES}
+_REFERENCED = tuple(n for n in dict.fromkeys([i for f in FEATURES for i in f.inputs] + list(FEATURE_NAMES)) if n != 'Date')
+
+
+def compile_features(names: Optional[Iterable[str]] = None) -> List[Feature]:
+    """
+    The features to evaluate, in spec order: all of them, or only those in
+    `names` (plus HEURISTIC_FEATURES) and the features they are computed from.
+    """
+    if names is None:
+        return list(FEATURES)
+    wanted = set()
+    stack = [n for n in list(names) + list(HEURISTIC_FEATURES) if n in _BY_NAME]
+    while stack:
+        name = stack.pop()
+        if name in wanted:
+            continue
+        wanted.add(name)
+        stack.extend(i for i in _BY_NAME[name].inputs if i in _BY_NAME and i != name)
+    return [f for f in FEATURES if f.name in wanted]
+
+
+def evaluate(name: str, columns: Dict[str, Any]):
+    """One derived feature's expression over the given input columns."""
+    return _BY_NAME[name].compute(columns)
+
+
+def training_columns(columns: Sequence[str]) -> List[str]:
+    """Model inputs among a processed training frame's columns, in frame order."""
+    return [c for c in columns if c in _BY_NAME]
+
+
+def add_training_features(df, precomputed: Sequence[str] = ()):
+    """
+    Evaluates the spec over a daily timeline DataFrame (sorted, one row per day)
+    and adds the features whose inputs it has. Columns in `precomputed` are
+    trusted as-is and only moved to their spec position.
+    """
+    import numpy as np
+    import pandas as pd
+
+    # Raw values of every referenced column; computed features replace theirs in spec order
+    columns = {'Date': df['Date'].to_numpy(dtype='datetime64[ns]')}
+    for name in _REFERENCED:
+        if name in df.columns and name not in precomputed:
+            columns[name] = pd.to_numeric(df[name], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+
+    for feature in FEATURES:
+        if feature.name in precomputed and feature.name in df.columns:
+            df[feature.name] = df.pop(feature.name)
+            columns[feature.name] = df[feature.name].to_numpy(dtype=np.float64, na_value=np.nan)
+            continue
+        if feature.is_raw:
+            continue  # Already in place
+        if all(name in columns for name in feature.inputs):
+            columns[feature.name] = feature.compute(columns)
+            df[feature.name] = columns[feature.name]
+    return df
+
+
+def pain_series(pain_map, first_day: int, n_days: int):
+    """
+    Dense daily pain array for epoch days first_day .. first_day + n_days - 1.
+    Days missing from pain_map are 0 (no entry = no pain).
+    """
+    import numpy as np
+
+    pains = np.zeros(n_days)
+    if pain_map:
+        days = np.array(list(pain_map.keys()), dtype='datetime64[D]').astype(np.int64) - first_day
+        values = np.array(list(pain_map.values()), dtype=np.float64)
+        inside = (days >= 0) & (days < n_days)
+        pains[days[inside]] = values[inside]
+    return pains
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def inference_rows(target_days, weathers: List[Dict[str, Any]], pain_map, features: List[Feature]) -> List[Dict[str, Any]]:
+    """
+    Feature dicts for target days (datetime64[D] array) with their weather dicts.
+
+    Targets are grouped into one timeline per location, spanning the lookback
+    before the earliest target to the latest one; pain comes from pain_map,
+    weather only exists on target days. Each row is its weather dict updated with
+    the computed features. Weather-derived features without a value are left out.
+    """
+    import numpy as np
+
+    tracks: Dict[Any, List[int]] = {}
+    for i, weather in enumerate(weathers):
+        tracks.setdefault((weather.get('Latitude'), weather.get('Longitude')), []).append(i)
+
+    rows: List[Dict[str, Any]] = [dict(w) for w in weathers]
+    days = np.asarray(target_days).astype('datetime64[D]').astype(np.int64)
+    for indices in tracks.values():
+        first_day = int(days[indices].min()) - MAX_LOOKBACK_DAYS
+        n_days = int(days[indices].max()) - first_day + 1
+        positions = days[indices] - first_day
+
+        columns = {
+            'Date': (first_day + np.arange(n_days)).astype('datetime64[D]'),
+            'Pain Level': pain_series(pain_map, first_day, n_days),
+        }
+        for i, position in zip(indices, positions):
+            for key, value in weathers[i].items():
+                if _is_number(value):
+                    if key not in columns:
+                        columns[key] = np.full(n_days, np.nan)
+                    columns[key][position] = value
+
+        for feature in features:
+            values = None
+            if all(name in columns for name in feature.inputs):
+                values = columns[feature.name] if feature.is_raw else feature.compute(columns)
+                values = np.asarray(values, dtype=np.float64)
+            if feature.fallback is not None:
+                try:
+                    fallback = np.asarray(feature.fallback(columns), dtype=np.float64)
+                except KeyError:
+                    fallback = None
+                if fallback is not None:
+                    values = fallback if values is None else np.where(np.isnan(values), fallback, values)
+            if values is None:
+                continue
+            columns[feature.name] = values
+            for i, position in zip(indices, positions):
+                value = values[position]
+                if np.isnan(value) and feature.source == 'weather':
+                    rows[i].pop(feature.name, None)
+                    continue
+                rows[i][feature.name] = int(value) if feature.name in _INTEGER_FEATURES else value
+    return rows
@@ -0,0 +1,377 @@
+"""
+feature_store.py
+Persisted daily feature table, maintained incrementally as entries change.
+
+`daily_features` holds one row per calendar day of the training timeline
+(see data_loader.combine_daily): daily max pain (0 on days without entries),
+mean Sleep / Physical Activity, the first id / location of the day, the joined
+weather columns and the autoregressive pain features (PAIN_LAG_COLUMNS).
+
+Adding, editing or deleting an entry re-aggregates only the touched days and
+recomputes lags for [day, day + LOOKBACK_DAYS], the rows that can see it.
+Changes that move the start of the timeline, bulk imports and weather history
+updates rebuild the table. The log's write version (services.log_snapshot, one
+row; the entry count for logs without the counter) and the weather file stamp
+are kept in `daily_features_meta`; a mismatch, e.g. after an external write,
+rebuilds on the next read.
+
+Training reads the table in one ordered scan (load_training_frame), rebuilding
+first if needed. Inference reads the recent daily pain in one range scan
+(recent_pain); a stale table is rebuilt on a background thread instead, and
+inference uses the raw history until it is done.
+
+Public API:
+  ensure_current(conn, db_path=None) -> bool
+  is_current(conn) -> bool
+  schedule_rebuild(db_path)
+  rebuild(conn, db_path=None)
+  apply_entry_change(db_path, dates=None)
+  invalidate(db_path)
+  load_training_frame(db_path) -> DataFrame
+  recent_pain(conn, days=RECENT_DAYS) -> {date: pain}
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from forecasting import data_loader, feature_spec
+from forecasting.feature_spec import MAX_LOOKBACK_DAYS, PAIN_LAG_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+TABLE = 'daily_features'
+META_TABLE = 'daily_features_meta'
+# An entry on day D changes the lag features of D .. D + LOOKBACK_DAYS
+LOOKBACK_DAYS = MAX_LOOKBACK_DAYS
+# Days of daily pain handed to inference (covers every lag with room to spare)
+RECENT_DAYS = 60
+
+# Per-day aggregates of migraine_log kept in the table
+LOG_COLUMNS = data_loader.DAILY_LOG_COLUMNS
+# Free-text log columns are never features
+TEXT_COLUMNS = ('Time', 'Medication', 'Dosage', 'Medications', 'Triggers', 'Notes', 'Location', 'Timezone')
+
+_DATE_FORMAT = '%Y-%m-%d'
+
+# Databases with a background rebuild running
+_rebuilding = set()
+_rebuilding_lock = threading.Lock()
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _table_exists(conn, name: str) -> bool:
+    row = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).fetchone()
+    return row is not None
+
+
+def _columns(conn) -> List[str]:
+    return [info[1] for info in conn.execute(f"PRAGMA table_info({TABLE})")]
+
+
+def _read_meta(conn) -> Dict[str, str]:
+    if not _table_exists(conn, META_TABLE):
+        return {}
+    return dict(conn.execute(f"SELECT key, value FROM {META_TABLE}").fetchall())
+
+
+def _write_meta(conn, **values) -> None:
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {META_TABLE} (key TEXT PRIMARY KEY, value TEXT)")
+    conn.executemany(
+        f"INSERT OR REPLACE INTO {META_TABLE} (key, value) VALUES (?, ?)",
+        [(k, str(v)) for k, v in values.items()]
+    )
+
+
+def _entry_count(conn) -> int:
+    return conn.execute("SELECT COUNT(*) FROM migraine_log").fetchone()[0]
+
+
+def _log_version(conn) -> str:
+    """
+    Change marker of migraine_log: its write counter, or the entry count for
+    databases without one (never opened through EntryService).
+    """
+    from services import log_snapshot
+
+    version = log_snapshot.write_version(conn)
+    if version is None:
+        return f"count:{_entry_count(conn)}"
+    return f"{version[0]}:{version[1]}"
+
+
+def _weather_stamp() -> str:
+    try:
+        return str(os.stat(data_loader.weather_data_filename).st_mtime_ns)
+    except OSError:
+        return ''
+
+
+def _to_date(value: str):
+    return datetime.strptime(value[:10], _DATE_FORMAT).date()
+
+
+def _pain_features(pains) -> Dict[str, Any]:
+    """
+    PAIN_LAG_COLUMNS for a run of consecutive days, the first being the start
+    of the timeline, evaluated from the shared feature spec.
+    """
+    import numpy as np
+
+    timeline = {'Pain Level': np.asarray(pains, dtype=np.float64)}
+    features = feature_spec.compile_features(PAIN_LAG_COLUMNS)
+    return {f.name: f.compute(timeline) for f in features if f.name in PAIN_LAG_COLUMNS}
+
+
+def _log_column_names(columns: List[str]) -> Dict[str, str]:
+    """
+    Table column for each LOG_COLUMNS entry. Weather columns of the same name
+    (e.g. Latitude) make the merge suffix the log's copy with '_x'.
+    """
+    return {name: name + '_x' if name + '_x' in columns else name for name in LOG_COLUMNS}
+
+
+def _create_table(conn, columns: List[str]) -> None:
+    conn.execute(f"DROP TABLE IF EXISTS {TABLE}")
+    definitions = ['Date TEXT PRIMARY KEY'] + [_quote(c) for c in columns if c != 'Date']
+    conn.execute(f"CREATE TABLE {TABLE} ({', '.join(definitions)})")
+
+
+def rebuild(conn, db_path: Optional[str] = None) -> int:
+    """
+    Recomputes the whole table from migraine_log and the weather history. Returns the row count.
+    """
+    weather = data_loader.load_weather_data(data_loader.weather_data_filename)
+    log = data_loader.load_daily_log(db_path, conn=conn)
+
+    if log.empty:
+        _create_table(conn, ['Date', *LOG_COLUMNS, *PAIN_LAG_COLUMNS])
+        rows = []
+    else:
+        combined = data_loader.combine_daily(log, weather)
+        frame = combined[[c for c in combined.columns if c not in TEXT_COLUMNS]].copy()
+        for column, values in _pain_features(frame['Pain Level']).items():
+            frame[column] = values
+        frame['Date'] = frame['Date'].dt.strftime(_DATE_FORMAT)
+
+        _create_table(conn, list(frame.columns))
+        values = [
+            [None if isinstance(v, float) and v != v else v for v in frame[c].tolist()]
+            for c in frame.columns
+        ]
+        rows = list(zip(*values))
+        placeholders = ', '.join('?' for _ in frame.columns)
+        conn.executemany(
+            f"INSERT INTO {TABLE} ({', '.join(_quote(c) for c in frame.columns)}) VALUES ({placeholders})",
+            rows
+        )
+
+    dates = weather['date'].dropna().astype(str).str[:10] if 'date' in weather.columns else []
+    _write_meta(
+        conn,
+        log_version=_log_version(conn),
+        weather_stamp=_weather_stamp(),
+        weather_min=min(dates) if len(dates) else '',
+        weather_max=max(dates) if len(dates) else '',
+    )
+    logger.info(f"Rebuilt {TABLE}: {len(rows)} days.")
+    return len(rows)
+
+
+def is_current(conn) -> bool:
+    """True if the table exists and matches migraine_log and the weather history."""
+    meta = _read_meta(conn)
+    return (
+        _table_exists(conn, TABLE)
+        and meta.get('log_version') == _log_version(conn)
+        and meta.get('weather_stamp') == _weather_stamp()
+    )
+
+
+def ensure_current(conn, db_path: Optional[str] = None) -> bool:
+    """
+    Rebuilds the table if it is missing or out of sync with migraine_log.
+    Returns False (and writes nothing) for databases without a migraine log.
+    """
+    if not _table_exists(conn, 'migraine_log'):
+        return False
+    if not is_current(conn):
+        with conn:
+            rebuild(conn, db_path)
+    return True
+
+
+def schedule_rebuild(db_path: str) -> None:
+    """Brings the table up to date on a background thread (one per database at a time)."""
+    with _rebuilding_lock:
+        if db_path in _rebuilding:
+            return
+        _rebuilding.add(db_path)
+
+    def _job():
+        conn = None
+        try:
+            conn = sqlite3.connect(db_path)
+            ensure_current(conn, db_path)
+        except Exception as e:
+            logger.warning(f"Background {TABLE} rebuild failed for {os.path.basename(db_path)}: {e}")
+        finally:
+            if conn:
+                conn.close()
+            with _rebuilding_lock:
+                _rebuilding.discard(db_path)
+
+    threading.Thread(target=_job, daemon=True, name="feature-store-rebuild").start()
+
+
+def _update_lags(conn, start, end, origin) -> None:
+    """Recomputes PAIN_LAG_COLUMNS for the rows start..end (dates, inclusive)."""
+    first = max(origin, start - timedelta(days=LOOKBACK_DAYS))
+    rows = conn.execute(
+        f'SELECT Date, "Pain Level" FROM {TABLE} WHERE Date >= ? AND Date <= ? ORDER BY Date',
+        (first.strftime(_DATE_FORMAT), end.strftime(_DATE_FORMAT))
+    ).fetchall()
+    if not rows:
+        return
+    # Computed as if the timeline started at `first`: rows from `start` on have
+    # their full lookback inside the window (or start at the real origin)
+    features = _pain_features([pain or 0.0 for _, pain in rows])
+    assignments = ', '.join(f'{_quote(c)} = ?' for c in PAIN_LAG_COLUMNS)
+    updates = []
+    for i in range((start - first).days, len(rows)):
+        values = [features[c][i] for c in PAIN_LAG_COLUMNS]
+        updates.append([None if v != v else float(v) for v in values] + [rows[i][0]])
+    conn.executemany(f"UPDATE {TABLE} SET {assignments} WHERE Date = ?", updates)
+
+
+def _apply(conn, dates: List[str], db_path: Optional[str]) -> None:
+    meta = _read_meta(conn)
+    log_min, log_max = conn.execute("SELECT MIN(Date), MAX(Date) FROM migraine_log").fetchone()
+    store_min, store_max = conn.execute(f"SELECT MIN(Date), MAX(Date) FROM {TABLE}").fetchone()
+    if log_min is None or store_min is None:
+        rebuild(conn, db_path)
+        return
+
+    weather_min, weather_max = meta.get('weather_min') or None, meta.get('weather_max') or None
+    timeline_min = min(filter(None, (log_min[:10], weather_min)))
+    timeline_max = max(filter(None, (log_max[:10], weather_max)))
+    if timeline_min != store_min:
+        # Moving the start of the timeline shifts every row's lag window
+        rebuild(conn, db_path)
+        return
+
+    origin = _to_date(store_min)
+    windows = []  # (start, end) date ranges whose lag features need recomputing
+    if timeline_max < store_max:
+        conn.execute(f"DELETE FROM {TABLE} WHERE Date > ?", (timeline_max,))
+    elif timeline_max > store_max:
+        first_new, last_new = _to_date(store_max) + timedelta(days=1), _to_date(timeline_max)
+        conn.executemany(
+            f'INSERT INTO {TABLE} (Date, "Pain Level") VALUES (?, 0.0)',
+            [((first_new + timedelta(days=i)).strftime(_DATE_FORMAT),) for i in range((last_new - first_new).days + 1)]
+        )
+        windows.append((first_new, last_new))
+
+    columns = _log_column_names(_columns(conn))
+    assignments = ', '.join(f'{_quote(columns[c])} = ?' for c in LOG_COLUMNS)
+    last = _to_date(timeline_max)
+    for date_str in dates:
+        day = _to_date(date_str)
+        if day < origin or day > last:
+            continue
+        day_str = day.strftime(_DATE_FORMAT)
+        rows = data_loader.daily_log_rows(conn, [day_str])
+        # No entries left on the day: no pain
+        aggregates = list(rows[0][1:]) if rows else [None] * len(LOG_COLUMNS)
+        aggregates[0] = aggregates[0] if aggregates[0] is not None else 0.0
+        conn.execute(f"UPDATE {TABLE} SET {assignments} WHERE Date = ?", aggregates + [day_str])
+        windows.append((day, min(day + timedelta(days=LOOKBACK_DAYS), last)))
+
+    # Merge overlapping windows so each row is recomputed once
+    merged = []
+    for start, end in sorted(windows):
+        if merged and start <= merged[-1][1] + timedelta(days=1):
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    for start, end in merged:
+        _update_lags(conn, start, end, origin)
+
+    _write_meta(conn, log_version=_log_version(conn))
+
+
+def apply_entry_change(db_path: str, dates: Optional[Iterable[str]] = None) -> None:
+    """
+    Updates the table after entries on `dates` (YYYY-MM-DD) were added, edited or
+    deleted. dates=None (bulk changes) rebuilds. Does nothing if the table was never built.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        if not _table_exists(conn, TABLE) or not _table_exists(conn, 'migraine_log'):
+            return
+        with conn:
+            if dates is None:
+                rebuild(conn, db_path)
+            else:
+                _apply(conn, sorted({str(d)[:10] for d in dates if d}), db_path)
+    except Exception as e:
+        logger.warning(f"Incremental {TABLE} update failed ({e}); it will be rebuilt on next use.")
+        invalidate(db_path)
+    finally:
+        conn.close()
+
+
+def invalidate(db_path: str) -> None:
+    """Drops the table; the next read rebuilds it."""
+    conn = sqlite3.connect(db_path)
+    try:
+        with conn:
+            conn.execute(f"DROP TABLE IF EXISTS {TABLE}")
+    finally:
+        conn.close()
+
+
+def load_training_frame(db_path: str):
+    """
+    The training timeline (combine_daily's rows, text columns dropped, plus
+    PAIN_LAG_COLUMNS) in one ordered scan. Feed to process_combined_data(lags_precomputed=True).
+    """
+    import pandas as pd
+
+    conn = sqlite3.connect(db_path)
+    try:
+        ensure_current(conn, db_path)
+        df = pd.read_sql_query(f"SELECT * FROM {TABLE} ORDER BY Date", conn)
+    finally:
+        conn.close()
+    df['Date'] = pd.to_datetime(df['Date'])
+    # All-NULL columns (e.g. tavg without weather history) come back as objects; keep them numeric
+    for column in df.columns[df.isna().all()]:
+        df[column] = df[column].astype('float64')
+    return df
+
+
+def recent_pain(conn, days: int = RECENT_DAYS, db_path: Optional[str] = None) -> Optional[Dict[Any, float]]:
+    """
+    {date: daily max pain} for the last `days` days of the timeline, or None if
+    the database has no migraine log or the table is not current yet. A stale
+    table is rebuilt in the background (schedule_rebuild), never in the caller.
+    """
+    if not _table_exists(conn, 'migraine_log'):
+        return None
+    if not is_current(conn):
+        if db_path is None:
+            ensure_current(conn)
+        else:
+            schedule_rebuild(db_path)
+            return None
+    rows = conn.execute(
+        f'SELECT Date, "Pain Level" FROM {TABLE} ORDER BY Date DESC LIMIT ?', (days,)
+    ).fetchall()
+    return {_to_date(d): float(p or 0.0) for d, p in rows}
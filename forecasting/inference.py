@@ -1,6 +1,8 @@
 import os
 import sqlite3
 import datetime
+import threading
+from collections import OrderedDict
 from datetime import timedelta
 from typing import TYPE_CHECKING, Dict, Any
 import sys
@@ -9,8 +11,14 @@ import logging
 # --- NEW IMPORTS ---
 from services.weather_service import WeatherService
 from forecasting.feature_engine import FeatureEngine
-from forecasting.data_loader import get_recent_history, get_latest_location_from_db
+from forecasting.data_loader import get_recent_history, get_latest_location_from_db, clear_location_cache
+from forecasting.prediction_cache import PredictionCache
+from forecasting.prediction_context import PredictionContext
+from forecasting import model_registry
+from forecasting import feature_store
+from forecasting import circadian_store
 from api.utils import get_db_path, get_data_dir
+from services import metrics
 
 # Lazy loaded types
 if TYPE_CHECKING:
@@ -33,6 +41,21 @@ MODEL_REG_PATH = os.path.join(MODEL_DIR, 'best_model_reg.pkl')
 # 2.5x allows a 20% heuristic to scale to 50%, but prevents 5% -> 50% (noise amplification).
 MAX_CALIBRATION_SCALE = 2.5
 
+# Prediction Cache
+# Bounded so a sidecar serving several databases cannot grow without limit.
+# The TTL caps how long a live-weather prediction is reused before re-fetching.
+PREDICTION_CACHE_MAX_ENTRIES = 256
+PREDICTION_CACHE_TTL_SECONDS = 3600
+
+# Prediction Contexts (history, location, settings) are reused until the DB file changes.
+CONTEXT_CACHE_MAX_ENTRIES = 16
+CONTEXT_CACHE_TTL_SECONDS = 600
+
+# Loaded model pairs, one per database (profile). Least recently used pairs are
+# dropped beyond the limit, and pairs unused for MODEL_IDLE_SECONDS are released.
+MODEL_CACHE_MAX_ENTRIES = 4
+MODEL_IDLE_SECONDS = 1800
+
 # DB_PATH = get_db_path() # Removed global
 
 # Setup logger
@@ -46,73 +69,487 @@ console_handler.setFormatter(formatter)
 logger.addHandler(console_handler)
 logger.setLevel(logging.DEBUG)
 
-_clf_model = None
-_reg_model = None
-_prediction_cache = {}
-_loaded_model_version = None
+class CompiledEnsemble:
+    """
+    Pure-NumPy scorer for a gradient-boosted ensemble flattened by
+    train_model.export_compiled_ensemble.
+
+    All trees are walked together: a (rows x trees) matrix of node indices
+    advances one level per step, so a single row or a whole batch costs
+    max_depth vectorised gathers instead of a per-tree Python loop.
+    Exposes the subset of the sklearn API used here (feature_names_in_,
+    predict_proba, predict), so it can stand in for the fitted estimators.
+    """
 
-def load_models():
-    global _clf_model, _reg_model
-    global _prediction_cache, _loaded_model_version
-    
+    def __init__(self, arrays):
+        import numpy as np
+
+        self.loss = str(arrays['loss'])
+        self.baseline = float(arrays['baseline'])
+        self.feature_names_in_ = np.asarray(arrays['feature_names'], dtype=object)
+        self.classes_ = np.asarray(arrays['classes'])
+        self.max_depth = int(arrays['max_depth'])
+        self.roots = arrays['roots']
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.missing_left = arrays['missing_left']
+        self.left = arrays['left']
+        self.right = arrays['right']
+        self.is_leaf = arrays['is_leaf']
+        self.value = arrays['value']
+        self.count = arrays['count']
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def rows_from_features(self, feature_rows):
+        """
+        Builds the (N x F) input matrix straight from feature dicts, skipping DataFrames.
+        Raises KeyError if a model feature is missing, like DataFrame column selection does.
+        """
+        import numpy as np
+        return np.array(
+            [[row[name] for name in self.feature_names_in_] for row in feature_rows],
+            dtype=np.float64
+        ).reshape(len(feature_rows), len(self.feature_names_in_))
+
+    def _as_matrix(self, X):
+        import numpy as np
+        if hasattr(X, 'columns'):
+            X = X[list(self.feature_names_in_)].to_numpy(dtype=np.float64)
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        return X
+
+    def apply(self, X):
+        """
+        Leaf index reached in every tree: an (N x n_trees) array of global node ids.
+        """
+        import numpy as np
+
+        X = self._as_matrix(X)
+        nodes = np.repeat(self.roots[np.newaxis, :], X.shape[0], axis=0)
+        row_idx = np.arange(X.shape[0])[:, np.newaxis]
+        for _ in range(self.max_depth):
+            values = X[row_idx, self.feature[nodes]]
+            go_left = np.where(np.isnan(values), self.missing_left[nodes], values <= self.threshold[nodes])
+            # Leaves point at themselves, so finished trees stay put
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return nodes
+
+    def raw_predict(self, X):
+        return self.baseline + self.value[self.apply(X)].sum(axis=1)
+
+    def predict_proba(self, X):
+        import numpy as np
+        if self.loss != 'binomial':
+            raise AttributeError("predict_proba is only available for classifiers")
+        p = 1.0 / (1.0 + np.exp(-self.raw_predict(X)))
+        return np.column_stack([1.0 - p, p])
+
+    def predict(self, X):
+        raw = self.raw_predict(X)
+        if self.loss == 'binomial':
+            return self.classes_[(raw > 0).astype(int)]
+        return raw
+
+_prediction_cache = PredictionCache(
+    max_entries=PREDICTION_CACHE_MAX_ENTRIES,
+    ttl_seconds=PREDICTION_CACHE_TTL_SECONDS
+)
+_context_cache = PredictionCache(
+    max_entries=CONTEXT_CACHE_MAX_ENTRIES,
+    ttl_seconds=CONTEXT_CACHE_TTL_SECONDS
+)
+# Feature dicts behind cached ML results, so explanations never rebuild features
+_feature_rows = PredictionCache(
+    max_entries=PREDICTION_CACHE_MAX_ENTRIES,
+    ttl_seconds=PREDICTION_CACHE_TTL_SECONDS
+)
+_explain_state = {"source": None, "ensemble": None}
+# model_dir -> {"version", "clf", "reg", "last_used"}, least recently used first
+_loaded_models: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_models_lock = threading.Lock()
+# model_dir -> (stamp, manifest)
+_manifest_state: Dict[str, Any] = {}
+# model_dir -> (version, manifest stamp) whose files failed verification; not re-hashed until the manifest changes
+_failed_verification: Dict[str, Any] = {}
+
+def get_model_dir(db_path=None):
+    """
+    Model directory for a database. The default database uses MODEL_DIR itself;
+    every other profile trains into and predicts from its own namespace.
+    """
+    return model_registry.namespace_dir(MODEL_DIR, db_path)
+
+def _current_manifest(model_dir=None):
+    """
+    Returns the model manifest, re-reading it only when its (mtime, size) stamp changes.
+    """
+    model_dir = model_dir or MODEL_DIR
+    stamp = model_registry.manifest_stamp(model_dir)
+    if stamp is None:
+        _manifest_state.pop(model_dir, None)
+        return None
+    state = _manifest_state.get(model_dir)
+    if state is None or state[0] != stamp:
+        state = (stamp, model_registry.read_manifest(model_dir))
+        _manifest_state[model_dir] = state
+    return state[1]
+
+def _latest_model_version(db_path=None):
+    """
+    Returns the promoted model version for a database, or None if it has no trained model.
+    """
+    model_dir = get_model_dir(db_path)
+    manifest = _current_manifest(model_dir)
+    if manifest:
+        return manifest.get('version')
+    return _legacy_model_version(model_dir)
+
+def _legacy_model_version(model_dir=None):
+    """
+    Newest versioned model timestamp in model_dir, for models trained before the manifest existed.
+    """
+    import glob
+    all_clf_files = glob.glob(os.path.join(model_dir or MODEL_DIR, 'best_model_clf_*.pkl'))
+    if not all_clf_files:
+        return None
+    all_clf_files.sort(reverse=True)
+    newest_file = os.path.basename(all_clf_files[0])
+    return newest_file.split('_')[-1].replace('.pkl', '')
+
+def _evict_models(now):
+    """
+    Drops idle pairs, then least recently used ones beyond MODEL_CACHE_MAX_ENTRIES. Caller holds _models_lock.
+    """
+    for model_dir in [d for d, entry in _loaded_models.items() if now - entry['last_used'] > MODEL_IDLE_SECONDS]:
+        logger.debug(f"Releasing idle models for {model_dir}.")
+        del _loaded_models[model_dir]
+    while len(_loaded_models) > MODEL_CACHE_MAX_ENTRIES:
+        _loaded_models.popitem(last=False)
+
+def _read_model_pair(model_dir, manifest, version):
+    """
+    Loads a (clf, reg) pair from disk: the compiled ensembles if the manifest ships
+    them, else the sklearn pickles. Returns (None, None) if there is no usable pair.
+    """
     import joblib
     
-    # Production / Local Mode
+    # Prefer the array-backed ensembles when the promoted version ships them
+    if manifest and {'compiled_clf', 'compiled_reg'}.issubset(manifest['files']):
+        try:
+            logger.debug(f"Loading compiled models (version {version})...")
+            clf = CompiledEnsemble(joblib.load(
+                os.path.join(model_dir, manifest['files']['compiled_clf']['path']), mmap_mode='r'))
+            reg = CompiledEnsemble(joblib.load(
+                os.path.join(model_dir, manifest['files']['compiled_reg']['path']), mmap_mode='r'))
+            return clf, reg
+        except Exception as e:
+            logger.warning(f"Compiled models unusable ({e}). Loading sklearn models.")
+
+    # Determine paths to load
+    if manifest:
+        clf_candidate = os.path.join(model_dir, manifest['files']['clf']['path'])
+        reg_candidate = os.path.join(model_dir, manifest['files']['reg']['path'])
+    elif version:
+        clf_candidate = os.path.join(model_dir, f'best_model_clf_{version}.pkl')
+        reg_candidate = os.path.join(model_dir, f'best_model_reg_{version}.pkl')
+    else:
+        clf_candidate = os.path.join(model_dir, 'best_model_clf.pkl')
+        reg_candidate = os.path.join(model_dir, 'best_model_reg.pkl')
+        
+    if not os.path.exists(clf_candidate):
+        # Graceful degradation for new users who haven't trained yet
+        return None, None
     
-    import glob
-    latest_version = None
-    all_clf_files = glob.glob(os.path.join(MODEL_DIR, 'best_model_clf_*.pkl'))
-    if all_clf_files:
-        all_clf_files.sort(reverse=True)
-        newest_file = os.path.basename(all_clf_files[0])
-        latest_version = newest_file.split('_')[-1].replace('.pkl', '')
+    logger.debug(f"Loading CLF model ({os.path.basename(clf_candidate)})...")
+    try:
+        clf = joblib.load(clf_candidate, mmap_mode='r')
+        logger.debug(f"Loading REG model ({os.path.basename(reg_candidate)})...")
+        reg = joblib.load(reg_candidate, mmap_mode='r')
+    except Exception as e:
+        logger.error(f"Error loading models: {e}")
+        return None, None
+    return clf, reg
+
+def load_models(db_path=None):
+    """
+    Returns the (clf, reg) pair trained on db_path (the default database if None),
+    or (None, None). Pairs stay loaded per database, so switching profiles
+    never reloads from disk nor serves another profile's model.
+    """
+    import time
+    
+    model_dir = get_model_dir(db_path)
+    manifest = _current_manifest(model_dir)
+    latest_version = manifest.get('version') if manifest else _legacy_model_version(model_dir)
+    
+    with _models_lock:
+        now = time.monotonic()
+        entry = _loaded_models.get(model_dir)
+        if entry is not None:
+            entry['last_used'] = now
+            _loaded_models.move_to_end(model_dir)
+        _evict_models(now)
+    
+    if entry is not None and entry['version'] == latest_version:
+        return entry['clf'], entry['reg']
             
-    # Invalidate cache and force reload if version changed
-    if latest_version and latest_version != _loaded_model_version:
+    # Invalidate cache and load if the version changed
+    if latest_version:
+        if manifest:
+            # Hash the files once per promotion: a failure is kept until the manifest changes
+            attempt = (latest_version, _manifest_state.get(model_dir, (None,))[0])
+            verified = _failed_verification.get(model_dir) != attempt and model_registry.verify_files(model_dir, manifest)
+            if not verified:
+                # Never swap in a pair that doesn't match its manifest; keep serving the old one.
+                if _failed_verification.get(model_dir) != attempt:
+                    logger.error(f"Model version {latest_version} failed verification. Keeping current models.")
+                    _failed_verification[model_dir] = attempt
+                return (entry['clf'], entry['reg']) if entry is not None else (None, None)
+            _failed_verification.pop(model_dir, None)
         logger.info(f"New model version detected ({latest_version}). Clearing prediction cache.")
-        _prediction_cache.clear()
-        _clf_model = None
-        _reg_model = None
-        _loaded_model_version = latest_version
-        
-    if _clf_model is None:
-        # Determine paths to load
-        if latest_version:
-            clf_candidate = os.path.join(MODEL_DIR, f'best_model_clf_{latest_version}.pkl')
-            reg_candidate = os.path.join(MODEL_DIR, f'best_model_reg_{latest_version}.pkl')
+        _prediction_cache.invalidate(db_path)
+    
+    clf, reg = _read_model_pair(model_dir, manifest, latest_version)
+    if clf is None or reg is None:
+        return None, None
+    
+    with _models_lock:
+        _loaded_models[model_dir] = {'version': latest_version, 'clf': clf, 'reg': reg, 'last_used': time.monotonic()}
+        _loaded_models.move_to_end(model_dir)
+        _evict_models(time.monotonic())
+    return clf, reg
+
+def unload_models(db_path=None):
+    """
+    Releases loaded models for one database, or for all of them if db_path is None.
+    """
+    with _models_lock:
+        if db_path is None:
+            _loaded_models.clear()
         else:
-            clf_candidate = MODEL_CLF_PATH
-            reg_candidate = MODEL_REG_PATH
-            
-        if not os.path.exists(clf_candidate):
-            # Graceful degradation for new users who haven't trained yet
-            return None, None
-        
-        logger.debug(f"Loading CLF model ({os.path.basename(clf_candidate)})...")
-        try:
-            _clf_model = joblib.load(clf_candidate, mmap_mode='r')
-            logger.debug(f"Loading REG model ({os.path.basename(reg_candidate)})...")
-            _reg_model = joblib.load(reg_candidate, mmap_mode='r')
-        except Exception as e:
-            logger.error(f"Error loading models: {e}")
-            return None, None
-            
-    return _clf_model, _reg_model
+            _loaded_models.pop(get_model_dir(db_path), None)
 
-def clear_prediction_cache():
-    global _prediction_cache
-    _prediction_cache.clear()
-    logger.info("Prediction cache cleared.")
+def clear_prediction_cache(db_path=None):
+    """
+    Invalidates cached predictions for one database, or for all of them if db_path is None.
+    Precomputed dashboard snapshots are dropped too and rebuilt in the background.
+    """
+    from forecasting import precompute
+    precompute.mark_dirty(db_path)
+    if db_path is None:
+        _prediction_cache.clear()
+        _context_cache.clear()
+        _feature_rows.clear()
+        circadian_store.clear_memory()
+        clear_location_cache()
+        logger.info("Prediction cache cleared.")
+    else:
+        _prediction_cache.invalidate(db_path)
+        _context_cache.invalidate(db_path)
+        _feature_rows.invalidate(db_path)
+        circadian_store.clear_memory(db_path)
+        clear_location_cache(db_path)
+        logger.info(f"Prediction cache cleared for {os.path.basename(db_path)}.")
 
-def get_prediction_for_date(target_date_str, weather_override=None, db_path=None):
-    if db_path is None: db_path = get_db_path() # Fallback for non-request calls
-    logger.debug(f"Starting prediction for {target_date_str} with DB: {os.path.basename(db_path)}")
+def get_prediction_cache_stats():
+    return _prediction_cache.stats()
+
+def _load_user_settings(db_path, conn=None):
+    """
+    Reads the raw user_settings key/value pairs. Returns {} if the table is missing.
+    """
+    settings = {}
+    owns_conn = conn is None
+    try:
+        if owns_conn:
+            conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+        cursor.execute("SELECT key, value FROM user_settings")
+        for key, value in cursor.fetchall():
+            settings[key] = value
+    except Exception:
+        pass
+    finally:
+        if owns_conn and conn:
+            conn.close()
+    return settings
+
+def _load_recent_pain(db_path, conn):
+    """
+    Daily max pain by date from the feature store, or None to fall back to the history rows.
+    """
+    try:
+        return feature_store.recent_pain(conn, db_path=db_path)
+    except Exception as e:
+        logger.warning(f"Daily feature store unavailable ({e}). Using raw history for lags.")
+        return None
+
+def _data_version(db_path):
+    """
+    Cheap change marker for a database file: (mtime_ns, size), or None if missing.
+    Every committed write bumps the mtime, so a changed value means stale inputs.
+    """
+    try:
+        st = os.stat(db_path)
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+def get_prediction_context(db_path=None):
+    """
+    Returns the PredictionContext for db_path. History, latest location and user
+    settings are loaded over a single connection and reused until the DB changes.
+    """
+    if db_path is None: db_path = get_db_path()
     
-    # 1. Check Cache
-    if target_date_str in _prediction_cache:
-        # Simple TTL check (1 hour) could go here
-        return _prediction_cache[target_date_str]["result"]
+    key = (db_path, _data_version(db_path))
+    context = _context_cache.get(key)
+    if context is not None:
+        return context
+
+    conn = None
+    try:
+        with metrics.span("sqlite.context"):
+            conn = sqlite3.connect(db_path)
+            history = get_recent_history(db_path, conn=conn)
+            location = get_latest_location_from_db(db_path, conn=conn)
+            settings = _load_user_settings(db_path, conn=conn)
+            pain_map = _load_recent_pain(db_path, conn)
+    finally:
+        if conn:
+            conn.close()
+
+    context = PredictionContext(db_path, history, location, settings, pain_map=pain_map)
+    # A background feature store rebuild (see feature_store.recent_pain) moves the
+    # version on when it finishes, so the next call picks up its pain map
+    _context_cache.set(key, context)
+    return context
+
+def _weather_fingerprint(weather):
+    """
+    Fingerprint of an injected weather dict. None means "live weather fetched on demand".
+    """
+    if not weather:
+        return None
+    items = []
+    for k, v in sorted(weather.items()):
+        if isinstance(v, float):
+            v = round(v, 3)
+        items.append((k, str(v)))
+    return hash(tuple(items))
+
+# Weather part of the key for a batch row scored without weather (see predict_days)
+_NO_WEATHER = 'no-weather'
+
+def _prediction_cache_key(context, target_date_str, model_version, weather_override, location=None):
+    """
+    A location marks a predict_days row: without weather it is keyed as
+    (_NO_WEATHER, location) rather than as the live-weather prediction.
+    """
+    weather_key = _weather_fingerprint(weather_override)
+    if weather_key is None and location is not None:
+        weather_key = (_NO_WEATHER, tuple(location))
+    return (
+        context.db_path,
+        target_date_str,
+        model_version,
+        weather_key,
+        context.settings_version
+    )
+
+@metrics.timed("model.score")
+def _score_ml(clf, reg, X, feature_rows=None):
+    """
+    Scores an N-row feature frame in one predict_proba and one predict call.
+    Returns (migraine probabilities, predicted pain on the 0-10 scale) as arrays.
+    
+    With compiled models and the raw feature dicts (feature_rows), the input
+    matrix is built directly and the DataFrame is never touched.
+    """
+    import numpy as np
+
+    if isinstance(clf, CompiledEnsemble) and feature_rows is not None:
+        X = clf.rows_from_features(feature_rows)
+    elif hasattr(clf, 'feature_names_in_'):
+        # Safe column ordering
+        X = X[clf.feature_names_in_]
+
+    probs = clf.predict_proba(X)[:, 1]
+    pred_pain = np.clip(np.expm1(reg.predict(X)), 0, 10)
+    return probs, pred_pain
+
+def _explainable(clf):
+    """
+    Compiled view of the classifier for TreeSHAP; sklearn models are compiled once.
+    """
+    if isinstance(clf, CompiledEnsemble):
+        return clf
+    if _explain_state["source"] is not clf:
+        from forecasting.train_model import export_compiled_ensemble
+        _explain_state["ensemble"] = CompiledEnsemble(export_compiled_ensemble(clf))
+        _explain_state["source"] = clf
+    return _explain_state["ensemble"]
+
+def _explain_features(clf, feature_rows, model_version):
+    """
+    TreeSHAP explanations (log-odds contributions) for a list of feature dicts, in one pass.
+    """
+    from forecasting import explain
+    ensemble = _explainable(clf)
+    return explain.explain_rows(ensemble, ensemble.rows_from_features(feature_rows), model_version)
+
+def _is_ml_result(result):
+    return str(result.get('source', '')).endswith('(ML)')
 
+def _ml_result(target_date_str, prob_migraine, pred_pain, meta):
+    risk = "Low"
+    if prob_migraine > 0.6: risk = "High"
+    elif prob_migraine > 0.2: risk = "Moderate"
+
+    return {
+        "date": target_date_str,
+        "probability": round(float(prob_migraine) * 100, 1),
+        "risk_level": risk,
+        "predicted_pain": round(float(pred_pain), 1) if prob_migraine > 0.2 else 0.0,
+        "source": meta.get('source', 'live') + " (ML)",
+        "source_date": meta.get('source_date', None)
+    }
+
+def get_cached_prediction(target_date_str, context):
+    """
+    Returns the cached live-weather prediction for a date, or None. Lets async
+    callers skip the weather fetch entirely on a cache hit.
+    """
+    model_version = None if context.force_heuristic else _latest_model_version(context.db_path)
+    return _prediction_cache.get(_prediction_cache_key(context, target_date_str, model_version, None))
+
+def _model_feature_names(context):
+    """
+    The active model's input features, so that only those are computed (plus the
+    heuristic's); () in heuristic mode, None (every feature) when no model is loaded.
+    """
+    if context.force_heuristic:
+        return ()
+    try:
+        clf, _ = load_models(context.db_path)
+    except Exception:
+        return None
+    names = getattr(clf, 'feature_names_in_', None)
+    if names is None or not len(names):
+        return None
+    return [str(n) for n in names]
+
+def build_daily_features(target_date_str, context, weather_override=None, live_weather=None, feature_names=None):
+    """
+    Feature row (DataFrame, dict) for one day from the context's history and the
+    injected, pre-fetched or freshly fetched weather. feature_names limits the
+    computed features (see FeatureEngine.construct_features_batch).
+    """
     try:
         import pandas as pd
         import numpy as np
@@ -122,119 +559,144 @@ def get_prediction_for_date(target_date_str, weather_override=None, db_path=None
         
     target_date = pd.to_datetime(target_date_str)
     
-    # 2. Coordinate Data Fetching
     # A. History
-    history = get_recent_history(db_path)
+    history = context.history
     
     # B. Weather
     weather = weather_override
     if not weather:
-        lat, lon = get_latest_location_from_db(db_path)
-        if lat and lon:
-            weather = WeatherService.fetch_forecast(lat, lon, target_date)
-            if weather:
-                weather['Latitude'] = lat
-                weather['Longitude'] = lon
-                if 'source' not in weather:
-                    weather['source'] = 'live'
-            else:
-                 # Fallback logic could be moved to Service or kept here as business rule
-                 # For now, we keep simpler service and handle fallback if needed or let FeatureEngine handle defaults
-                 pass
+        weather = _live_weather(context, target_date, live_weather)
     
     # C. Features
-    X, meta = FeatureEngine.construct_features(target_date, history, weather_data=weather)
+    return FeatureEngine.construct_features(
+        target_date, history, weather_data=weather, pain_map=context.pain_map, feature_names=feature_names
+    )
+
+def _live_weather(context, target_date, live_weather=None):
+    """
+    Forecast weather for one day at the context's location (pre-fetched live_weather
+    if given), tagged with the location. None/{} when there is no location or the fetch failed.
+    """
+    lat, lon = context.location
+    if not (lat and lon):
+        return None
+    weather = live_weather if live_weather is not None else WeatherService.fetch_forecast(lat, lon, target_date)
+    if weather:
+        weather['Latitude'] = lat
+        weather['Longitude'] = lon
+        if 'source' not in weather:
+            weather['source'] = 'live'
+    # Otherwise FeatureEngine fills weather defaults
+    return weather
+
+def _daily_anchors(context, date_strs):
+    """
+    Live-weather daily predictions for several dates (the hourly calibration anchors,
+    and weekly days the weekly fetch did not cover). Cached days are reused; the rest
+    are featurised and scored in one predict_days call and cached as live predictions,
+    as get_prediction_for_date would.
+    """
+    import pandas as pd
+    
+    model_version = None if context.force_heuristic else _latest_model_version(context.db_path)
+    anchors = {}
+    missing = []
+    for date_str in date_strs:
+        cached = _prediction_cache.get(_prediction_cache_key(context, date_str, model_version, None))
+        if cached is not None:
+            anchors[date_str] = cached
+        else:
+            missing.append(date_str)
+    
+    if missing:
+        days = [(d, _live_weather(context, pd.to_datetime(d))) for d in missing]
+        for date_str, (pred, batch_key) in zip(missing, predict_days(context, days, model_version)):
+            anchors[date_str] = pred
+            if pred is not None:
+                live_key = _prediction_cache_key(context, date_str, model_version, None)
+                _prediction_cache.set(live_key, pred)
+                meta = _feature_rows.get(batch_key)
+                if meta is not None:
+                    _feature_rows.set(live_key, meta)
+    return anchors
+
+@metrics.timed("predict.daily")
+def get_prediction_for_date(target_date_str, weather_override=None, db_path=None, context=None, live_weather=None, explain=False):
+    """
+    Daily prediction for target_date_str. live_weather is a pre-fetched Open-Meteo
+    forecast ({} if that fetch failed); when given, no network call is made here.
+    With explain=True, ML results carry a TreeSHAP 'explanation' (Issue #62).
+    """
+    if context is None:
+        context = get_prediction_context(db_path) # Falls back to the default DB for non-request calls
+    db_path = context.db_path
+    logger.debug(f"Starting prediction for {target_date_str} with DB: {os.path.basename(db_path)}")
+    
+    # 1. Check Cache
+    # Keyed per database, model version, weather input and settings so that
+    # profiles sharing one sidecar never see each other's predictions.
+    force_heuristic = context.force_heuristic
+    model_version = None if force_heuristic else _latest_model_version(context.db_path)
+    cache_key = _prediction_cache_key(context, target_date_str, model_version, weather_override)
+    cached = _prediction_cache.get(cache_key)
+    if cached is not None:
+        if not explain or not _is_ml_result(cached):
+            return cached
+        meta = _feature_rows.get(cache_key)
+        clf, _ = load_models(db_path)
+        if meta is not None and clf is not None:
+            return {**cached, "explanation": _explain_features(clf, [meta], model_version)[0]}
+        # Features for this cached result are gone: recompute below
+
+    # 2. Coordinate Data Fetching (history, weather) and build features
+    X, meta = build_daily_features(
+        target_date_str, context, weather_override, live_weather, feature_names=_model_feature_names(context)
+    )
     
     # 3. Predict (ML Inference)
     try:
-        # Check Force Heuristic Mode
-        force_heuristic = False
-        conn = None
-        try:
-             conn = sqlite3.connect(db_path)
-             cursor = conn.cursor()
-             cursor.execute("SELECT value FROM user_settings WHERE key='force_heuristic_mode'")
-             row = cursor.fetchone()
-             if row and str(row[0]).lower() == 'true':
-                 force_heuristic = True
-        except Exception: 
-            pass
-        finally:
-            if conn:
-                conn.close()
-
         if force_heuristic:
              logger.info("Force Heuristic Mode enabled. Bypassing ML.")
-             return _run_heuristic_fallback(target_date_str, X, meta, db_path)
+             result = _run_heuristic_fallback(target_date_str, X, meta, db_path, context=context)
+             _prediction_cache.set(cache_key, result)
+             return result
 
-        clf, reg = load_models()
+        clf, reg = load_models(db_path)
         
         if clf is None or reg is None:
             logger.info("No ML models available. Falling back to Heuristic.")
              # Raise exception to trigger the heuristic fallback catch block below
             raise FileNotFoundError("No models found")
         
-        # Safe column ordering
-        if hasattr(clf, 'feature_names_in_'):
-            X = X[clf.feature_names_in_]
-            
-        probs = clf.predict_proba(X)[0]
-        prob_migraine = probs[1]
-        
-        pred_log_pain = reg.predict(X)[0]
-        pred_pain = np.expm1(pred_log_pain) 
-        pred_pain = max(0, min(10, pred_pain))
-        
-        risk = "Low"
-        if prob_migraine > 0.6: risk = "High"
-        elif prob_migraine > 0.2: risk = "Moderate"
-            
-        result = {
-            "date": target_date_str,
-            "probability": round(prob_migraine * 100, 1),
-            "risk_level": risk,
-            "predicted_pain": round(pred_pain, 1) if prob_migraine > 0.2 else 0.0,
-            "source": meta.get('source', 'live') + " (ML)",
-            "source_date": meta.get('source_date', None)
-        }
+        probs, pred_pains = _score_ml(clf, reg, X, feature_rows=[meta])
+        result = _ml_result(target_date_str, probs[0], pred_pains[0], meta)
+        _feature_rows.set(cache_key, meta)
 
     except (FileNotFoundError, Exception) as e:
         logger.warning(f"ML Model unavailable ({e}). Switching to Heuristic Engine.")
-        result = _run_heuristic_fallback(target_date_str, X, meta, db_path)
+        result = _run_heuristic_fallback(target_date_str, X, meta, db_path, context=context)
         
     # Update Cache
-    _prediction_cache[target_date_str] = {
-        "timestamp": datetime.datetime.now(),
-        "result": result
-    }
+    _prediction_cache.set(cache_key, result)
+    
+    if explain and _is_ml_result(result):
+        try:
+            return {**result, "explanation": _explain_features(clf, [meta], model_version)[0]}
+        except Exception as e:
+            logger.warning(f"Explanation failed for {target_date_str}: {e}")
     return result
 
-def _run_heuristic_fallback(target_date_str, X, meta, db_path=None):
-    if db_path is None: db_path = get_db_path()
+def _run_heuristic_fallback(target_date_str, X, meta, db_path=None, context=None):
     """
     Helper to run Heuristic Predictor when ML fails.
     """
     from .heuristic_predictor import HeuristicPredictor
     import pandas as pd
     
-    # Fetch User Priors
-    user_priors = {}
-    conn = None
-    try:
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        cursor.execute("SELECT key, value FROM user_settings")
-        rows = cursor.fetchall()
-        for row in rows:
-            try:
-                user_priors[row['key']] = float(row['value'])
-            except ValueError: pass
-    except Exception: 
-        pass
-    finally:
-        if conn:
-            conn.close()
+    # User Priors come from the (shared) prediction context
+    if context is None:
+        context = get_prediction_context(db_path)
+    user_priors = context.user_priors
 
     predictor = HeuristicPredictor(user_priors)
     
@@ -262,84 +724,214 @@ def _run_heuristic_fallback(target_date_str, X, meta, db_path=None):
         "components": pred.get('components', {})
     }
 
-def get_weekly_forecast(start_date=None, db_path=None):
-    if db_path is None: db_path = get_db_path()
+@metrics.timed("predict.batch")
+def predict_days(context, days, model_version=None):
+    """
+    Direct forecasts for a list of (date_str, weather) or (date_str, weather, location)
+    rows, e.g. a week at one location or every day of a multi-location itinerary.
+    Rows without weather are cached per location (default: the context's), apart
+    from the live-weather predictions of get_prediction_for_date.
+    
+    History is loaded ONCE (in the context) and shared by every day, isolating the
+    weather impact. All uncached days are built into one feature matrix and scored
+    with a single predict_proba / predict call; days missing model features
+    (e.g. no weather) go through the heuristic, as the daily path does.
+    
+    Returns [(prediction or None, cache_key)] in input order.
+    """
+    import pandas as pd
+    
+    base_history_df = context.history
+    force_heuristic = context.force_heuristic
+    
+    results = [None] * len(days)
+    cache_keys = []
+    pending = []  # (index, date_str, cache_key, X, meta)
+    
+    uncached = []  # (index, date_str, cache_key, weather)
+    for i, (date_str, day_weather, *location) in enumerate(days):
+        location = location[0] if location else context.location
+        cache_key = _prediction_cache_key(context, date_str, model_version, day_weather, location=location)
+        cache_keys.append(cache_key)
+        cached = _prediction_cache.get(cache_key)
+        if cached is not None:
+            results[i] = cached
+            continue
+        uncached.append((i, date_str, cache_key, day_weather))
+    
+    if uncached:
+        try:
+            # Copy: feature construction annotates the weather dicts in place
+            X_all, metas = FeatureEngine.construct_features_batch(
+                [d for _, d, _, _ in uncached], base_history_df,
+                weather_data=[dict(w) if w else None for _, _, _, w in uncached],
+                pain_map=context.pain_map, feature_names=_model_feature_names(context)
+            )
+            for row, ((i, date_str, cache_key, _), meta) in enumerate(zip(uncached, metas)):
+                pending.append((i, date_str, cache_key, X_all.iloc[[row]], meta))
+        except Exception as e:
+            logger.error(f"Feature construction failed for {len(uncached)} day(s): {e}")
+    
+    if pending and not force_heuristic:
+        try:
+            clf, reg = load_models(context.db_path)
+            if clf is None or reg is None:
+                raise FileNotFoundError("No models found")
+            
+            required = list(getattr(clf, 'feature_names_in_', []))
+            ml_rows = [p for p in pending if set(required).issubset(p[4])]
+            if ml_rows:
+                feature_rows = [p[4] for p in ml_rows]
+                if isinstance(clf, CompiledEnsemble):
+                    X_batch = None
+                else:
+                    X_batch = pd.DataFrame(feature_rows)
+                probs, pred_pains = _score_ml(clf, reg, X_batch, feature_rows=feature_rows)
+                for (i, date_str, cache_key, _, meta), prob, pain in zip(ml_rows, probs, pred_pains):
+                    results[i] = _ml_result(date_str, prob, pain, meta)
+                    _prediction_cache.set(cache_key, results[i])
+                    _feature_rows.set(cache_key, meta)
+        except Exception as e:
+            logger.warning(f"ML Model unavailable for batch forecast ({e}). Switching to Heuristic Engine.")
+    
+    for i, date_str, cache_key, X, meta in pending:
+        if results[i] is not None:
+            continue
+        try:
+            results[i] = _run_heuristic_fallback(date_str, X, meta, context.db_path, context=context)
+            _prediction_cache.set(cache_key, results[i])
+        except Exception as e:
+            logger.error(f"Prediction failed for {date_str}: {e}")
+    
+    return list(zip(results, cache_keys))
+
+def forecast_entry(date_str, pred):
+    """
+    Compact forecast row for one day's prediction (a low-risk placeholder if it failed).
+    """
+    if pred is not None:
+        prob = float(pred.get('probability', 0.0)) / 100.0
+        risk = pred.get('risk_level', 'Low')
+        pred_pain = float(pred.get('predicted_pain', 0.0))
+    else:
+        prob = 0.1
+        risk = "Low"
+        pred_pain = 0.0
+
+    return {
+        "date": date_str,
+        "risk_probability": round(prob * 100, 1),
+        "risk_level": risk,
+        "predicted_pain": round(pred_pain, 1)
+    }
+
+@metrics.timed("predict.weekly")
+def get_weekly_forecast(start_date=None, db_path=None, context=None, weather_map=None, explain=False):
     """
     Generates a 7-day forecast using Direct Forecasting.
     Each day is predicted independently using the same recent history, 
     isolating the weather impact.
-    """
-    import pandas as pd
-    import numpy as np
     
+    All uncached days are built into one feature matrix and scored with a single
+    predict_proba / predict call (see predict_days), from one history load and
+    one weather fetch. A pre-fetched weather_map (date_str -> features) skips the fetch.
+    Days missing from it take the live per-day path and are cached as live predictions.
+    With explain=True, ML days carry a TreeSHAP 'explanation', computed for all days in one pass.
+    """
     if start_date is None:
         start_date = datetime.datetime.now() + timedelta(days=1)
+    if context is None:
+        context = get_prediction_context(db_path)
     
-    lat, lon = get_latest_location_from_db(db_path)
+    lat, lon = context.location
     
-    weather_map = {}
-    if lat and lon:
-        weather_map = WeatherService.fetch_weekly(start_date, lat, lon)
+    if weather_map is None:
+        weather_map = {}
+        if lat and lon:
+            weather_map = WeatherService.fetch_weekly(start_date, lat, lon)
     
-    # Get history ONCE. We will use this same history for all future days.
-    # This assumes that "Recent History" is constant relative to the forecast window.
-    base_history_df = get_recent_history(db_path, days=60)
+    force_heuristic = context.force_heuristic
+    model_version = None if force_heuristic else _latest_model_version(context.db_path)
     
-    forecasts = []
-    current_date = start_date
+    date_strs = [(start_date + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(7)]
+    fetched = [d for d in date_strs if weather_map.get(d)]
+    predictions = predict_days(context, [(d, weather_map[d]) for d in fetched], model_version)
+    daily_results = {d: pred for d, (pred, _) in zip(fetched, predictions)}
+    cache_keys = {d: key for d, (_, key) in zip(fetched, predictions)}
     
+    missing = [d for d in date_strs if d not in daily_results]
+    if missing:
+        # Not in the weekly fetch (e.g. it failed): fetch per day, as get_prediction_for_date does
+        daily_results.update(_daily_anchors(context, missing))
+        cache_keys.update({d: _prediction_cache_key(context, d, model_version, None) for d in missing})
     
-    # Check Force Heuristic Mode
-    # (Removed redundant check since get_prediction_for_date handles it)
+    forecasts = [forecast_entry(date_str, daily_results.get(date_str)) for date_str in date_strs]
     
-    for i in range(7):
-        date_str = current_date.strftime("%Y-%m-%d")
-        day_weather = weather_map.get(date_str)
-        
-        # Reuse the main prediction pipeline ensures 100% consistency
-        # We inject the pre-fetched weather to avoid N+1 API calls
-        try:
-            pred = get_prediction_for_date(date_str, weather_override=day_weather, db_path=db_path)
-            
-            prob = float(pred.get('probability', 0.0)) / 100.0
-            risk = pred.get('risk_level', 'Low')
-            pred_pain = float(pred.get('predicted_pain', 0.0))
-            
-            # Debug log to verify consistency if needed
-            # logger.info(f"Weekly Day {i}: {prob*100}% ({risk})")
-            
-        except Exception as e:
-            logger.error(f"Weekly Prediction failed for {date_str}: {e}")
-            prob = 0.1
-            risk = "Low"
-            pred_pain = 0.0
-
-        forecasts.append({
-            "date": date_str,
-            "risk_probability": round(prob * 100, 1),
-            "risk_level": risk,
-            "predicted_pain": round(pred_pain, 1)
-        })
-        
-        current_date += timedelta(days=1)
+    if explain and not force_heuristic:
+        explained = []  # (forecast index, feature dict)
+        for i, date_str in enumerate(date_strs):
+            pred = daily_results.get(date_str)
+            if pred is not None and _is_ml_result(pred):
+                meta = _feature_rows.get(cache_keys[date_str])
+                if meta is not None:
+                    explained.append((i, meta))
+        if explained:
+            try:
+                clf, _ = load_models(context.db_path)
+                explanations = _explain_features(clf, [meta for _, meta in explained], model_version)
+                for (i, _), explanation in zip(explained, explanations):
+                    forecasts[i]["explanation"] = explanation
+            except Exception as e:
+                logger.warning(f"Weekly explanation failed: {e}")
         
     return forecasts
 
-def get_hourly_forecast(start_date_str, db_path=None):
-    if db_path is None: db_path = get_db_path()
+def _circadian_priors(context):
+    """
+    24h onset prior from the persisted histogram (served from memory), or from the
+    context's history if the database has none. The optional 'circadian_half_life_days'
+    setting makes recent onsets weigh more.
+    """
+    half_life = circadian_store.HALF_LIFE_DAYS
+    try:
+        value = float(context.settings.get('circadian_half_life_days', ''))
+        if value > 0:
+            half_life = value
+    except (TypeError, ValueError):
+        pass
+    try:
+        priors = circadian_store.get_priors(context.db_path, half_life)
+    except Exception as e:
+        logger.warning(f"Circadian histogram unavailable ({e}); using recent history.")
+        priors = None
+    if priors is None:
+        priors = FeatureEngine.get_circadian_priors(context.history)
+    return priors
+
+@metrics.timed("predict.hourly")
+def get_hourly_forecast(start_date_str, db_path=None, context=None, hourly_weather=None):
+    """
+    Hourly risk for the 24h from start_date_str, calibrated against the daily ML prediction.
+    A pre-fetched hourly_weather list skips the fetch.
+    """
     import pandas as pd
     from .heuristic_predictor import HeuristicPredictor
     
     if start_date_str is None:
         start_date_str = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
 
+    if context is None:
+        context = get_prediction_context(db_path)
+    db_path = context.db_path
+
     start_dt = pd.to_datetime(start_date_str)
-    lat, lon = get_latest_location_from_db(db_path)
+    lat, lon = context.location
     if not lat: lat, lon = 34.05, -118.25 # Default LA
     
-    full_hourly_weather = WeatherService.fetch_hourly(start_dt, lat, lon, hours=24)
-    history_df = get_recent_history(db_path)
-    circadian_priors = FeatureEngine.get_circadian_priors(history_df)
+    if hourly_weather is None:
+        hourly_weather = WeatherService.fetch_hourly(start_dt, lat, lon, hours=24)
+    full_hourly_weather = hourly_weather
+    circadian_priors = _circadian_priors(context)
     
     # Init Heuristic
     predictor = HeuristicPredictor() # Load priors properly if needed
@@ -378,13 +970,16 @@ def get_hourly_forecast(start_date_str, db_path=None):
             daily_groups[d_key] = []
         daily_groups[d_key].append(idx)
 
+    # Daily ML Predictions (The Anchors), every day of the window in one batch
+    try:
+        anchors = _daily_anchors(context, list(daily_groups))
+    except Exception as e:
+        logger.warning(f"Hourly calibration anchors failed: {e}")
+        anchors = {}
+
     for date_key, indices in daily_groups.items():
         try:
-            # Fetch Daily ML Prediction (The Anchor)
-            # We call the main prediction function which uses ML models
-            # NOTE: Recursive check - get_prediction_for_date does NOT call get_hourly_forecast_recursive or similar
-            # so this is safe.
-            daily_pred = get_prediction_for_date(date_key, db_path=db_path)
+            daily_pred = anchors.get(date_key)
             
             if daily_pred and daily_pred.get('probability') is not None:
                 daily_prob = float(daily_pred['probability']) # 0-100
@@ -0,0 +1,172 @@
+"""
+model_registry.py
+Manifest-backed registry for trained model artifacts.
+
+Training writes each clf/reg pair under temporary names and renames them into
+place. It then promotes the pair by atomically replacing `manifest.json`.
+Inference only stats the manifest and re-reads it when its stamp changes. It
+never globs the model directory and never sees a half-written pair.
+
+Each database (profile) has its own model directory (see namespace_dir), so
+profiles never train over or predict from each other's models.
+
+Manifest layout:
+  {
+    "version": "1712345678",
+    "trained_at": 1712345678.0,
+    "features": [...],            # columns offered to feature selection
+    "selected_features": [...],   # columns the models were fitted on
+    "cv_metrics": {...} | null,
+    "files": {"clf": {"path": ..., "sha256": ...}, "reg": {...},
+              "compiled_clf": {...}, "compiled_reg": {...}},  # compiled_* optional
+    "previous": [<older version entries kept on disk>]
+  }
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+KEEP_VERSIONS = 2  # current + one previous, so a rollback target always exists
+# The default database keeps the root model directory, so existing models stay valid
+DEFAULT_DB_NAME = 'migraine_log.db'
+PROFILES_DIR = 'profiles'
+
+
+def namespace_dir(root: str, db_path: Optional[str] = None) -> str:
+    """
+    Model directory for a database: root for the default database (or None),
+    root/profiles/<db name> for every other profile.
+    """
+    if not db_path or os.path.basename(db_path) == DEFAULT_DB_NAME:
+        return root
+    name = os.path.splitext(os.path.basename(db_path))[0]
+    return os.path.join(root, PROFILES_DIR, name)
+
+
+def manifest_path(model_dir: str) -> str:
+    return os.path.join(model_dir, MANIFEST_NAME)
+
+
+def manifest_stamp(model_dir: str) -> Optional[Tuple[int, int]]:
+    """
+    Cheap change marker for the manifest: (mtime_ns, size), or None if absent.
+    """
+    try:
+        st = os.stat(manifest_path(model_dir))
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+
+def read_manifest(model_dir: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(manifest_path(model_dir), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        if not isinstance(e, FileNotFoundError):
+            logger.error(f"Could not read model manifest: {e}")
+        return None
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _atomic_write_json(path: str, payload: Dict[str, Any]) -> None:
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(prefix='.manifest.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(payload, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _dump_atomically(dump: Callable[[Any, str], Any], obj: Any, final_path: str) -> None:
+    tmp_path = final_path + '.tmp'
+    dump(obj, tmp_path)
+    os.replace(tmp_path, final_path)
+
+
+def verify_files(model_dir: str, entry: Dict[str, Any]) -> bool:
+    """
+    True if every artifact listed in a manifest entry exists and matches its hash.
+    """
+    for name, info in entry.get('files', {}).items():
+        path = os.path.join(model_dir, info['path'])
+        if not os.path.exists(path):
+            logger.error(f"Model artifact missing: {info['path']}")
+            return False
+        if info.get('sha256') and file_sha256(path) != info['sha256']:
+            logger.error(f"Model artifact hash mismatch: {info['path']}")
+            return False
+    return True
+
+
+def promote(model_dir: str, version: str, artifacts: Dict[str, Any], dump: Callable[[Any, str], Any],
+            features: List[str], selected_features: List[str],
+            cv_metrics: Optional[Dict[str, Any]] = None, trained_at: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Saves each artifact (e.g. {'clf': model, 'reg': model}) as best_model_<name>_<version>.pkl,
+    then atomically switches the manifest to the new version and prunes
+    versions beyond KEEP_VERSIONS. Returns the new manifest.
+    """
+    import time
+
+    os.makedirs(model_dir, exist_ok=True)
+
+    files = {}
+    for name, obj in artifacts.items():
+        filename = f'best_model_{name}_{version}.pkl'
+        final_path = os.path.join(model_dir, filename)
+        _dump_atomically(dump, obj, final_path)
+        files[name] = {'path': filename, 'sha256': file_sha256(final_path)}
+
+    previous_manifest = read_manifest(model_dir)
+    history = []
+    if previous_manifest:
+        prior = {k: v for k, v in previous_manifest.items() if k != 'previous'}
+        history = [prior] + previous_manifest.get('previous', [])
+
+    retained = history[:KEEP_VERSIONS - 1]
+    expired = history[KEEP_VERSIONS - 1:]
+
+    manifest = {
+        'version': version,
+        'trained_at': trained_at if trained_at is not None else time.time(),
+        'features': list(features),
+        'selected_features': list(selected_features),
+        'cv_metrics': cv_metrics,
+        'files': files,
+        'previous': retained,
+    }
+    _atomic_write_json(manifest_path(model_dir), manifest)
+
+    # Only prune after the new manifest is live, and never a file still referenced.
+    live_paths = {info['path'] for entry in [manifest] + retained for info in entry['files'].values()}
+    for entry in expired:
+        for info in entry.get('files', {}).values():
+            if info['path'] in live_paths:
+                continue
+            try:
+                os.remove(os.path.join(model_dir, info['path']))
+            except OSError:
+                pass
+
+    return manifest
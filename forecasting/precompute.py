@@ -0,0 +1,285 @@
+"""
+precompute.py
+Background precomputation of the dashboard forecasts.
+
+A single daemon worker keeps three products warm per tracked database:
+  'future'   — tomorrow's daily prediction   (GET /prediction/future)
+  'forecast' — the 7-day forecast            (GET /prediction/forecast)
+  'hourly'   — the next-24h hourly forecast  (GET /prediction/hourly)
+
+Snapshots are recomputed when:
+  - entries or settings change (clear_prediction_cache -> mark_dirty),
+  - a retrained model is promoted (model version no longer matches),
+  - the local day (or, for 'hourly', the local hour) rolls over,
+  - WEATHER_REFRESH_SECONDS have passed since the last computation.
+
+Stale-while-revalidate: a snapshot that is stale for any reason except a
+day/hour rollover (its dates would be wrong) is still served, flagged stale,
+for up to MAX_STALE_SECONDS while a background refresh replaces it.
+
+Public API:
+  start() / stop()
+  track(db_path)
+  lookup(db_path, product) -> Snapshot | None
+  begin(db_path, product) / store(token, result) -> Snapshot
+  mark_dirty(db_path=None)
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PRODUCTS = ('future', 'forecast', 'hourly')
+
+# Live weather is re-fetched at most this often per database
+WEATHER_REFRESH_SECONDS = 1800
+# Databases (profiles) kept warm; the least recently requested one is dropped first
+MAX_TRACKED_DBS = 8
+# Serve the last good result while refreshing in the background, instead of blocking
+STALE_WHILE_REVALIDATE = True
+MAX_STALE_SECONDS = 6 * 3600
+
+_lock = threading.Lock()
+_wakeup = threading.Event()
+_stop = threading.Event()
+_worker: Optional[threading.Thread] = None
+
+_tracked: "OrderedDict[str, None]" = OrderedDict()
+_snapshots: Dict[Tuple[str, str], Dict[str, Any]] = {}
+# Bumped by mark_dirty; a computation started under an older generation is discarded
+_generations: Dict[str, int] = {}
+# (db_path, product) pairs with a background revalidation running
+_inflight = set()
+
+
+class Snapshot(NamedTuple):
+    result: Any
+    computed_at: float  # epoch seconds
+    stale: bool
+
+    @property
+    def age_seconds(self) -> float:
+        return max(0.0, time.time() - self.computed_at)
+
+
+def _period(product: str, now: datetime) -> str:
+    """Local day for the daily products, local hour for the hourly one."""
+    return now.strftime('%Y-%m-%d %H' if product == 'hourly' else '%Y-%m-%d')
+
+
+def _model_version(db_path: str) -> Optional[str]:
+    from forecasting.inference import _latest_model_version
+    return _latest_model_version(db_path)
+
+
+def _is_fresh(snapshot: Dict[str, Any], product: str, now: datetime, model_version: Optional[str]) -> bool:
+    return (
+        not snapshot['invalidated']
+        and snapshot['period'] == _period(product, now)
+        and snapshot['model_version'] == model_version
+        and time.time() - snapshot['computed_at'] < WEATHER_REFRESH_SECONDS
+    )
+
+def _is_servable_stale(snapshot: Dict[str, Any], product: str, now: datetime) -> bool:
+    """A stale snapshot may still be shown while it describes the right day/hour."""
+    return (
+        STALE_WHILE_REVALIDATE
+        and snapshot['period'] == _period(product, now)
+        and time.time() - snapshot['computed_at'] < MAX_STALE_SECONDS
+    )
+
+
+def _compute(db_path: str, product: str) -> Any:
+    from forecasting import inference
+
+    if product == 'future':
+        tomorrow = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
+        return inference.get_prediction_for_date(tomorrow, db_path=db_path)
+    if product == 'forecast':
+        return inference.get_weekly_forecast(datetime.now() + timedelta(days=1), db_path=db_path)
+    if product == 'hourly':
+        return inference.get_hourly_forecast(None, db_path=db_path)
+    raise ValueError(f"Unknown product: {product}")
+
+
+def begin(db_path: str, product: str) -> Tuple[str, str, int, str, Optional[str]]:
+    """
+    Captures the inputs' generation before a computation; pass the token to store().
+    """
+    with _lock:
+        generation = _generations.get(db_path, 0)
+    return (db_path, product, generation, _period(product, datetime.now()), _model_version(db_path))
+
+
+def store(token: Tuple[str, str, int, str, Optional[str]], result: Any) -> Snapshot:
+    """
+    Stores a computed result as the product's snapshot, unless the database was
+    invalidated while it was being computed.
+    """
+    db_path, product, generation, period, model_version = token
+    computed_at = time.time()
+    with _lock:
+        if _generations.get(db_path, 0) != generation:
+            logger.debug(f"Discarding {product} snapshot for {db_path}: inputs changed mid-computation.")
+        else:
+            _snapshots[(db_path, product)] = {
+                'result': result,
+                'computed_at': computed_at,
+                'period': period,
+                'model_version': model_version,
+                'invalidated': False,
+            }
+    return Snapshot(result, computed_at, False)
+
+
+def refresh(db_path: str, product: str) -> Optional[Any]:
+    """
+    Computes one product and stores it as a snapshot. Returns the result.
+    """
+    token = begin(db_path, product)
+    result = _compute(db_path, product)
+    store(token, result)
+    return result
+
+
+def revalidate(db_path: str, product: str) -> None:
+    """
+    Refreshes one snapshot on a background thread; at most one refresh per product runs at a time.
+    """
+    key = (db_path, product)
+    with _lock:
+        if key in _inflight:
+            return
+        _inflight.add(key)
+
+    def _job():
+        try:
+            refresh(db_path, product)
+        except Exception as e:
+            logger.warning(f"Revalidation of {product} failed for {db_path}: {e}")
+        finally:
+            with _lock:
+                _inflight.discard(key)
+
+    threading.Thread(target=_job, daemon=True, name="forecast-revalidate").start()
+
+
+def lookup(db_path: str, product: str) -> Optional[Snapshot]:
+    """
+    Returns the product's snapshot if it can be served, else None (caller computes inline).
+    A stale but servable snapshot is returned flagged stale and refreshed in the background.
+    """
+    with _lock:
+        snapshot = _snapshots.get((db_path, product))
+    if snapshot is None:
+        return None
+
+    now = datetime.now()
+    if _is_fresh(snapshot, product, now, _model_version(db_path)):
+        return Snapshot(snapshot['result'], snapshot['computed_at'], False)
+    if _is_servable_stale(snapshot, product, now):
+        revalidate(db_path, product)
+        return Snapshot(snapshot['result'], snapshot['computed_at'], True)
+    return None
+
+
+def track(db_path: str) -> None:
+    """
+    Registers a database to be kept warm. New databases wake the worker.
+    """
+    with _lock:
+        is_new = db_path not in _tracked
+        _tracked[db_path] = None
+        _tracked.move_to_end(db_path)
+        while len(_tracked) > MAX_TRACKED_DBS:
+            dropped, _ = _tracked.popitem(last=False)
+            for product in PRODUCTS:
+                _snapshots.pop((dropped, product), None)
+    if is_new:
+        _wakeup.set()
+
+
+def mark_dirty(db_path: Optional[str] = None) -> None:
+    """
+    Marks snapshots for one database (or all of them) stale and schedules a recompute.
+    Stale snapshots stay servable under STALE_WHILE_REVALIDATE until replaced.
+    """
+    with _lock:
+        if db_path is None:
+            targets = set(_tracked) | {path for path, _ in _snapshots}
+        else:
+            targets = {db_path}
+        for path in targets:
+            _generations[path] = _generations.get(path, 0) + 1
+            for product in PRODUCTS:
+                snapshot = _snapshots.get((path, product))
+                if snapshot is not None:
+                    snapshot['invalidated'] = True
+    _wakeup.set()
+
+
+def _seconds_until_next_hour(now: datetime) -> float:
+    next_hour = (now + timedelta(hours=1)).replace(minute=0, second=0, microsecond=0)
+    return max(1.0, (next_hour - now).total_seconds())
+
+
+def _run_once() -> None:
+    with _lock:
+        db_paths = list(_tracked)
+    now = datetime.now()
+    for db_path in db_paths:
+        model_version = _model_version(db_path)
+        for product in PRODUCTS:
+            if _stop.is_set():
+                return
+            with _lock:
+                snapshot = _snapshots.get((db_path, product))
+            if snapshot is not None and _is_fresh(snapshot, product, now, model_version):
+                continue
+            try:
+                refresh(db_path, product)
+            except Exception as e:
+                logger.warning(f"Precompute of {product} failed for {db_path}: {e}")
+
+
+def _worker_loop() -> None:
+    logger.info("Forecast precompute worker started.")
+    while not _stop.is_set():
+        _wakeup.clear()
+        _run_once()
+        # Sleep until the next local hour (covers midnight) or the weather refresh, whichever is first
+        timeout = min(_seconds_until_next_hour(datetime.now()), WEATHER_REFRESH_SECONDS)
+        _wakeup.wait(timeout)
+    logger.info("Forecast precompute worker stopped.")
+
+
+def start(default_db_path: Optional[str] = None) -> None:
+    """
+    Starts the worker thread (idempotent). Called from the API lifespan, not on import.
+    """
+    global _worker
+    if default_db_path:
+        track(default_db_path)
+    if _worker is not None and _worker.is_alive():
+        return
+    _stop.clear()
+    _worker = threading.Thread(target=_worker_loop, daemon=True, name="forecast-precompute")
+    _worker.start()
+
+
+def stop(timeout: float = 5.0) -> None:
+    global _worker
+    _stop.set()
+    _wakeup.set()
+    if _worker is not None:
+        _worker.join(timeout)
+    _worker = None
+
+
+def is_running() -> bool:
+    return _worker is not None and _worker.is_alive()
@@ -0,0 +1,96 @@
+"""
+prediction_cache.py
+Bounded, TTL-aware LRU cache for prediction results.
+
+Entries are keyed by a tuple (the caller decides the shape) so results for
+different databases, model versions or settings never collide.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class PredictionCache:
+    """
+    Thread-safe LRU cache with a per-entry time-to-live.
+
+    - get() returns None on a miss or on an expired entry (expired entries are dropped).
+    - set() evicts the least-recently-used entry once max_entries is exceeded.
+    - Hit / miss / eviction / expiration counters are exposed via stats().
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            if time.monotonic() >= entry["expires_at"]:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry["result"]
+
+    def set(self, key: Hashable, result: Any, ttl_seconds: Optional[float] = None) -> None:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            self._entries[key] = {
+                "result": result,
+                "expires_at": time.monotonic() + ttl,
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, db_path: Optional[str] = None) -> None:
+        """
+        Drop every entry, or only those whose key starts with db_path.
+        """
+        with self._lock:
+            if db_path is None:
+                self._entries.clear()
+                return
+            stale = [k for k in self._entries if isinstance(k, tuple) and k and k[0] == db_path]
+            for k in stale:
+                del self._entries[k]
+
+    def clear(self) -> None:
+        self.invalidate()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
@@ -0,0 +1,45 @@
+"""
+prediction_context.py
+Request-scoped snapshot of the database inputs used by the forecast functions.
+
+One context holds the recent history, the latest known location and the raw
+user settings, so daily, weekly and hourly forecasts built from it read SQLite
+once instead of once per day / per helper.
+"""
+
+from typing import Any, Dict, Optional, Tuple
+
+
+class PredictionContext:
+    def __init__(self, db_path: str, history: Any, location: Tuple[Optional[float], Optional[float]], settings: Dict[str, Any],
+                 pain_map: Optional[Dict[Any, float]] = None):
+        self.db_path = db_path
+        self.history = history
+        self.location = location
+        self.settings = settings
+        # Recent daily max pain by date from the feature store; None means derive lags from history
+        self.pain_map = pain_map
+
+    @property
+    def force_heuristic(self) -> bool:
+        return str(self.settings.get('force_heuristic_mode', '')).lower() == 'true'
+
+    @property
+    def settings_version(self) -> int:
+        """
+        Stable fingerprint of the user settings, so edited priors never reuse stale results.
+        """
+        return hash(tuple(sorted((str(k), str(v)) for k, v in self.settings.items())))
+
+    @property
+    def user_priors(self) -> Dict[str, float]:
+        """
+        Numeric settings only (heuristic sensitivities); text flags are skipped.
+        """
+        priors = {}
+        for key, value in self.settings.items():
+            try:
+                priors[key] = float(value)
+            except (TypeError, ValueError):
+                pass
+        return priors
@@ -27,12 +27,19 @@ _training_lock = threading.Lock()
 _is_training = False  # Readable by the status endpoint without acquiring lock
 
 
-def _get_latest_model_mtime() -> float | None:
+def _get_latest_model_mtime(db_path: str | None = None) -> float | None:
     """
-    Return the modification time of the most-recently-saved classifier .pkl,
-    or None if no model files exist yet.
+    Return the training time of db_path's promoted model (from the manifest),
+    falling back to the mtime of the newest classifier .pkl for pre-manifest
+    models. Returns None if no model files exist yet.
     """
-    pattern = os.path.join(_MODEL_DIR, 'best_model_clf_*.pkl')
+    from forecasting.model_registry import namespace_dir, read_manifest
+    model_dir = namespace_dir(_MODEL_DIR, db_path)
+    manifest = read_manifest(model_dir)
+    if manifest and manifest.get('trained_at') is not None:
+        return float(manifest['trained_at'])
+
+    pattern = os.path.join(model_dir, 'best_model_clf_*.pkl')
     files = sorted(glob.glob(pattern), reverse=True)
     if not files:
         return None
@@ -48,7 +55,7 @@ def get_entries_since_last_training(db_path: str) -> int:
     - If a model exists, returns rows whose Date is strictly after the
       model's mtime converted to a YYYY-MM-DD string.
     """
-    mtime = _get_latest_model_mtime()
+    mtime = _get_latest_model_mtime(db_path)
 
     try:
         conn = sqlite3.connect(db_path)
@@ -69,12 +76,12 @@ def get_entries_since_last_training(db_path: str) -> int:
         return 0
 
 
-def get_last_trained_date() -> str | None:
+def get_last_trained_date(db_path: str | None = None) -> str | None:
     """
     Return the last-trained date as a YYYY-MM-DD string, derived from
     the mtime of the most recent classifier file. Returns None if no model.
     """
-    mtime = _get_latest_model_mtime()
+    mtime = _get_latest_model_mtime(db_path)
     if mtime is None:
         return None
     return datetime.fromtimestamp(mtime).strftime('%Y-%m-%d')
@@ -101,7 +108,7 @@ def run_training_safely(db_path: str) -> bool:
         from forecasting.train_model import train_and_evaluate
         from forecasting.inference import clear_prediction_cache
         train_and_evaluate(db_path=db_path)
-        clear_prediction_cache()
+        clear_prediction_cache(db_path)
         logger.info("Background model training completed successfully and prediction cache cleared.")
         return True
     except Exception as e:
@@ -0,0 +1,218 @@
+"""
+simulator.py — Issue #63
+Batched "what-if" simulation over a Cartesian grid of feature overrides.
+
+The grid is never materialised as Python objects: flat grid indices are
+unravelled chunk by chunk into one NumPy matrix (base feature row + overridden
+columns + recomputed derived columns) and scored with the compiled classifier.
+An 80,640-point grid (see documentation/model_optimization_study.md) scores
+in a handful of vectorised batches instead of 80,640 predict_proba calls.
+
+Public API:
+  simulate(ensemble, base_features, overrides, surface_axes=None) -> dict
+  run_simulation(target_date_str, overrides, surface_axes=None, db_path=None, context=None, live_weather=None) -> dict
+"""
+
+import logging
+import math
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Features a caller may sweep
+SIMULATION_FEATURES = (
+    'tavg', 'pres', 'pres_change', 'average_humidity',
+    'Sleep', 'Physical Activity', 'Pain_Lag_1', 'DayOfWeek'
+)
+ALIASES = {'humidity': 'average_humidity'}
+
+MAX_GRID_POINTS = 500_000
+MAX_AXIS_VALUES = 500
+CHUNK_ROWS = 16384
+SURFACE_MAX_POINTS = 25
+
+
+class ModelUnavailableError(RuntimeError):
+    """Raised when no trained classifier exists to simulate against."""
+
+
+def _derived_columns(values: Dict[str, Any], base: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Features construct_features derives from the sweepable ones, recomputed for the
+    swept values. Only features whose sources are swept are returned.
+    """
+    import numpy as np
+    from forecasting import feature_spec
+
+    derived = {}
+    if 'tavg' in values or 'average_humidity' in values:
+        # Sources missing from the base row are NaN, as at inference; the spec's expression handles them
+        sources = {
+            name: np.asarray(values[name] if name in values else base.get(name, np.nan), dtype=np.float64)
+            for name in ('average_humidity', 'tavg')
+        }
+        derived['humid.*tavg'] = feature_spec.evaluate('humid.*tavg', sources)
+    if 'tavg' in values:
+        derived['tavg_lag1'] = values['tavg']
+    if 'DayOfWeek' in values:
+        derived['DayOfWeek_sin'] = np.sin(2 * np.pi * values['DayOfWeek'] / 7)
+        derived['DayOfWeek_cos'] = np.cos(2 * np.pi * values['DayOfWeek'] / 7)
+    if 'Pain_Lag_1' in values:
+        # Rolling means include yesterday: shift them by its share of the window
+        delta = values['Pain_Lag_1'] - float(base.get('Pain_Lag_1', 0.0))
+        for window in (3, 7, 30):
+            name = f'Pain_Rolling_Mean_{window}'
+            derived[name] = float(base.get(name, 0.0)) + delta / window
+    return derived
+
+
+def axis_values(spec) -> "Any":
+    """
+    Grid values for one override: a list of values, or a {start, stop, step} range (stop inclusive).
+    """
+    import numpy as np
+
+    if isinstance(spec, dict) or hasattr(spec, 'step'):
+        get = spec.get if isinstance(spec, dict) else lambda k: getattr(spec, k)
+        start, stop, step = float(get('start')), float(get('stop')), float(get('step'))
+        if step <= 0 or stop < start:
+            raise ValueError("Ranges need step > 0 and stop >= start")
+        count = int(math.floor((stop - start) / step + 1e-9)) + 1
+        if count > MAX_AXIS_VALUES:
+            raise ValueError(f"A range may produce at most {MAX_AXIS_VALUES} values")
+        return start + step * np.arange(count)
+
+    values = np.asarray(list(spec), dtype=np.float64)
+    if values.size == 0:
+        raise ValueError("Override value lists must not be empty")
+    if values.size > MAX_AXIS_VALUES:
+        raise ValueError(f"An override list may hold at most {MAX_AXIS_VALUES} values")
+    return values
+
+
+def _downsample(n: int, max_points: int) -> "Any":
+    import numpy as np
+    if n <= max_points:
+        return np.arange(n)
+    return np.unique(np.linspace(0, n - 1, max_points).round().astype(np.int64))
+
+
+def _round_pct(p) -> float:
+    return round(float(p) * 100, 1)
+
+
+def simulate(ensemble, base_features: Dict[str, Any], overrides: Dict[str, Any],
+             surface_axes: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Scores every combination of the override values on top of base_features.
+
+    Returns the grid size, base probability, the argmax combination, per-axis
+    marginals (mean / max probability at each value) and a downsampled
+    (mean probability) response surface over two axes. Probabilities are percentages.
+    """
+    import numpy as np
+
+    if not overrides:
+        raise ValueError("At least one override is required")
+
+    axes = []
+    axis_vals = []
+    for name, spec in overrides.items():
+        name = ALIASES.get(name, name)
+        if name not in SIMULATION_FEATURES:
+            raise ValueError(f"Unsupported override '{name}'. Allowed: {', '.join(SIMULATION_FEATURES)}")
+        if name in axes:
+            raise ValueError(f"Duplicate override '{name}'")
+        axes.append(name)
+        axis_vals.append(axis_values(spec))
+
+    shape = tuple(len(v) for v in axis_vals)
+    total = int(np.prod(shape))
+    if total > MAX_GRID_POINTS:
+        raise ValueError(f"Grid has {total} points; the limit is {MAX_GRID_POINTS}")
+
+    names = list(ensemble.feature_names_in_)
+    columns = {name: i for i, name in enumerate(names)}
+    base_row = np.array([base_features.get(name, np.nan) for name in names], dtype=np.float64)
+
+    probs = np.empty(total)
+    for start in range(0, total, CHUNK_ROWS):
+        stop = min(start + CHUNK_ROWS, total)
+        coords = np.unravel_index(np.arange(start, stop), shape)
+        values = {axis: vals[idx] for axis, vals, idx in zip(axes, axis_vals, coords)}
+
+        matrix = np.repeat(base_row[np.newaxis, :], stop - start, axis=0)
+        for name, column in {**values, **_derived_columns(values, base_features)}.items():
+            if name in columns:
+                matrix[:, columns[name]] = column
+        probs[start:stop] = ensemble.predict_proba(matrix)[:, 1]
+
+    grid = probs.reshape(shape)
+    best = np.unravel_index(int(np.argmax(probs)), shape)
+
+    marginals = {}
+    for k, (axis, vals) in enumerate(zip(axes, axis_vals)):
+        others = tuple(j for j in range(len(axes)) if j != k)
+        means = grid.mean(axis=others) if others else grid
+        maxes = grid.max(axis=others) if others else grid
+        marginals[axis] = [
+            {"value": float(v), "mean_probability": _round_pct(m), "max_probability": _round_pct(x)}
+            for v, m, x in zip(vals, means, maxes)
+        ]
+
+    surface = None
+    if surface_axes is None:
+        # The two axes with the most values, in request order on ties
+        ranked = sorted(range(len(axes)), key=lambda k: -shape[k])
+        surface_axes = [axes[k] for k in sorted(ranked[:2])]
+    surface_axes = [ALIASES.get(a, a) for a in surface_axes]
+    if len(surface_axes) == 2 and all(a in axes for a in surface_axes) and surface_axes[0] != surface_axes[1]:
+        kx, ky = axes.index(surface_axes[0]), axes.index(surface_axes[1])
+        others = tuple(j for j in range(len(axes)) if j not in (kx, ky))
+        plane = grid.mean(axis=others) if others else grid
+        if kx > ky:
+            plane = plane.T
+        xi = _downsample(shape[kx], SURFACE_MAX_POINTS)
+        yi = _downsample(shape[ky], SURFACE_MAX_POINTS)
+        surface = {
+            "x_axis": surface_axes[0],
+            "y_axis": surface_axes[1],
+            "x_values": [float(v) for v in axis_vals[kx][xi]],
+            "y_values": [float(v) for v in axis_vals[ky][yi]],
+            "mean_probability": [[_round_pct(p) for p in row] for row in plane[np.ix_(xi, yi)]],
+        }
+
+    return {
+        "grid_size": total,
+        "axes": axes,
+        "base_probability": _round_pct(ensemble.predict_proba(base_row[np.newaxis, :])[0, 1]),
+        "argmax": {
+            "probability": _round_pct(grid[best]),
+            "values": {axis: float(axis_vals[k][best[k]]) for k, axis in enumerate(axes)},
+        },
+        "marginals": marginals,
+        "surface": surface,
+    }
+
+
+def run_simulation(target_date_str: str, overrides: Dict[str, Any], surface_axes: Optional[List[str]] = None,
+                   db_path: Optional[str] = None, context=None, live_weather=None) -> Dict[str, Any]:
+    """
+    Simulates around the real feature row for target_date_str (history + forecast weather).
+    Raises ModelUnavailableError if no trained model is available.
+    """
+    from forecasting import inference
+
+    if context is None:
+        context = inference.get_prediction_context(db_path)
+
+    clf, _ = inference.load_models(context.db_path)
+    if clf is None:
+        raise ModelUnavailableError("No trained model available for simulation")
+    ensemble = inference._explainable(clf)
+
+    _, base_features = inference.build_daily_features(target_date_str, context, live_weather=live_weather)
+    result = simulate(ensemble, base_features, overrides, surface_axes)
+    result["date"] = target_date_str
+    result["model_version"] = inference._latest_model_version(context.db_path)
+    return result
@@ -17,12 +17,18 @@ except ImportError:
 
 # Import data processing
 try:
-    from forecasting.data_loader import merge_migraine_and_weather_data, process_combined_data
+    from forecasting.data_loader import combined_cache_dir, load_combined_data, process_combined_data
     from forecasting.feature_engine import FeatureEngine
+    from forecasting import model_registry
+    from forecasting import feature_store
+    from forecasting import feature_spec
 except ImportError:
     # Fallback for running as script directly
-    from data_loader import merge_migraine_and_weather_data, process_combined_data
+    from data_loader import combined_cache_dir, load_combined_data, process_combined_data
     from feature_engine import FeatureEngine
+    import model_registry
+    import feature_store
+    import feature_spec
 
 # Paths
 import sys
@@ -36,6 +42,10 @@ os.makedirs(MODEL_DIR, exist_ok=True)
 MODEL_CLF_PATH = os.path.join(MODEL_DIR, 'best_model_clf.pkl')
 MODEL_REG_PATH = os.path.join(MODEL_DIR, 'best_model_reg.pkl')
 
+def get_model_dir(db_path=None):
+    """Per-database model directory (see model_registry.namespace_dir)."""
+    return model_registry.namespace_dir(MODEL_DIR, db_path)
+
 class ModelConfig:
     def __init__(self):
         self.clf_params = {
@@ -61,24 +71,85 @@ class ModelConfig:
             'Time'
         ]
 
+def export_compiled_ensemble(estimator):
+    """
+    Flattens a fitted HistGradientBoostingClassifier (binary) or HistGradientBoostingRegressor
+    (squared error) into contiguous NumPy node arrays for forecasting.inference.CompiledEnsemble.
+
+    Every tree's nodes are concatenated; child indices are rebased to global positions
+    and `roots` holds the index of each tree's root. Thresholds are the raw-value
+    split points (num_threshold), so rows are scored without re-binning.
+    """
+    from sklearn._loss.loss import HalfBinomialLoss, HalfSquaredError
+
+    if isinstance(estimator._loss, HalfBinomialLoss):
+        loss = 'binomial'
+    elif isinstance(estimator._loss, HalfSquaredError):
+        loss = 'squared_error'
+    else:
+        raise ValueError(f"Unsupported loss for compilation: {type(estimator._loss).__name__}")
+
+    if any(len(iteration) != 1 for iteration in estimator._predictors):
+        raise ValueError("Only single-output ensembles can be compiled")
+
+    node_arrays = [iteration[0].nodes for iteration in estimator._predictors]
+    if any(nodes['is_categorical'].any() for nodes in node_arrays):
+        raise ValueError("Categorical splits are not supported by the compiled scorer")
+
+    sizes = np.array([len(nodes) for nodes in node_arrays], dtype=np.int64)
+    roots = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int64)
+    offsets = np.repeat(roots, sizes)
+    nodes = np.concatenate(node_arrays)
+
+    is_leaf = nodes['is_leaf'].astype(bool)
+    # Leaves point at themselves so traversal can run a fixed number of steps
+    own_index = np.arange(len(nodes), dtype=np.int64)
+    left = np.where(is_leaf, own_index, nodes['left'].astype(np.int64) + offsets)
+    right = np.where(is_leaf, own_index, nodes['right'].astype(np.int64) + offsets)
+
+    if hasattr(estimator, 'feature_names_in_'):
+        feature_names = np.asarray(estimator.feature_names_in_, dtype=str)
+    else:
+        feature_names = np.asarray([f'x{i}' for i in range(estimator.n_features_in_)], dtype=str)
+
+    return {
+        'loss': loss,
+        'baseline': float(np.ravel(estimator._baseline_prediction)[0]),
+        'feature_names': feature_names,
+        'classes': np.asarray(getattr(estimator, 'classes_', [])),
+        'max_depth': int(nodes['depth'].max()),
+        'roots': roots,
+        'feature': nodes['feature_idx'].astype(np.int64),
+        'threshold': nodes['num_threshold'].astype(np.float64),
+        'missing_left': nodes['missing_go_to_left'].astype(bool),
+        'left': left,
+        'right': right,
+        'is_leaf': is_leaf,
+        'value': nodes['value'].astype(np.float64),
+        'count': nodes['count'].astype(np.float64),
+    }
+
 class TrainingManager:
     def __init__(self, config=None):
         self.config = config or ModelConfig()
         self.clf = HistGradientBoostingClassifier(**self.config.clf_params)
         self.reg = HistGradientBoostingRegressor(**self.config.reg_params)
+        self.cv_metrics = None
     
     def load_and_prepare_data(self, db_path=None):
         print("Step 1: Merging and Processing Data...")
         if db_path:
-            combined_df = merge_migraine_and_weather_data(db_path=db_path, return_df=True)
-            df = process_combined_data(input_df=combined_df)
+            # Daily rows and pain lags are maintained incrementally in the feature store
+            daily_df = feature_store.load_training_frame(db_path)
+            df = process_combined_data(input_df=daily_df, lags_precomputed=True)
         else:
-            merge_migraine_and_weather_data()
-            df = process_combined_data()
+            combined = load_combined_data(cache_dir=combined_cache_dir)
+            df = process_combined_data(input_df=combined)
             
         print(f"Data Loaded: {len(df)} days of history.")
         
-        feature_cols = [c for c in df.columns if c not in self.config.exclude_cols]
+        # Only columns the feature spec defines, i.e. that inference can reproduce
+        feature_cols = [c for c in feature_spec.training_columns(df.columns) if c not in self.config.exclude_cols]
         X = df[feature_cols]
         y_reg = df['Pain_Level_Log']
         y_bin = df['Pain_Level_Binary']
@@ -176,12 +247,21 @@ class TrainingManager:
         print(f"Avg Accuracy: {np.mean(acc_scores):.4f}")
         print(f"Avg MAE: {np.mean(combined_mae_scores):.4f}")
         
+        # Recorded in the model manifest at promotion
+        self.cv_metrics = {
+            'folds': len(acc_scores),
+            'accuracy': float(np.mean(acc_scores)),
+            'mae': float(np.mean(combined_mae_scores)),
+            'thresholds': [float(t) for t in thresholds],
+        }
+        
         return acc_scores, combined_mae_scores
 
-    def train_final_and_save(self, X, y_bin, y_reg, sample_weights):
+    def train_final_and_save(self, X, y_bin, y_reg, sample_weights, db_path=None):
         print("\nTraining Final Models on All Data...")
         
         # Feature selection on full training data
+        all_features = list(X.columns)
         selected, dropped = FeatureEngine.select_features_by_correlation(X)
         if dropped:
             print(f"Feature selection dropped {len(dropped)} feature(s): {dropped}")
@@ -191,28 +271,30 @@ class TrainingManager:
         self.reg.fit(X, y_reg, sample_weight=sample_weights)
         
         import time
-        import glob
         timestamp = int(time.time())
         
-        clf_path = os.path.join(MODEL_DIR, f'best_model_clf_{timestamp}.pkl')
-        reg_path = os.path.join(MODEL_DIR, f'best_model_reg_{timestamp}.pkl')
+        artifacts = {'clf': self.clf, 'reg': self.reg}
+        try:
+            # Array-backed copies for fast single-row / batch inference
+            artifacts['compiled_clf'] = export_compiled_ensemble(self.clf)
+            artifacts['compiled_reg'] = export_compiled_ensemble(self.reg)
+        except Exception as e:
+            print(f"Warning: Could not compile ensembles, inference will use sklearn: {e}")
+            artifacts.pop('compiled_clf', None)
         
-        joblib.dump(self.clf, clf_path)
-        joblib.dump(self.reg, reg_path)
-        print("Models saved.")
-            
-        all_clf_files = glob.glob(os.path.join(MODEL_DIR, 'best_model_clf_*.pkl'))
-        all_reg_files = glob.glob(os.path.join(MODEL_DIR, 'best_model_reg_*.pkl'))
-        
-        all_clf_files.sort(reverse=True)
-        all_reg_files.sort(reverse=True)
-        
-        files_to_delete = all_clf_files[2:] + all_reg_files[2:]
-        for pkl_file in files_to_delete:
-            try:
-                os.remove(pkl_file)
-            except OSError:
-                pass
+        # Files are written under temp names and renamed; the manifest switch is
+        # the atomic promotion step. Older versions are pruned via the manifest.
+        model_registry.promote(
+            get_model_dir(db_path),
+            version=str(timestamp),
+            artifacts=artifacts,
+            dump=joblib.dump,
+            features=all_features,
+            selected_features=selected,
+            cv_metrics=self.cv_metrics,
+            trained_at=float(timestamp)
+        )
+        print(f"Models saved and promoted (version {timestamp}).")
 
 
 def train_and_evaluate(db_path=None):
@@ -223,7 +305,7 @@ def train_and_evaluate(db_path=None):
     manager = TrainingManager()
     X, y_bin, y_reg, sample_weights, _ = manager.load_and_prepare_data(db_path)
     acc_scores, combined_mae_scores = manager.run_cross_validation(X, y_bin, y_reg, sample_weights)
-    manager.train_final_and_save(X, y_bin, y_reg, sample_weights)
+    manager.train_final_and_save(X, y_bin, y_reg, sample_weights, db_path=db_path)
     
     # Needs to return original format matching prior logic
     return manager.clf, np.mean(acc_scores), np.mean(combined_mae_scores)
@@ -0,0 +1,157 @@
+"""
+travel.py — Issue #51
+Travel risk forecasting for an itinerary of (date range, location) legs.
+
+Legs are snapped to a GRID_RESOLUTION_DEG grid so nearby stops share one
+weather fetch. Each grid cell is fetched once, over the union of its legs'
+dates (see plan_fetches); callers fetch all cells concurrently. Every
+(leg, day) row is then scored in one batched model call via
+inference.predict_days, using the same recent history for every day.
+
+Days outside the weather forecast window have no weather and fall back to the
+heuristic engine, as the weekly forecast does.
+
+Public API:
+  parse_itinerary(legs) -> List[Leg]
+  plan_fetches(legs, today=None) -> {cell: (start_date, end_date)}
+  forecast_itinerary(legs, context, weather_by_cell) -> dict
+"""
+
+import datetime
+import logging
+from datetime import timedelta
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# ~11 km; weather does not meaningfully differ within a cell
+GRID_RESOLUTION_DEG = 0.1
+# Open-Meteo forecast window: 16 days ahead, up to 92 days back
+FORECAST_HORIZON_DAYS = 16
+FORECAST_PAST_DAYS = 92
+
+MAX_LEGS = 20
+MAX_TRIP_DAYS = 60  # Summed over all legs
+
+
+class Leg(NamedTuple):
+    label: Optional[str]
+    start: datetime.date
+    end: datetime.date  # Inclusive
+    lat: float
+    lon: float
+
+    @property
+    def cell(self) -> Tuple[float, float]:
+        return grid_cell(self.lat, self.lon)
+
+    def dates(self) -> List[datetime.date]:
+        return [self.start + timedelta(days=i) for i in range((self.end - self.start).days + 1)]
+
+
+def grid_cell(lat: float, lon: float) -> Tuple[float, float]:
+    """Centre of the grid cell containing (lat, lon)."""
+    steps = 1 / GRID_RESOLUTION_DEG
+    return (round(round(lat * steps) / steps, 4), round(round(lon * steps) / steps, 4))
+
+
+def _field(leg: Any, name: str) -> Any:
+    return leg.get(name) if isinstance(leg, dict) else getattr(leg, name, None)
+
+
+def parse_itinerary(legs: List[Any]) -> List[Leg]:
+    """
+    Validates request legs (dicts or objects with start_date, end_date, lat, lon,
+    optional label). Raises ValueError on bad dates, coordinates or size.
+    """
+    if not legs:
+        raise ValueError("An itinerary needs at least one leg")
+    if len(legs) > MAX_LEGS:
+        raise ValueError(f"An itinerary may have at most {MAX_LEGS} legs")
+
+    parsed = []
+    total_days = 0
+    for i, leg in enumerate(legs):
+        try:
+            start = datetime.datetime.strptime(_field(leg, 'start_date'), "%Y-%m-%d").date()
+            end_str = _field(leg, 'end_date')
+            end = datetime.datetime.strptime(end_str, "%Y-%m-%d").date() if end_str else start
+        except (TypeError, ValueError):
+            raise ValueError(f"Leg {i}: invalid date format. Use YYYY-MM-DD.")
+        if end < start:
+            raise ValueError(f"Leg {i}: end_date is before start_date")
+
+        lat, lon = float(_field(leg, 'lat')), float(_field(leg, 'lon'))
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            raise ValueError(f"Leg {i}: coordinates out of range")
+
+        total_days += (end - start).days + 1
+        if total_days > MAX_TRIP_DAYS:
+            raise ValueError(f"An itinerary may cover at most {MAX_TRIP_DAYS} leg-days")
+        parsed.append(Leg(_field(leg, 'label'), start, end, lat, lon))
+    return parsed
+
+
+def plan_fetches(legs: List[Leg], today: Optional[datetime.date] = None) -> Dict[Tuple[float, float], Tuple[datetime.date, datetime.date]]:
+    """
+    One fetch per grid cell, spanning all of its legs' dates clipped to the
+    forecast window. Cells with no day inside the window are omitted.
+    """
+    today = today or datetime.date.today()
+    window_start = today - timedelta(days=FORECAST_PAST_DAYS)
+    window_end = today + timedelta(days=FORECAST_HORIZON_DAYS - 1)
+
+    plan = {}
+    for leg in legs:
+        start, end = max(leg.start, window_start), min(leg.end, window_end)
+        if start > end:
+            continue
+        if leg.cell in plan:
+            known_start, known_end = plan[leg.cell]
+            start, end = min(start, known_start), max(end, known_end)
+        plan[leg.cell] = (start, end)
+    return plan
+
+
+def forecast_itinerary(legs: List[Leg], context, weather_by_cell: Dict[Tuple[float, float], Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Scores every (leg, day) row in one batch. weather_by_cell maps a grid cell to
+    its date_str -> features map (as returned by WeatherService.fetch_range_async).
+    """
+    from forecasting import inference
+
+    rows = []  # (leg index, date_str, weather)
+    for i, leg in enumerate(legs):
+        cell_weather = weather_by_cell.get(leg.cell) or {}
+        for day in leg.dates():
+            date_str = day.strftime("%Y-%m-%d")
+            rows.append((i, date_str, cell_weather.get(date_str)))
+
+    model_version = None if context.force_heuristic else inference._latest_model_version(context.db_path)
+    # Weatherless days are cached per cell, never as the home live-weather prediction
+    predictions = inference.predict_days(
+        context, [(d, w, legs[i].cell) for i, d, w in rows], model_version
+    )
+
+    leg_results = [
+        {"label": leg.label, "lat": leg.lat, "lon": leg.lon, "cell": list(leg.cell), "days": []}
+        for leg in legs
+    ]
+    for (i, date_str, weather), (pred, _) in zip(rows, predictions):
+        entry = inference.forecast_entry(date_str, pred)
+        entry["weather_available"] = weather is not None
+        leg_results[i]["days"].append(entry)
+
+    peak = None
+    for i, leg_result in enumerate(leg_results):
+        leg_peak = max(leg_result["days"], key=lambda d: d["risk_probability"])
+        leg_result["peak"] = leg_peak
+        if peak is None or leg_peak["risk_probability"] > peak["risk_probability"]:
+            peak = {**leg_peak, "leg": i, "label": leg_result["label"]}
+
+    return {
+        "legs": leg_results,
+        "peak": peak,
+        "days_scored": len(rows),
+        "locations_fetched": len(weather_by_cell),
+    }
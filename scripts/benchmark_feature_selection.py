@@ -0,0 +1,106 @@
+"""
+Benchmark for FeatureEngine.select_features_by_correlation.
+
+Runs the selection the way TrainingManager does (once per expanding
+TimeSeriesSplit fold, then on all rows) over a wide synthetic frame, against
+the previous implementation (DataFrame.corr + a Python loop over the upper
+triangle), and checks both pick the same features.
+
+Usage (from the repo root):
+    python scripts/benchmark_feature_selection.py [--rows 1500] [--features 240] [--splits 5]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from forecasting import feature_engine  # noqa: E402
+from forecasting.feature_engine import FeatureEngine  # noqa: E402
+
+
+def legacy_select(X, threshold=0.90):
+    """The pre-vectorisation implementation, for comparison."""
+    if len(X) < 30:
+        return list(X.columns), []
+    numeric_X = X.select_dtypes(include='number')
+    corr_matrix = numeric_X.corr(method='pearson').abs()
+    pairs = []
+    cols = corr_matrix.columns
+    for i in range(len(cols)):
+        for j in range(i + 1, len(cols)):
+            val = corr_matrix.iloc[i, j]
+            if pd.isna(val) or val <= threshold:
+                continue
+            pairs.append((cols[i], cols[j], val))
+    pairs.sort(key=lambda x: (x[0], x[1]))
+    to_drop = set()
+    for col_a, col_b, _ in pairs:
+        if col_a in to_drop or col_b in to_drop:
+            continue
+        nans_a = numeric_X[col_a].isna().sum()
+        nans_b = numeric_X[col_b].isna().sum()
+        if nans_a > nans_b:
+            to_drop.add(col_a)
+        elif nans_b > nans_a:
+            to_drop.add(col_b)
+        else:
+            to_drop.add(max(col_a, col_b))
+    return [c for c in X.columns if c not in to_drop], sorted(to_drop)
+
+
+def synthetic_frame(rows, features, seed=0):
+    """Groups of noisy copies of a few signals (some highly correlated), with 10% NaNs."""
+    rng = np.random.default_rng(seed)
+    signals = rng.normal(size=(rows, max(1, features // 10)))
+    columns = {}
+    for i in range(features):
+        signal = signals[:, i % signals.shape[1]]
+        noise = rng.normal(scale=rng.uniform(0.05, 1.0), size=rows)
+        values = signal * rng.uniform(0.5, 2.0) + noise + rng.uniform(-50, 1000)
+        values[rng.random(rows) < 0.1] = np.nan
+        columns[f"feature_{i:03d}"] = values
+    return pd.DataFrame(columns)
+
+
+def run(select, X, splits):
+    """CV folds then the final fit, as TrainingManager calls it."""
+    from sklearn.model_selection import TimeSeriesSplit
+
+    results = []
+    start = time.perf_counter()
+    for train_index, _ in TimeSeriesSplit(n_splits=splits).split(X):
+        results.append(select(X.iloc[train_index]))
+    results.append(select(X))
+    return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--rows', type=int, default=1500)
+    parser.add_argument('--features', type=int, default=240)
+    parser.add_argument('--splits', type=int, default=5)
+    args = parser.parse_args()
+
+    X = synthetic_frame(args.rows, args.features)
+    print(f"{args.rows} rows x {args.features} features, {args.splits} folds + final fit")
+
+    legacy_time, legacy_results = run(legacy_select, X, args.splits)
+    feature_engine.clear_correlation_cache()
+    cold_time, results = run(FeatureEngine.select_features_by_correlation, X, args.splits)
+    warm_time, _ = run(FeatureEngine.select_features_by_correlation, X, args.splits)
+
+    same = all(a == b for a, b in zip(legacy_results, results))
+    print(f"  legacy loop:        {legacy_time * 1000:9.1f} ms")
+    print(f"  vectorised (cold):  {cold_time * 1000:9.1f} ms  ({legacy_time / cold_time:.1f}x)")
+    print(f"  vectorised (warm):  {warm_time * 1000:9.1f} ms  ({legacy_time / warm_time:.1f}x)")
+    print(f"  dropped on all rows: {len(results[-1][1])}, same selection as legacy: {same}")
+    return 0 if same else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,6 +1,8 @@
-from services.entry_service import EntryService
-# Lazy loaded
-from datetime import datetime
+import sqlite3
+from datetime import date, datetime, timedelta
+
+from services import log_snapshot
+# NumPy is lazy loaded
 
 class AnalysisService:
     @staticmethod
@@ -8,145 +10,162 @@ class AnalysisService:
         """
         Fetches and processes data for analysis.
         Returns calculated statistics directly, rather than raw data.
+        Reads the columnar log snapshot (services.log_snapshot), not the rows.
         """
-        data = EntryService.get_entries_from_db(db_path)
-        
-        if not data:
-            return None
+        import numpy as np
 
-        import pandas as pd
-        
-        # Convert list of dicts to DataFrame for analysis
-        data = pd.DataFrame(data)
-        
-        if data.empty:
+        snapshot = log_snapshot.get(db_path)
+        if len(snapshot) == 0:
             return None
 
-        # Process logic from AnalysisFrame.perform_analysis
-        data['Date'] = pd.to_datetime(data['Date'], format='%Y-%m-%d', errors='coerce')
-        data = data.dropna(subset=['Date']) # Drop rows with invalid dates
-        
-        data['Pain Level'] = pd.to_numeric(data['Pain Level'], errors='coerce')
-        
-        # Filter: Migraines with Pain > 0
-        migraines_with_pain = data[data['Pain Level'] > 0]
-        # Keep one per day
-        migraines_with_pain = migraines_with_pain.drop_duplicates(subset='Date', keep='first')
-        
+        days = np.asarray(snapshot.epoch_day)
+        painful = np.flatnonzero(np.asarray(snapshot.pain) > 0)
+
+        # Migraines with Pain > 0, one per day: the day's latest entry (History view order)
+        order = painful[np.lexsort((np.asarray(snapshot.minute)[painful], days[painful]))]
+        last_of_day = np.append(days[order][1:] != days[order][:-1], True)
+        migraines = order[last_of_day]
+        migraine_days = days[migraines].astype('datetime64[D]')
+        migraine_pain = np.asarray(snapshot.pain)[migraines]
+
         # 1. Yearly Counts
-        yearly_counts = migraines_with_pain.groupby(migraines_with_pain['Date'].dt.year).size()
-        
-        # 2. Medication Usage
-        # Filter for entries with Pain > 0 to identify "Migraine Episodes"
-        painful_entries = data[data['Pain Level'] > 0].copy()
-        
-        # Normalize Medication: strip whitespace, replace empty with "No Medication"
-        painful_entries['Medication'] = painful_entries['Medication'].astype(str).str.strip()
-        painful_entries.loc[painful_entries['Medication'] == '', 'Medication'] = 'No Medication'
-        
-        medication_counts = painful_entries['Medication'].value_counts()
-        
+        years, counts = np.unique(migraine_days.astype('datetime64[Y]'), return_counts=True)
+        yearly_counts = {int(y.astype(int)) + 1970: int(c) for y, c in zip(years, counts)}
+
+        # 2. Medication Usage (entries with Pain > 0: "Migraine Episodes")
+        medication_counts = AnalysisService._medication_counts(db_path)
+
         # 3. Monthly (Current Year)
         current_year = datetime.now().year
-        monthly_counts = migraines_with_pain[migraines_with_pain['Date'].dt.year == current_year]
-        monthly_counts = monthly_counts.groupby(monthly_counts['Date'].dt.to_period('M')).size()
-        # Convert period index to string
-        monthly_counts.index = monthly_counts.index.strftime('%B')
-        
+        this_year = migraine_days[migraine_days.astype('datetime64[Y]') == np.datetime64(str(current_year), 'Y')]
+        monthly_counts = _month_counts(this_year, '%B')
+
         # 4. Past 12 Months
-        end_date = data['Date'].max()
-        start_date = end_date - pd.DateOffset(months=12)
-        past_12_months = migraines_with_pain[(migraines_with_pain['Date'] >= start_date) & (migraines_with_pain['Date'] <= end_date)]
-        past_12_counts = past_12_months.groupby(past_12_months['Date'].dt.to_period('M')).size()
-        past_12_counts.index = past_12_counts.index.strftime('%B %Y')
+        end_date = days.max().astype('datetime64[D]').astype(object)
+        start_date = _months_before(end_date, 12)
+        in_range = (migraine_days >= np.datetime64(start_date)) & (migraine_days <= np.datetime64(end_date))
+        past_12_counts = _month_counts(migraine_days[in_range], '%B %Y')
 
         # 5. General Stats
-        avg_pain = migraines_with_pain['Pain Level'].mean() if not migraines_with_pain.empty else 0
-        max_pain = migraines_with_pain['Pain Level'].max() if not migraines_with_pain.empty else 0
+        avg_pain = float(migraine_pain.mean()) if len(migraine_pain) else 0
+        max_pain = migraine_pain.max() if len(migraine_pain) else 0
 
         return {
-            "yearly_counts": yearly_counts.to_dict(),
-            "medication_counts": medication_counts.to_dict(),
-            "monthly_counts": monthly_counts.to_dict(),
-            "past_12_months_counts": past_12_counts.to_dict(),
+            "yearly_counts": yearly_counts,
+            "medication_counts": medication_counts,
+            "monthly_counts": monthly_counts,
+            "past_12_months_counts": past_12_counts,
             "avg_pain": round(avg_pain, 1),
             "max_pain": int(max_pain)
         }
 
+    @staticmethod
+    def _medication_counts(db_path: str):
+        """
+        Medication per painful entry, counted in SQL. Whitespace is stripped,
+        empty values are reported as "No Medication" and NULLs as "None".
+        """
+        conn = sqlite3.connect(db_path)
+        try:
+            rows = conn.execute(
+                'SELECT Medication, COUNT(*) FROM migraine_log '
+                'WHERE CAST("Pain Level" AS REAL) > 0 AND date(Date) IS NOT NULL '
+                'GROUP BY Medication'
+            ).fetchall()
+        except sqlite3.OperationalError:
+            return {}
+        finally:
+            conn.close()
+
+        counts = {}
+        for medication, count in rows:
+            name = str(medication).strip() or 'No Medication'
+            counts[name] = counts.get(name, 0) + count
+        return dict(sorted(counts.items(), key=lambda item: -item[1]))
+
     @staticmethod
     def get_trends_data(db_path: str, range_type: str = '1y'):
         """
         Returns formatted data for Recharts (Frontend).
         range_type: '1m', '1y', 'all'
         """
-        data = EntryService.get_entries_from_db(db_path)
-        if not data:
-            return []
+        import numpy as np
 
-        import pandas as pd
-        df = pd.DataFrame(data)
-        if df.empty:
+        snapshot = log_snapshot.get(db_path)
+        if len(snapshot) == 0:
             return []
 
-        # Standardize Date
-        df['Date'] = pd.to_datetime(df['Date'], format='%Y-%m-%d', errors='coerce')
-        df = df.dropna(subset=['Date'])
-        # Pain to numeric
-        df['Pain Level'] = pd.to_numeric(df['Pain Level'], errors='coerce').fillna(0)
-
+        days = np.asarray(snapshot.epoch_day)
+        pain = np.nan_to_num(np.asarray(snapshot.pain), nan=0.0)
         now = datetime.now()
         
         # Filter Logic
         if range_type == '1m':
             # Last 30 Days -> Daily View (Pain Level)
-            start_date = now - pd.DateOffset(days=30)
-            filtered = df[df['Date'] >= start_date].copy()
+            start = np.datetime64(now - timedelta(days=30), 'us')
+            recent = days.astype('datetime64[D]') >= start
             
-            # Keep max pain per day
-            daily = filtered.sort_values('Pain Level', ascending=False).drop_duplicates('Date').sort_values('Date')
-            # Filter > 0 pain
-            daily = daily[daily['Pain Level'] > 0]
+            # Keep max pain per day, filter > 0 pain
+            daily_days, starts = np.unique(days[recent], return_index=True)
+            daily_pain = np.maximum.reduceat(pain[recent], starts) if len(starts) else pain[:0]
+            keep = daily_pain > 0
             
             return [{
                 "name": d.strftime('%b %-d'), 
-                "value": p, 
+                "value": _plain_number(p), 
                 "type": "pain"
-            } for d, p in zip(daily['Date'], daily['Pain Level'])]
+            } for d, p in zip(daily_days[keep].astype('datetime64[D]').astype(object), daily_pain[keep])]
             
         else:
             # Monthly View (Frequency)
+            # Count Migraine Days (Pain > 0): several entries on a day count as 1 day
+            migraine_days = np.unique(days[pain > 0]).astype('datetime64[D]')
+            
             # Filter Date Range
             if range_type == '1y':
-                start_date = now - pd.DateOffset(months=12)
-                # First day of that month
-                start_date = start_date.replace(day=1)
-                df = df[df['Date'] >= start_date]
+                # First day of the month 12 months ago
+                start_date = _months_before(now.date(), 12).replace(day=1)
+                migraine_days = migraine_days[migraine_days >= np.datetime64(start_date)]
             elif range_type == 'all':
                 pass # No filter
             
-            # Count Migraine Days (Pain > 0)
-            migraine_days = df[df['Pain Level'] > 0].copy()
-            # Drop duplicates (if multiple entries per day, count as 1 day)
-            migraine_days = migraine_days.drop_duplicates(subset='Date')
-            
-            # Group by Month
-            # Use period 'M' to group (e.g., 2025-01)
-            monthly = migraine_days.groupby(migraine_days['Date'].dt.to_period('M')).size()
-            
-            # Ensure all months in range are present? 
-            # Recharts handles missing, but nicer to have 0s.
-            # Using simple conversion for now.
+            # Group by Month (e.g., 2025-01)
+            months, counts = np.unique(migraine_days.astype('datetime64[M]'), return_counts=True)
             
             result = []
-            for period, count in monthly.items():
+            for month, count in zip(months, counts):
+                period = month.astype(object)
                 # Format: "Jan 2025" or "Jan"
                 label = period.strftime('%b %Y') if range_type != 'current_year' else period.strftime('%b')
                 result.append({
                     "name": label,
                     "value": int(count),
                     "type": "count",
-                    "sortKey": period.start_time.timestamp() # Helper for sorting if needed, but dict order usually ok in recent python
+                    "sortKey": float(month.astype('datetime64[s]').astype(np.int64)) # Month start (UTC seconds), for sorting
                 })
             
             return result
 
+
+def _months_before(day: date, months: int) -> date:
+    """day minus `months` calendar months, clipped to the end of shorter months."""
+    month_index = day.year * 12 + day.month - 1 - months
+    year, month = divmod(month_index, 12)
+    for last in (day.day, 30, 29, 28):
+        try:
+            return date(year, month + 1, min(day.day, last))
+        except ValueError:
+            continue
+
+
+def _month_counts(days, label_format: str):
+    """{month label: number of days}, in calendar order."""
+    import numpy as np
+    months, counts = np.unique(days.astype('datetime64[M]'), return_counts=True)
+    return {m.astype(object).strftime(label_format): int(c) for m, c in zip(months, counts)}
+
+
+def _plain_number(value):
+    """7.0 -> 7, so integer pain levels serialise as before."""
+    value = float(value)
+    return int(value) if value.is_integer() else value
@@ -5,6 +5,8 @@ import sqlite3
 import json
 from datetime import datetime
 
+from services import log_snapshot
+
 class EntryService:
     @staticmethod
     def _create_table_if_not_exists(conn):
@@ -38,10 +40,24 @@ class EntryService:
                 c.execute("ALTER TABLE migraine_log ADD COLUMN Medications TEXT")
                 conn.commit()
                 EntryService.migrate_legacy_medications(conn)
+            
+            EntryService.ensure_indexes(conn)
+            # Keys the columnar snapshot used by analytics and training
+            log_snapshot.ensure_write_counter(conn)
                 
         except Exception as e:
             print(f"Error creating/updating table: {e}")
 
+    @staticmethod
+    def ensure_indexes(conn):
+        """
+        (Date, Time) index for the windowed history reads (data_loader.get_recent_history)
+        and the newest-entry lookup (data_loader.get_latest_location_from_db).
+        Idempotent; existing databases get it on their next open.
+        """
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_migraine_log_date_time ON migraine_log (Date, Time)")
+        conn.commit()
+
     @staticmethod
     def migrate_legacy_medications(conn):
         """
@@ -93,6 +109,30 @@ class EntryService:
 
         return sanitized_data
 
+    @staticmethod
+    def notify_entries_changed(db_path: str, dates=None):
+        """
+        Updates the daily feature store and the circadian onset histogram for
+        entries on `dates` (None: bulk change, rebuild), and forgets the cached
+        latest location.
+        """
+        try:
+            from forecasting import data_loader
+            data_loader.clear_location_cache(db_path)
+        except Exception as e:
+            print(f"Warning: Failed to clear cached location: {e}")
+        try:
+            from forecasting import feature_store
+            feature_store.apply_entry_change(db_path, dates)
+        except Exception as e:
+            print(f"Warning: Failed to update daily features: {e}")
+            # Don't fail the entry save; the store rebuilds itself on next read
+        try:
+            from forecasting import circadian_store
+            circadian_store.apply_entry_change(db_path, dates)
+        except Exception as e:
+            print(f"Warning: Failed to update circadian histogram: {e}")
+
     @staticmethod
     def add_entry(data: dict, db_path: str):
         """
@@ -158,6 +198,7 @@ class EntryService:
             cur.execute(sql, list(data_to_insert.values()))
             conn.commit()
             conn.close()
+            EntryService.notify_entries_changed(db_path, [date])
             
             # --- Usage Tracking Increment ---
             try:
@@ -247,12 +288,14 @@ class EntryService:
         try:
             conn = sqlite3.connect(db_path)
             cursor = conn.cursor()
+            row = cursor.execute("SELECT Date FROM migraine_log WHERE id = ?", (entry_id,)).fetchone()
             cursor.execute("DELETE FROM migraine_log WHERE id = ?", (entry_id,))
             conn.commit()
             if cursor.rowcount == 0:
                  conn.close()
                  raise ValueError(f"Entry with id {entry_id} not found")
             conn.close()
+            EntryService.notify_entries_changed(db_path, [row[0]] if row else None)
         except Exception as e:
              raise ValueError(f"Database error: {e}")
 
@@ -284,6 +327,8 @@ class EntryService:
             values = list(data_to_update.values())
             values.append(entry_id)
             
+            # The entry may move to another day: both days' features change
+            row = cur.execute("SELECT Date FROM migraine_log WHERE id = ?", (entry_id,)).fetchone()
             cur.execute(sql, values)
             conn.commit()
             
@@ -292,6 +337,7 @@ class EntryService:
                  raise ValueError(f"Entry with id {entry_id} not found")
                  
             conn.close()
+            EntryService.notify_entries_changed(db_path, [row[0], data_to_update.get('Date', row[0])] if row else None)
         except Exception as e:
             raise ValueError(f"Database error: {e}")
 
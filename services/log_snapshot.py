@@ -0,0 +1,340 @@
+"""
+log_snapshot.py
+Memory-mapped columnar snapshot of migraine_log for analytics.
+
+One typed NumPy array per column, rows ordered by (Date, id):
+
+  epoch_day   int32    days since 1970-01-01 (rows with an unparseable Date are left out)
+  minute      int16    minute of day of Time, -1 if it does not parse
+  pain, sleep, activity   float64   NaN where missing or not numeric
+  lat, lon    float64  NaN where missing or not numeric
+  id          int64
+
+The arrays are saved as .npy files in <data dir>/cache/snapshots/<database
+name>/ (one directory per database, as model_registry.namespace_dir keys
+models) and opened with mmap_mode='r', so a read costs one small query and no
+per-row Python objects. Building streams
+the log in chunks (data_loader.iter_migraine_log) straight into the mapped
+files, so memory stays bounded by the chunk size however long the log is.
+
+A snapshot is keyed by the database's write counter: `log_write_counter`
+holds a random token (new per database file) and a count bumped by triggers on
+every INSERT, UPDATE and DELETE on migraine_log, from any connection. (PRAGMA
+data_version only compares within one connection, so it cannot key a file on
+disk.) When the counter moved, the next get() rebuilds the files. The same
+version keys data_loader's cache of the training timeline.
+
+Public API:
+  get(db_path=None, conn=None) -> LogSnapshot
+  write_version(conn) -> (token, writes) or None
+  ensure_write_counter(conn)
+  clear_memory(db_path=None)
+  remove(db_path)
+"""
+
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from api.utils import get_data_dir
+
+logger = logging.getLogger(__name__)
+
+COUNTER_TABLE = 'log_write_counter'
+# Parent of the per-database snapshot directories
+SNAPSHOT_ROOT = os.path.join(get_data_dir(), 'cache', 'snapshots')
+MANIFEST_NAME = 'manifest.json'
+
+COLUMNS = {
+    'epoch_day': 'int32',
+    'minute': 'int16',
+    'pain': 'float64',
+    'sleep': 'float64',
+    'activity': 'float64',
+    'lat': 'float64',
+    'lon': 'float64',
+    'id': 'int64',
+}
+
+_SOURCE_COLUMNS = ('id', 'Date', 'Time', 'Pain Level', 'Sleep', 'Physical Activity', 'Latitude', 'Longitude')
+_TRIGGERS = {
+    f'{COUNTER_TABLE}_insert': 'AFTER INSERT',
+    f'{COUNTER_TABLE}_update': 'AFTER UPDATE',
+    f'{COUNTER_TABLE}_delete': 'AFTER DELETE',
+}
+
+_memory: Dict[str, Tuple[Tuple[str, int], 'LogSnapshot']] = {}
+_memory_lock = threading.Lock()
+
+
+class LogSnapshot:
+    """
+    Column arrays of one migraine_log state (read-only memory maps when loaded
+    from disk). `entries` counts every log row, including those left out for
+    an unparseable Date.
+    """
+
+    def __init__(self, arrays: Dict[str, Any], entries: int):
+        self.arrays = arrays
+        self.entries = entries
+        for name, values in arrays.items():
+            setattr(self, name, values)
+
+    def __len__(self):
+        return len(self.arrays['epoch_day'])
+
+    def dates(self):
+        """epoch_day as datetime64[D]."""
+        return self.arrays['epoch_day'].astype('datetime64[D]')
+
+
+def _table_exists(conn, name: str) -> bool:
+    row = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).fetchone()
+    return row is not None
+
+
+def ensure_write_counter(conn) -> None:
+    """
+    Creates the write counter and its migraine_log triggers if missing. (Re)installing
+    the triggers bumps the count, since writes made without them went uncounted.
+    """
+    installed = {name for (name,) in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'migraine_log'"
+    )}
+    if all(name in installed for name in _TRIGGERS) and _table_exists(conn, COUNTER_TABLE):
+        return
+    conn.execute(
+        f"CREATE TABLE IF NOT EXISTS {COUNTER_TABLE} "
+        "(id INTEGER PRIMARY KEY CHECK (id = 0), token TEXT NOT NULL, writes INTEGER NOT NULL)"
+    )
+    conn.execute(f"INSERT OR IGNORE INTO {COUNTER_TABLE} (id, token, writes) VALUES (0, ?, 0)", (uuid.uuid4().hex,))
+    for name, event in _TRIGGERS.items():
+        conn.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {name} {event} ON migraine_log "
+            f"BEGIN UPDATE {COUNTER_TABLE} SET writes = writes + 1 WHERE id = 0; END"
+        )
+    conn.execute(f"UPDATE {COUNTER_TABLE} SET writes = writes + 1 WHERE id = 0")
+    conn.commit()
+
+
+def write_version(conn) -> Optional[Tuple[str, int]]:
+    """(token, writes), or None if the counter is not installed."""
+    installed = conn.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name IN (?, ?, ?)", tuple(_TRIGGERS)
+    ).fetchone()[0]
+    if installed != len(_TRIGGERS) or not _table_exists(conn, COUNTER_TABLE):
+        return None
+    row = conn.execute(f"SELECT token, writes FROM {COUNTER_TABLE} WHERE id = 0").fetchone()
+    return (row[0], row[1]) if row else None
+
+
+def snapshot_dir(db_path: str) -> str:
+    name = os.path.splitext(os.path.basename(db_path))[0]
+    return os.path.join(SNAPSHOT_ROOT, name)
+
+
+def _parse_chunk(chunk) -> Dict[str, Any]:
+    """Column arrays for the rows of a log chunk with a parseable Date."""
+    import numpy as np
+    import pandas as pd
+
+    dates = pd.to_datetime(chunk['Date'].astype(str).str[:10], format='%Y-%m-%d', errors='coerce')
+    valid = dates.notna().to_numpy()
+    chunk = chunk[valid]
+    times = chunk['Time'].astype(str).str.extract(r'^\s*(\d{1,2}):(\d{1,2})')
+    hours = pd.to_numeric(times[0], errors='coerce').to_numpy()
+    minutes = pd.to_numeric(times[1], errors='coerce').to_numpy()
+    in_day = (hours < 24) & (minutes < 60)
+    return {
+        'epoch_day': dates[valid].to_numpy().astype('datetime64[D]').astype(np.int64),
+        'minute': np.where(in_day, np.nan_to_num(hours) * 60 + np.nan_to_num(minutes), -1),
+        'pain': pd.to_numeric(chunk['Pain Level'], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan),
+        'sleep': pd.to_numeric(chunk['Sleep'], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan),
+        'activity': pd.to_numeric(chunk['Physical Activity'], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan),
+        'lat': pd.to_numeric(chunk['Latitude'], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan),
+        'lon': pd.to_numeric(chunk['Longitude'], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan),
+        'id': chunk['id'].to_numpy(dtype=np.int64),
+    }
+
+
+def _stream(conn, allocate: Callable[[int], Dict[str, Any]]) -> Tuple[Dict[str, Any], int, int]:
+    """
+    Fills the column arrays from `allocate(row count)` chunk by chunk
+    (data_loader.iter_migraine_log). Returns (arrays, rows kept, entries read).
+    The count and the rows are read in one transaction: the caller's if one is
+    open (as in get()), else one opened and closed here.
+    """
+    from forecasting import data_loader
+
+    owns_transaction = not conn.in_transaction
+    if owns_transaction:
+        conn.execute("BEGIN")
+    try:
+        count = conn.execute("SELECT COUNT(*) FROM migraine_log").fetchone()[0] if _table_exists(conn, 'migraine_log') else 0
+        arrays = allocate(count)
+        rows = entries = 0
+        for chunk in data_loader.iter_migraine_log(conn=conn, columns=_SOURCE_COLUMNS):
+            entries += len(chunk)
+            parsed = _parse_chunk(chunk)
+            kept = len(parsed['epoch_day'])
+            for name, values in parsed.items():
+                arrays[name][rows:rows + kept] = values
+            rows += kept
+    finally:
+        if owns_transaction:
+            conn.rollback()
+    return arrays, rows, entries
+
+
+def _read_log(conn) -> LogSnapshot:
+    """The snapshot in memory, without saving it."""
+    import numpy as np
+    arrays, rows, entries = _stream(conn, lambda n: {name: np.empty(n, dtype=dtype) for name, dtype in COLUMNS.items()})
+    return LogSnapshot({name: values[:rows] for name, values in arrays.items()}, entries)
+
+
+def _build(conn, directory: str, version: Tuple[str, int]) -> None:
+    """
+    Streams the log straight into memory-mapped column files, then points the
+    manifest at them; older files are removed.
+    """
+    from numpy.lib.format import open_memmap
+
+    os.makedirs(directory, exist_ok=True)
+    prefix = f"{version[0][:8]}-{version[1]}"
+    files = {name: f"{prefix}-{name}.npy" for name in COLUMNS}
+
+    def allocate(count):
+        return {
+            name: open_memmap(os.path.join(directory, files[name] + '.tmp'), mode='w+', dtype=dtype, shape=(count,))
+            for name, dtype in COLUMNS.items()
+        }
+
+    arrays, rows, entries = _stream(conn, allocate)
+    for name, values in arrays.items():
+        values.flush()
+        del values
+    arrays.clear()
+    for filename in files.values():
+        os.replace(os.path.join(directory, filename + '.tmp'), os.path.join(directory, filename))
+
+    payload = {
+        'token': version[0], 'writes': version[1],
+        'rows': rows, 'entries': entries, 'files': files,
+    }
+    fd, tmp_path = tempfile.mkstemp(prefix='.manifest.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, os.path.join(directory, MANIFEST_NAME))
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    for filename in os.listdir(directory):
+        if filename.endswith('.npy') and filename not in files.values():
+            try:
+                os.remove(os.path.join(directory, filename))
+            except OSError:
+                pass  # Still mapped elsewhere (Windows); removed after a later build
+
+
+def _load(directory: str, version: Tuple[str, int]) -> Optional[LogSnapshot]:
+    """The snapshot saved for `version`, memory-mapped, or None."""
+    import numpy as np
+
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+        if (manifest['token'], manifest['writes']) != version or set(manifest['files']) != set(COLUMNS):
+            return None
+        arrays = {}
+        for name, filename in manifest['files'].items():
+            path = os.path.join(directory, filename)
+            # Empty arrays cannot be mapped; rows with a bad Date leave unused space at the end
+            values = np.load(path, mmap_mode='r') if manifest['rows'] else np.load(path)
+            arrays[name] = values[:manifest['rows']]
+        return LogSnapshot(arrays, manifest['entries'])
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def get(db_path: Optional[str] = None, conn=None) -> LogSnapshot:
+    """
+    The snapshot of migraine_log: from memory if the write counter has not moved,
+    else from the files on disk, else rebuilt and saved. Pass `conn` to read
+    over a caller's connection; without the counter installed (it is only
+    installed on connections opened here), or inside an open write
+    transaction, the log is read but not kept.
+    """
+    import sqlite3
+    from api.utils import get_db_path
+    if db_path is None:
+        db_path = get_db_path()
+
+    owns_conn = conn is None
+    if owns_conn:
+        conn = sqlite3.connect(db_path)
+    caller_transaction = conn.in_transaction
+    try:
+        if owns_conn and _table_exists(conn, 'migraine_log'):
+            ensure_write_counter(conn)
+        if not caller_transaction:
+            # One read snapshot for the counter, the row count and the rows
+            conn.execute("BEGIN")
+        version = write_version(conn)
+        if version is None and owns_conn:
+            # No log (a new or reset database): nothing saved for it is valid
+            remove(db_path)
+        if version is None or caller_transaction:
+            # Uncounted, or possibly uncommitted, rows: read without keeping them
+            return _read_log(conn)
+
+        with _memory_lock:
+            cached = _memory.get(db_path)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        directory = snapshot_dir(db_path)
+        snapshot = _load(directory, version)
+        if snapshot is None:
+            try:
+                _build(conn, directory, version)
+                snapshot = _load(directory, version)
+            except OSError as e:
+                logger.warning(f"Could not save the log snapshot ({e}); using it from memory.")
+            if snapshot is None:
+                snapshot = _read_log(conn)
+            logger.info(f"Built log snapshot: {len(snapshot)} rows.")
+    finally:
+        if not caller_transaction:
+            conn.rollback()
+        if owns_conn:
+            conn.close()
+
+    with _memory_lock:
+        _memory[db_path] = (version, snapshot)
+    return snapshot
+
+
+def clear_memory(db_path: Optional[str] = None) -> None:
+    """Forgets the in-memory snapshot of one database, or of all of them."""
+    with _memory_lock:
+        if db_path is None:
+            _memory.clear()
+        else:
+            _memory.pop(db_path, None)
+
+
+def remove(db_path: str) -> None:
+    """Deletes the saved and in-memory snapshot of a database (when it is replaced or deleted)."""
+    clear_memory(db_path)
+    directory = snapshot_dir(db_path)
+    if os.path.isdir(directory):
+        shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,140 @@
+"""
+metrics.py
+In-process latency histograms for the prediction pipeline.
+
+Code under measurement wraps a stage in `span("stage.name")` (or decorates it
+with `@timed("stage.name")`). Each stage keeps a count, the max and a window of
+the last WINDOW_SIZE durations, from which p50 / p95 are read on demand.
+GET /api/v1/metrics returns snapshot().
+
+Spans also append to the current request's timing list, if one was started
+with begin_request(). The API turns that list into a Server-Timing header.
+contextvars are copied into the prediction executors (api.concurrency), so
+spans recorded on worker threads land on the right request.
+"""
+
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+WINDOW_SIZE = 1024
+# Attach a Server-Timing header to prediction responses
+SERVER_TIMING_ENABLED = True
+
+_lock = threading.Lock()
+_stages: Dict[str, Dict[str, Any]] = {}
+_request_spans: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar(
+    "request_spans", default=None
+)
+
+
+def record(name: str, duration_ms: float) -> None:
+    """Adds one duration (milliseconds) to a stage's histogram."""
+    with _lock:
+        stage = _stages.get(name)
+        if stage is None:
+            stage = {"count": 0, "total": 0.0, "max": 0.0, "window": deque(maxlen=WINDOW_SIZE)}
+            _stages[name] = stage
+        stage["count"] += 1
+        stage["total"] += duration_ms
+        stage["max"] = max(stage["max"], duration_ms)
+        stage["window"].append(duration_ms)
+    spans = _request_spans.get()
+    if spans is not None:
+        spans.append((name, duration_ms))
+
+
+@contextmanager
+def span(name: str):
+    """Times the enclosed block as one sample of stage `name` (errors included)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, (time.perf_counter() - start) * 1000.0)
+
+
+def timed(name: str) -> Callable:
+    """Decorator form of span() for sync and async functions."""
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+def snapshot() -> Dict[str, Dict[str, Any]]:
+    """
+    {stage: {count, mean_ms, p50_ms, p95_ms, max_ms}}. Percentiles cover the last WINDOW_SIZE samples.
+    """
+    with _lock:
+        stages = {name: (s["count"], s["total"], s["max"], list(s["window"])) for name, s in _stages.items()}
+
+    result = {}
+    for name, (count, total, maximum, window) in sorted(stages.items()):
+        window.sort()
+        result[name] = {
+            "count": count,
+            "mean_ms": round(total / count, 3) if count else 0.0,
+            "p50_ms": round(_percentile(window, 0.50), 3),
+            "p95_ms": round(_percentile(window, 0.95), 3),
+            "max_ms": round(maximum, 3),
+        }
+    return result
+
+
+def reset() -> None:
+    with _lock:
+        _stages.clear()
+
+
+def begin_request() -> contextvars.Token:
+    """Starts collecting spans for the current request; pass the token to end_request()."""
+    return _request_spans.set([])
+
+
+def end_request(token: contextvars.Token) -> List[Tuple[str, float]]:
+    """Stops collecting and returns the request's (stage, duration_ms) spans."""
+    spans = _request_spans.get() or []
+    _request_spans.reset(token)
+    return spans
+
+
+def server_timing_header(spans: List[Tuple[str, float]], total_ms: Optional[float] = None) -> str:
+    """
+    Server-Timing value with one entry per stage (durations of repeated spans summed), in first-seen order.
+    """
+    totals: Dict[str, List[float]] = {}
+    for name, duration in spans:
+        entry = totals.setdefault(name, [0, 0.0])
+        entry[0] += 1
+        entry[1] += duration
+    # Metric names are tokens: no dots
+    parts = [
+        f'{name.replace(".", "-")};dur={duration:.1f}' + (f';desc="x{count}"' if count > 1 else '')
+        for name, (count, duration) in totals.items()
+    ]
+    if total_ms is not None:
+        parts.append(f"total;dur={total_ms:.1f}")
+    return ", ".join(parts)
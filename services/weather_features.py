@@ -0,0 +1,214 @@
+"""
+weather_features.py
+Daily weather features from Open-Meteo hourly data, computed in one NumPy pass.
+
+The hourly arrays are laid out as a (days x 24) block per variable, one row
+per calendar day from the first to the last hour in the response (missing
+hours are NaN). Every daily aggregate is then a row-wise reduction:
+
+  Base (the model's weather inputs):
+    tavg, tmin, tmax, prcp, wspd, pres, average_humidity, midday_humidity,
+    pres_change (mean pressure minus the previous full day's), tsun (daily data)
+  Hourly-derived (Issues #54, #55, #57, #58):
+    pres_drop_6h, pres_crash   largest pressure fall from a peak in the preceding
+                               PRESSURE_WINDOW_HOURS (sliding-window max, across
+                               midnight), and whether it reached CRASH_THRESHOLD_HPA
+    temp_hourly_std            instability index
+    max_dew_point, max_wet_bulb   Magnus dew point, Stull (2011) wet bulb
+    temp_hourly_skew, temp_hourly_kurtosis, pres_hourly_skew   shape of the day
+
+Forecast, weekly / range and archive (history) responses share the same
+schema, so inference and the training weather history use this one pipeline.
+"""
+
+from typing import Any, Dict, Iterable, List
+
+HOURLY_VARIABLES = "temperature_2m,relative_humidity_2m,surface_pressure,precipitation,wind_speed_10m"
+DAILY_VARIABLES = "temperature_2m_max,temperature_2m_min,sunshine_duration"
+
+# Barometric crash (Issue #54): a fall of CRASH_THRESHOLD_HPA within PRESSURE_WINDOW_HOURS
+PRESSURE_WINDOW_HOURS = 6
+CRASH_THRESHOLD_HPA = 5.0
+
+# Magnus coefficients (over water, -45..60 C)
+_MAGNUS_B = 17.62
+_MAGNUS_C = 243.12
+
+# Values used when a day has no data for a variable
+_DEFAULTS = {'tavg': 0.0, 'pres': 1015.0, 'average_humidity': 50.0, 'wspd': 0.0, 'prcp': 0.0}
+
+HOURLY_FEATURES = (
+    'pres_drop_6h', 'pres_crash', 'temp_hourly_std', 'max_dew_point', 'max_wet_bulb',
+    'temp_hourly_skew', 'temp_hourly_kurtosis', 'pres_hourly_skew',
+)
+
+
+def _blocks(hourly: Dict[str, List[Any]]):
+    """
+    (first epoch day, {variable: (days x 24) array}) for an Open-Meteo 'hourly' dict.
+    """
+    import numpy as np
+
+    hours = np.array(hourly.get('time', []), dtype='datetime64[m]').astype('datetime64[h]').astype(np.int64)
+    if len(hours) == 0:
+        return 0, {}
+    first_day = int(hours.min() // 24)
+    n_days = int(hours.max() // 24) - first_day + 1
+    slots = hours - first_day * 24
+
+    blocks = {}
+    for name in ('temperature_2m', 'relative_humidity_2m', 'surface_pressure', 'precipitation', 'wind_speed_10m'):
+        flat = np.full(n_days * 24, np.nan)
+        values = hourly.get(name)
+        if values is not None:
+            flat[slots] = np.array(values, dtype=np.float64)
+        blocks[name] = flat.reshape(n_days, 24)
+    return first_day, blocks
+
+
+def _row_mean(block):
+    import numpy as np
+    counts = np.sum(~np.isnan(block), axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, np.nansum(block, axis=1) / np.maximum(counts, 1), np.nan)
+
+
+def _row_reduce(ufunc, block):
+    """fmin / fmax over each row; NaN only for rows without data."""
+    return ufunc.reduce(block, axis=1)
+
+
+def _row_moments(block):
+    """(std, skewness, excess kurtosis) per row, population moments; 0 where undefined."""
+    import numpy as np
+    mean = _row_mean(block)
+    centred = block - mean[:, None]
+    counts = np.sum(~np.isnan(block), axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        m2 = np.nansum(centred ** 2, axis=1) / counts
+        m3 = np.nansum(centred ** 3, axis=1) / counts
+        m4 = np.nansum(centred ** 4, axis=1) / counts
+        # Rounding leaves a tiny variance on flat days: treat it as none
+        flat = m2 <= 1e-12 * np.maximum(mean ** 2, 1.0)
+        skew = np.where(flat, 0.0, m3 / m2 ** 1.5)
+        kurt = np.where(flat, 0.0, m4 / m2 ** 2 - 3.0)
+    return np.sqrt(np.where(counts > 0, m2, np.nan)), skew, kurt
+
+
+def dew_point(temp, humidity):
+    """Magnus dew point (C) from temperature (C) and relative humidity (%)."""
+    import numpy as np
+    with np.errstate(invalid='ignore', divide='ignore'):
+        gamma = np.log(np.clip(humidity, 1e-3, 100.0) / 100.0) + _MAGNUS_B * temp / (_MAGNUS_C + temp)
+        return _MAGNUS_C * gamma / (_MAGNUS_B - gamma)
+
+
+def wet_bulb(temp, humidity):
+    """Stull (2011) wet-bulb temperature (C), valid for RH 5-99% and -20..50 C."""
+    import numpy as np
+    rh = np.clip(humidity, 0.0, 100.0)
+    return (temp * np.arctan(0.151977 * np.sqrt(rh + 8.313659)) + np.arctan(temp + rh)
+            - np.arctan(rh - 1.676331) + 0.00391838 * rh ** 1.5 * np.arctan(0.023101 * rh) - 4.686035)
+
+
+def pressure_drops(pressure_block, window: int = PRESSURE_WINDOW_HOURS):
+    """
+    Per day, the largest fall from the highest pressure of the preceding `window`
+    hours (the series runs across midnight). 0 for days without pressure.
+    """
+    import numpy as np
+    from numpy.lib.stride_tricks import sliding_window_view
+
+    flat = pressure_block.reshape(-1)
+    padded = np.concatenate((np.full(window, np.nan), flat))
+    running_max = np.fmax.reduce(sliding_window_view(padded, window + 1), axis=1)
+    drops = np.fmax.reduce((running_max - flat).reshape(pressure_block.shape), axis=1)
+    return np.nan_to_num(drops, nan=0.0)
+
+
+def _daily_rows(daily: Dict[str, List[Any]]) -> Dict[str, int]:
+    return {t: i for i, t in enumerate(daily.get('time', []))}
+
+
+def daily_features(data: Dict[str, Any], dates: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    {date_str: feature dict} for each YYYY-MM-DD in `dates` that has hourly data
+    in the Open-Meteo response `data`. Dict order: id, the base features, HOURLY_FEATURES.
+    """
+    import numpy as np
+
+    first_day, blocks = _blocks(data.get('hourly', {}))
+    if not blocks:
+        return {}
+    n_days = blocks['temperature_2m'].shape[0]
+    temp = blocks['temperature_2m']
+    hums = blocks['relative_humidity_2m']
+    pres = blocks['surface_pressure']
+
+    has_hours = np.any(~np.isnan(np.stack(list(blocks.values()))), axis=(0, 2))
+    tavg = _row_mean(temp)
+    pres_mean = _row_mean(pres)
+    # Pressure change needs a complete previous day
+    full_pres = np.sum(~np.isnan(pres), axis=1) == 24
+    pres_change = np.zeros(n_days)
+    pres_change[1:] = np.where(full_pres[:-1], pres_mean[1:] - pres_mean[:-1], 0.0)
+    humidity = _row_mean(hums)
+    temp_std, temp_skew, temp_kurt = _row_moments(temp)
+    _, pres_skew, _ = _row_moments(pres)
+    drops = pressure_drops(pres)
+
+    features = {
+        'tavg': tavg,
+        'tmin': _row_reduce(np.fmin, temp),
+        'tmax': _row_reduce(np.fmax, temp),
+        'prcp': np.nansum(blocks['precipitation'], axis=1),
+        'wspd': _row_mean(blocks['wind_speed_10m']),
+        'pres': pres_mean,
+        'average_humidity': humidity,
+        'pres_change': np.nan_to_num(pres_change, nan=0.0),
+        'midday_humidity': np.where(np.isnan(hums[:, 12]), humidity, hums[:, 12]),
+        'pres_drop_6h': drops,
+        'pres_crash': (drops >= CRASH_THRESHOLD_HPA).astype(np.float64),
+        'temp_hourly_std': temp_std,
+        'max_dew_point': _row_reduce(np.fmax, dew_point(temp, hums)),
+        'max_wet_bulb': _row_reduce(np.fmax, wet_bulb(temp, hums)),
+        'temp_hourly_skew': temp_skew,
+        'temp_hourly_kurtosis': temp_kurt,
+        'pres_hourly_skew': pres_skew,
+    }
+    for name, default in _DEFAULTS.items():
+        features[name] = np.where(np.isnan(features[name]), default, features[name])
+    for name in ('tmin', 'tmax'):
+        features[name] = np.nan_to_num(features[name], nan=0.0)
+    features['midday_humidity'] = np.where(np.isnan(features['midday_humidity']), 50.0, features['midday_humidity'])
+
+    daily = data.get('daily', {})
+    daily_rows = _daily_rows(daily)
+
+    result = {}
+    for date_str in dates:
+        day = int(np.datetime64(date_str, 'D').astype(np.int64)) - first_day
+        if day < 0 or day >= n_days or not has_hours[day]:
+            continue
+        row = {name: float(values[day]) for name, values in features.items()}
+        tsun = 0.0
+        d_idx = daily_rows.get(date_str, -1)
+        if d_idx != -1:
+            row['tmin'] = daily['temperature_2m_min'][d_idx]
+            row['tmax'] = daily['temperature_2m_max'][d_idx]
+            tsun = (daily['sunshine_duration'][d_idx] or 0) / 60.0
+        result[date_str] = {
+            'id': -1,
+            'tavg': row['tavg'],
+            'tmin': row['tmin'],
+            'tmax': row['tmax'],
+            'prcp': row['prcp'],
+            'wspd': row['wspd'],
+            'pres': row['pres'],
+            'tsun': tsun,
+            'average_humidity': row['average_humidity'],
+            'pres_change': row['pres_change'],
+            'midday_humidity': row['midday_humidity'],
+            **{name: row[name] for name in HOURLY_FEATURES},
+        }
+    return result
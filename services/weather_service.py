@@ -1,273 +1,302 @@
+import asyncio
 import requests
 import logging
 from datetime import timedelta
 from typing import Optional, Dict, List, Any
 
+from services import weather_features
+from services.metrics import timed
+
 # Setup logger
 logger = logging.getLogger("weather_service")
 
+# Async transport limits. Bounded so a slow Open-Meteo cannot pile up sockets.
+REQUEST_TIMEOUT_SECONDS = 5
+MAX_CONNECTIONS = 10  # Itineraries fan out one request per location
+MAX_KEEPALIVE_CONNECTIONS = 2
+
+_async_client_state = {"loop": None, "client": None}
+
+def _get_async_client():
+    """
+    Shared httpx.AsyncClient for the running event loop, or None if httpx is unavailable.
+    A client is bound to the loop it was created on, so a new loop gets a new client.
+    """
+    try:
+        import httpx
+    except ImportError:
+        return None
+    
+    loop = asyncio.get_running_loop()
+    if _async_client_state["loop"] is not loop or _async_client_state["client"] is None:
+        _async_client_state["client"] = httpx.AsyncClient(
+            timeout=REQUEST_TIMEOUT_SECONDS,
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS
+            )
+        )
+        _async_client_state["loop"] = loop
+    return _async_client_state["client"]
+
+async def close_async_client():
+    client = _async_client_state["client"]
+    _async_client_state["client"] = None
+    _async_client_state["loop"] = None
+    if client is not None:
+        await client.aclose()
+
 class WeatherService:
+    """
+    Open-Meteo client. Transport (sync `fetch_*`, async `fetch_*_async`) is kept
+    separate from parsing (`parse_*`), so both paths produce identical features.
+    """
     BASE_URL = "https://api.open-meteo.com/v1/forecast"
+    ARCHIVE_URL = "https://archive-api.open-meteo.com/v1/archive"
+    
+    # --- Transport ---
+    
+    @staticmethod
+    def _get_json(params: Dict[str, Any], url: Optional[str] = None) -> Dict[str, Any]:
+        response = requests.get(url or WeatherService.BASE_URL, params=params, timeout=REQUEST_TIMEOUT_SECONDS)
+        if response.status_code >= 400:
+            logger.error(f"Open-Meteo Error: {response.text}")
+        response.raise_for_status()
+        return response.json()
+    
+    @staticmethod
+    async def _get_json_async(params: Dict[str, Any]) -> Dict[str, Any]:
+        client = _get_async_client()
+        if client is None:
+            # No async client available: run the blocking call on the I/O executor
+            from api.concurrency import run_io
+            return await run_io(WeatherService._get_json, params)
+        
+        response = await client.get(WeatherService.BASE_URL, params=params)
+        if response.status_code >= 400:
+            logger.error(f"Open-Meteo Error: {response.text}")
+        response.raise_for_status()
+        return response.json()
+    
+    # --- Daily forecast ---
+    
+    @staticmethod
+    def forecast_params(lat: float, lon: float, target_date) -> Dict[str, Any]:
+        # Open-Meteo API: Request weather for target date.
+        # We need start_date = target - 1 day to calculate pressure change context from "yesterday".
+        start_dt = target_date - timedelta(days=1)
+        return {
+            "latitude": lat,
+            "longitude": lon,
+            "start_date": start_dt.strftime('%Y-%m-%d'),
+            "end_date": target_date.strftime('%Y-%m-%d'),
+            "hourly": weather_features.HOURLY_VARIABLES,
+            "daily": weather_features.DAILY_VARIABLES,
+            "timezone": "auto"
+        }
     
     @staticmethod
+    @timed("weather.forecast")
     def fetch_forecast(lat: float, lon: float, target_date) -> Optional[Dict[str, Any]]:
         """
         Fetches weather from Open-Meteo for the specific date.
         Returns feature dictionary or None if failed.
         """
         try:
-            # Open-Meteo API: Request weather for target date.
-            # We need start_date = target - 1 day to calculate pressure change context from "yesterday".
-            start_dt = target_date - timedelta(days=1)
-            start_str = start_dt.strftime('%Y-%m-%d')
-            target_str = target_date.strftime('%Y-%m-%d')
-            
-            params = {
-                "latitude": lat,
-                "longitude": lon,
-                "start_date": start_str,
-                "end_date": target_str,
-                "hourly": "temperature_2m,relative_humidity_2m,surface_pressure,precipitation,wind_speed_10m",
-                "daily": "temperature_2m_max,temperature_2m_min,sunshine_duration",
-                "timezone": "auto"
-            }
-            
-            response = requests.get(WeatherService.BASE_URL, params=params, timeout=5)
-            if response.status_code >= 400:
-                logger.error(f"Open-Meteo Error: {response.text}")
-            response.raise_for_status()
-            data = response.json()
-            
-            daily = data.get('daily', {})
-            hourly = data.get('hourly', {})
-            
-            # Index Logic
-            times = hourly.get('time', [])
-            target_hourly_idx = -1
-            prev_hourly_idx = -1
-            
-            for i, t in enumerate(times):
-                if target_hourly_idx == -1 and t.startswith(target_str):
-                    target_hourly_idx = i
-                if prev_hourly_idx == -1 and t.startswith(start_str):
-                    prev_hourly_idx = i
-                
-                if target_hourly_idx != -1 and prev_hourly_idx != -1:
-                    break
-                    
-            if target_hourly_idx == -1:
-                return None
-                
-            # Target Day Hourly (24h)
-            h_temps = hourly['temperature_2m'][target_hourly_idx : target_hourly_idx+24]
-            h_hums = hourly['relative_humidity_2m'][target_hourly_idx : target_hourly_idx+24]
-            h_pres = hourly['surface_pressure'][target_hourly_idx : target_hourly_idx+24]
-            h_wspd = hourly['wind_speed_10m'][target_hourly_idx : target_hourly_idx+24]
-            h_prcp = hourly['precipitation'][target_hourly_idx : target_hourly_idx+24]
-            
-            # Pressure Change (Target Avg - Previous Avg)
-            pres_change = 0.0
-            if prev_hourly_idx != -1:
-                prev_pres_list = hourly['surface_pressure'][prev_hourly_idx : prev_hourly_idx+24]
-                if len(prev_pres_list) >= 24 and h_pres: 
-                    prev_avg_pres = sum(prev_pres_list) / len(prev_pres_list)
-                    curr_avg_pres = sum(h_pres) / len(h_pres)
-                    pres_change = curr_avg_pres - prev_avg_pres
-
-            # Daily Aggregates
-            daily_times = daily.get('time', [])
-            d_idx = -1
-            for i, t in enumerate(daily_times):
-                if t == target_str:
-                    d_idx = i
-                    break
-            
-            if d_idx == -1:
-                tmin = min(h_temps) if h_temps else 0
-                tmax = max(h_temps) if h_temps else 0
-                tsun = 0 
-            else:
-                tmin = daily['temperature_2m_min'][d_idx]
-                tmax = daily['temperature_2m_max'][d_idx]
-                tsun = (daily['sunshine_duration'][d_idx] or 0) / 60.0
-
-            # Features Calculation
-            tavg = sum(h_temps) / len(h_temps) if h_temps else 0
-            pres = sum(h_pres) / len(h_pres) if h_pres else 1015.0
-            humidity = sum(h_hums) / len(h_hums) if h_hums else 50.0
-            wspd = sum(h_wspd) / len(h_wspd) if h_wspd else 0
-            prcp = sum(h_prcp) if h_prcp else 0
-            midday_humidity = h_hums[12] if len(h_hums) > 12 else humidity
-
-            return {
-                'id': -1,
-                'tavg': tavg,
-                'tmin': tmin,
-                'tmax': tmax,
-                'prcp': prcp,
-                'wspd': wspd,
-                'pres': pres,
-                'tsun': tsun,
-                'average_humidity': humidity,
-                'pres_change': pres_change,
-                'midday_humidity': midday_humidity
-            }
-            
+            data = WeatherService._get_json(WeatherService.forecast_params(lat, lon, target_date))
+            return WeatherService.parse_forecast(data, target_date)
+        except Exception as e:
+            logger.error(f"Weather API Error (Open-Meteo): {e}")
+            return None
+    
+    @staticmethod
+    @timed("weather.forecast")
+    async def fetch_forecast_async(lat: float, lon: float, target_date) -> Optional[Dict[str, Any]]:
+        try:
+            data = await WeatherService._get_json_async(WeatherService.forecast_params(lat, lon, target_date))
+            return WeatherService.parse_forecast(data, target_date)
         except Exception as e:
             logger.error(f"Weather API Error (Open-Meteo): {e}")
             return None
+    
+    @staticmethod
+    def parse_forecast(data: Dict[str, Any], target_date) -> Optional[Dict[str, Any]]:
+        """
+        Builds the daily feature dictionary for target_date from an Open-Meteo response
+        (see services.weather_features), or None if the response has no hours for it.
+        """
+        target_str = target_date.strftime('%Y-%m-%d')
+        return weather_features.daily_features(data, [target_str]).get(target_str)
 
+    # --- Hourly forecast ---
+    
+    @staticmethod
+    def hourly_params(start_datetime, lat: float, lon: float, hours: int = 24) -> Dict[str, Any]:
+        end_dt = start_datetime + timedelta(hours=hours)
+        end_str = (end_dt + timedelta(days=1)).strftime('%Y-%m-%d')
+        req_start = (start_datetime - timedelta(days=1)).strftime('%Y-%m-%d')
+        
+        return {
+            "latitude": lat,
+            "longitude": lon,
+            "start_date": req_start,
+            "end_date": end_str,
+            "hourly": weather_features.HOURLY_VARIABLES,
+            "timezone": "auto"
+        }
+    
     @staticmethod
+    @timed("weather.hourly")
     def fetch_hourly(start_datetime, lat: float, lon: float, hours: int = 24) -> List[Dict[str, Any]]:
         """
         Fetches raw hourly weather for [start_datetime, start_datetime + hours].
         """
         try:
-            start_str = start_datetime.strftime('%Y-%m-%d')
-            end_dt = start_datetime + timedelta(hours=hours)
-            end_str = (end_dt + timedelta(days=1)).strftime('%Y-%m-%d')
-            req_start = (start_datetime - timedelta(days=1)).strftime('%Y-%m-%d')
-            
-            params = {
-                "latitude": lat,
-                "longitude": lon,
-                "start_date": req_start,
-                "end_date": end_str,
-                "hourly": "temperature_2m,relative_humidity_2m,surface_pressure,precipitation,wind_speed_10m",
-                "timezone": "auto"
-            }
-            
-            response = requests.get(WeatherService.BASE_URL, params=params, timeout=5)
-            response.raise_for_status()
-            data = response.json()
-            
-            hourly = data.get('hourly', {})
-            times = hourly.get('time', [])
-            result_hours = []
-            
-            target_iso_start = start_datetime.strftime('%Y-%m-%dT%H:00')
-            start_idx = -1
-            for i, t in enumerate(times):
-                if t >= target_iso_start:
-                    start_idx = i
-                    break
-                    
-            if start_idx == -1: return []
-            
-            for i in range(start_idx, min(start_idx + hours, len(times))):
-                pres_change_3h = 0.0
-                if i >= 3:
-                    curr_p = hourly['surface_pressure'][i] or 1015
-                    prev_p = hourly['surface_pressure'][i-3] or 1015
-                    pres_change_3h = curr_p - prev_p
-                
-                w_dict = {
-                    'time': times[i],
-                    'temp': hourly['temperature_2m'][i],
-                    'humidity': hourly['relative_humidity_2m'][i],
-                    'pressure': hourly['surface_pressure'][i],
-                    'pressure_change_3h': pres_change_3h,
-                    'prcp': hourly['precipitation'][i],
-                    'wind': hourly['wind_speed_10m'][i]
-                }
-                result_hours.append(w_dict)
-                
-            return result_hours
-            
+            data = WeatherService._get_json(WeatherService.hourly_params(start_datetime, lat, lon, hours))
+            return WeatherService.parse_hourly(data, start_datetime, hours)
+        except Exception as e:
+            logger.error(f"Hourly Weather Error: {e}")
+            return []
+    
+    @staticmethod
+    @timed("weather.hourly")
+    async def fetch_hourly_async(start_datetime, lat: float, lon: float, hours: int = 24) -> List[Dict[str, Any]]:
+        try:
+            data = await WeatherService._get_json_async(WeatherService.hourly_params(start_datetime, lat, lon, hours))
+            return WeatherService.parse_hourly(data, start_datetime, hours)
         except Exception as e:
             logger.error(f"Hourly Weather Error: {e}")
             return []
+    
+    @staticmethod
+    def parse_hourly(data: Dict[str, Any], start_datetime, hours: int = 24) -> List[Dict[str, Any]]:
+        hourly = data.get('hourly', {})
+        times = hourly.get('time', [])
+        result_hours = []
+        
+        target_iso_start = start_datetime.strftime('%Y-%m-%dT%H:00')
+        start_idx = -1
+        for i, t in enumerate(times):
+            if t >= target_iso_start:
+                start_idx = i
+                break
+                
+        if start_idx == -1: return []
+        
+        for i in range(start_idx, min(start_idx + hours, len(times))):
+            pres_change_3h = 0.0
+            if i >= 3:
+                curr_p = hourly['surface_pressure'][i] or 1015
+                prev_p = hourly['surface_pressure'][i-3] or 1015
+                pres_change_3h = curr_p - prev_p
+            
+            w_dict = {
+                'time': times[i],
+                'temp': hourly['temperature_2m'][i],
+                'humidity': hourly['relative_humidity_2m'][i],
+                'pressure': hourly['surface_pressure'][i],
+                'pressure_change_3h': pres_change_3h,
+                'prcp': hourly['precipitation'][i],
+                'wind': hourly['wind_speed_10m'][i]
+            }
+            result_hours.append(w_dict)
+            
+        return result_hours
 
+    # --- Weekly forecast ---
+    
+    @staticmethod
+    def weekly_params(start_date, lat: float, lon: float) -> Dict[str, Any]:
+        return WeatherService.range_params(start_date, start_date + timedelta(days=6), lat, lon)
+    
     @staticmethod
+    @timed("weather.weekly")
     def fetch_weekly(start_date, lat: float, lon: float) -> Dict[str, Any]:
         """
         Fetches 7 days of weather starting from start_date in one API call.
         Returns a dict mapping date_str -> features.
         """
         try:
-            real_start = start_date - timedelta(days=1)
-            end_date = start_date + timedelta(days=6)
-            
-            params = {
-                "latitude": lat,
-                "longitude": lon,
-                "start_date": real_start.strftime('%Y-%m-%d'),
-                "end_date": end_date.strftime('%Y-%m-%d'),
-                "hourly": "temperature_2m,relative_humidity_2m,surface_pressure,precipitation,wind_speed_10m",
-                "daily": "temperature_2m_max,temperature_2m_min,sunshine_duration",
-                "timezone": "auto"
-            }
-            
-            response = requests.get(WeatherService.BASE_URL, params=params, timeout=5)
-            response.raise_for_status()
-            data = response.json()
-            
-            hourly = data.get('hourly', {})
-            daily = data.get('daily', {})
-            daily_map = {} 
-            
-            for i in range(7):
-                target = start_date + timedelta(days=i)
-                target_str = target.strftime('%Y-%m-%d')
-                prev_str = (target - timedelta(days=1)).strftime('%Y-%m-%d')
-                
-                times = hourly.get('time', [])
-                target_idx = -1
-                prev_idx = -1
-                for idx, t in enumerate(times):
-                    if target_idx == -1 and t.startswith(target_str): target_idx = idx
-                    if prev_idx == -1 and t.startswith(prev_str): prev_idx = idx
-                    
-                    if target_idx != -1 and prev_idx != -1:
-                        break
-                
-                if target_idx == -1: continue 
-
-                h_temps = hourly['temperature_2m'][target_idx : target_idx+24]
-                h_hums = hourly['relative_humidity_2m'][target_idx : target_idx+24]
-                h_pres = hourly['surface_pressure'][target_idx : target_idx+24]
-                h_wspd = hourly['wind_speed_10m'][target_idx : target_idx+24]
-                h_prcp = hourly['precipitation'][target_idx : target_idx+24]
-                
-                pres_change = 0.0
-                if prev_idx != -1 and len(hourly['surface_pressure']) > prev_idx+24:
-                    prev_list = hourly['surface_pressure'][prev_idx : prev_idx+24]
-                    if prev_list and h_pres:
-                        pres_change = (sum(h_pres)/len(h_pres)) - (sum(prev_list)/len(prev_list))
-
-                d_times = daily.get('time', [])
-                d_idx = -1
-                for idx, t in enumerate(d_times):
-                    if t == target_str: d_idx = idx
-                
-                tsun = 0
-                tmin = min(h_temps) if h_temps else 0
-                tmax = max(h_temps) if h_temps else 0
-                
-                if d_idx != -1:
-                    tmin = daily['temperature_2m_min'][d_idx]
-                    tmax = daily['temperature_2m_max'][d_idx]
-                    tsun = (daily['sunshine_duration'][d_idx] or 0) / 60.0
-                
-                feat = {
-                    'id': -1,
-                    'tavg': sum(h_temps) / len(h_temps) if h_temps else 0,
-                    'tmin': tmin,
-                    'tmax': tmax,
-                    'prcp': sum(h_prcp) if h_prcp else 0,
-                    'wspd': sum(h_wspd) / len(h_wspd) if h_wspd else 0,
-                    'pres': sum(h_pres) / len(h_pres) if h_pres else 1015,
-                    'tsun': tsun,
-                    'average_humidity': sum(h_hums) / len(h_hums) if h_hums else 50,
-                    'pres_change': pres_change,
-                    'midday_humidity': h_hums[12] if len(h_hums) > 12 else 50,
-                    'Latitude': lat,
-                    'Longitude': lon
-                }
-                daily_map[target_str] = feat
-                
-            return daily_map
-            
+            data = WeatherService._get_json(WeatherService.weekly_params(start_date, lat, lon))
+            return WeatherService.parse_weekly(data, start_date, lat, lon)
+        except Exception as e:
+            logger.error(f"Batch Weather Error: {e}")
+            return {}
+    
+    @staticmethod
+    @timed("weather.weekly")
+    async def fetch_weekly_async(start_date, lat: float, lon: float) -> Dict[str, Any]:
+        try:
+            data = await WeatherService._get_json_async(WeatherService.weekly_params(start_date, lat, lon))
+            return WeatherService.parse_weekly(data, start_date, lat, lon)
         except Exception as e:
             logger.error(f"Batch Weather Error: {e}")
             return {}
+    
+    @staticmethod
+    def parse_weekly(data: Dict[str, Any], start_date, lat: float, lon: float) -> Dict[str, Any]:
+        return WeatherService.parse_range(data, start_date, 7, lat, lon)
+    
+    # --- Daily range (weekly forecast, travel itineraries) ---
+    
+    @staticmethod
+    def range_params(start_date, end_date, lat: float, lon: float) -> Dict[str, Any]:
+        # One extra leading day so the first day gets a pressure change
+        real_start = start_date - timedelta(days=1)
+        
+        return {
+            "latitude": lat,
+            "longitude": lon,
+            "start_date": real_start.strftime('%Y-%m-%d'),
+            "end_date": end_date.strftime('%Y-%m-%d'),
+            "hourly": weather_features.HOURLY_VARIABLES,
+            "daily": weather_features.DAILY_VARIABLES,
+            "timezone": "auto"
+        }
+    
+    @staticmethod
+    @timed("weather.range")
+    async def fetch_range_async(start_date, end_date, lat: float, lon: float) -> Dict[str, Any]:
+        """
+        Fetches start_date..end_date (inclusive) at one location in one API call.
+        Returns a dict mapping date_str -> features; {} on failure.
+        """
+        try:
+            data = await WeatherService._get_json_async(WeatherService.range_params(start_date, end_date, lat, lon))
+            return WeatherService.parse_range(data, start_date, (end_date - start_date).days + 1, lat, lon)
+        except Exception as e:
+            logger.error(f"Range Weather Error ({lat}, {lon}): {e}")
+            return {}
+    
+    @staticmethod
+    def parse_range(data: Dict[str, Any], start_date, days: int, lat: float, lon: float) -> Dict[str, Any]:
+        dates = [(start_date + timedelta(days=i)).strftime('%Y-%m-%d') for i in range(days)]
+        daily_map = weather_features.daily_features(data, dates)
+        for feat in daily_map.values():
+            feat['Latitude'] = lat
+            feat['Longitude'] = lon
+            
+        return daily_map
+    
+    # --- History (training weather) ---
+    
+    @staticmethod
+    def archive_params(start_date, end_date, lat: float, lon: float) -> Dict[str, Any]:
+        # Same variables as the forecast, so history and forecasts share one feature pipeline
+        return WeatherService.range_params(start_date, end_date, lat, lon)
+    
+    @staticmethod
+    @timed("weather.archive")
+    def fetch_archive(start_date, end_date, lat: float, lon: float) -> Dict[str, Any]:
+        """
+        Fetches observed weather for start_date..end_date (inclusive) from the
+        Open-Meteo archive. Returns a dict mapping date_str -> features; {} on failure.
+        """
+        try:
+            data = WeatherService._get_json(
+                WeatherService.archive_params(start_date, end_date, lat, lon), url=WeatherService.ARCHIVE_URL
+            )
+            return WeatherService.parse_range(data, start_date, (end_date - start_date).days + 1, lat, lon)
+        except Exception as e:
+            logger.error(f"Archive Weather Error ({lat}, {lon}): {e}")
+            return {}
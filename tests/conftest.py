@@ -0,0 +1,79 @@
+import random
+import sqlite3
+import sys
+from datetime import date, timedelta
+
+import pytest
+
+LOG_START = date(2025, 1, 1)
+
+
+def log_day(offset):
+    """YYYY-MM-DD of the day `offset` days after LOG_START."""
+    return (LOG_START + timedelta(days=offset)).strftime("%Y-%m-%d")
+
+
+def make_log_db(path, seed=7, days=90):
+    """
+    Random migraine_log over `days` days from LOG_START: gaps and multi-entry days,
+    pain-free and NULL pain, unparseable Times, non-numeric Sleep, partial locations
+    and bulky Notes. The first and last days always have an entry.
+    """
+    from services.entry_service import EntryService
+
+    rng = random.Random(seed)
+    rows = []
+    for offset in range(days):
+        for _ in range(rng.choice([0, 0, 1, 1, 2, 3])):
+            rows.append((
+                log_day(offset),
+                rng.choice([f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}"] * 3 + ["", None, "late"]),
+                rng.choice([0, 2, 3, 5, 8, 10, None]),
+                rng.choice(["1", " 2.5 ", "3", "", None, "bad", 3]),
+                str(rng.randint(0, 3)),
+                rng.choice([34.05, 40.7, None]),
+                rng.choice([-118.25, None]),
+                "x" * rng.randint(0, 500),
+            ))
+    # The timeline's first and last days
+    rows += [(log_day(offset), "12:00", 3, None, None, None, None, "") for offset in (0, days - 1)]
+
+    conn = sqlite3.connect(path)
+    EntryService._create_table_if_not_exists(conn)
+    conn.executemany(
+        'INSERT INTO migraine_log (Date, Time, "Pain Level", Sleep, "Physical Activity", Latitude, Longitude, Notes) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+        rows
+    )
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture(autouse=True)
+def snapshot_root(tmp_path, monkeypatch):
+    """Log snapshots of test databases are saved under the test's tmp_path, not the data dir."""
+    from services import log_snapshot
+    root = str(tmp_path / "snapshots")
+    monkeypatch.setattr(log_snapshot, 'SNAPSHOT_ROOT', root)
+    log_snapshot.clear_memory()
+    yield root
+    log_snapshot.clear_memory()
+
+
+@pytest.fixture(autouse=True)
+def reset_inference_caches():
+    """
+    Prediction results and contexts are cached per database path. Tests patch the
+    loaders behind them, so every test starts (and ends) with empty caches.
+    """
+    inference = sys.modules.get('forecasting.inference')
+    if inference is not None:
+        inference.clear_prediction_cache()
+    precompute = sys.modules.get('forecasting.precompute')
+    if precompute is not None:
+        precompute._tracked.clear()
+        precompute._snapshots.clear()
+    yield
+    inference = sys.modules.get('forecasting.inference')
+    if inference is not None:
+        inference.clear_prediction_cache()
@@ -0,0 +1,101 @@
+"""
+Tests for the async prediction routes and their dedicated executors.
+"""
+import asyncio
+import contextvars
+import threading
+import time
+from unittest.mock import patch
+
+import httpx
+
+from api.main import app
+from api.dependencies import get_db_path_dep
+from api.concurrency import run_cpu
+from forecasting.prediction_context import PredictionContext
+
+
+request_id = contextvars.ContextVar("request_id", default=None)
+
+
+def test_run_cpu_uses_cpu_executor_and_keeps_contextvars():
+    def work():
+        return threading.current_thread().name, request_id.get()
+
+    async def main():
+        request_id.set("abc")
+        return await run_cpu(work)
+
+    thread_name, value = asyncio.run(main())
+    assert thread_name.startswith("prediction-cpu")
+    assert value == "abc"
+
+
+def test_slow_weather_does_not_block_other_endpoints():
+    context = PredictionContext("/tmp/async.db", None, (34.05, -118.25), {})
+    fetch_calls = []
+
+    async def slow_fetch(lat, lon, target_date):
+        fetch_calls.append(target_date)
+        await asyncio.sleep(0.5)
+        return None
+
+    async def main():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            async def timed(path):
+                t0 = time.perf_counter()
+                response = await client.get(path)
+                return response, time.perf_counter() - t0
+
+            return await asyncio.gather(
+                timed("/api/v1/prediction/future?date=2030-01-01"),
+                timed("/api/v1/health"),
+            )
+
+    app.dependency_overrides[get_db_path_dep] = lambda: "/tmp/async.db"
+    try:
+        with patch('forecasting.inference.get_prediction_context', return_value=context), \
+             patch('forecasting.inference.get_prediction_for_date', return_value={"probability": 5.0}) as mock_predict, \
+             patch('services.weather_service.WeatherService.fetch_forecast_async', side_effect=slow_fetch):
+            (prediction, slow_elapsed), (health, fast_elapsed) = asyncio.run(main())
+    finally:
+        app.dependency_overrides.clear()
+
+    assert prediction.status_code == 200
+    assert prediction.json()["probability"] == 5.0
+    assert prediction.json()["stale"] is False
+    assert health.status_code == 200
+    assert slow_elapsed >= 0.5
+    assert fast_elapsed < 0.4
+    # The route fetched weather itself and handed it over: scoring never touches the network
+    assert len(fetch_calls) == 1
+    assert mock_predict.call_args.kwargs["live_weather"] == {}
+
+
+def test_async_fetch_parses_like_sync():
+    from datetime import datetime
+    from services.weather_service import WeatherService
+
+    data = {
+        'hourly': {
+            'time': [f"2025-06-0{1 + h // 24}T{h % 24:02d}:00" for h in range(48)],
+            'temperature_2m': [20.0] * 48, 'relative_humidity_2m': [50.0] * 48,
+            'surface_pressure': [1010.0] * 24 + [1015.0] * 24,
+            'precipitation': [0.0] * 48, 'wind_speed_10m': [3.0] * 48,
+        },
+        'daily': {'time': ['2025-06-01', '2025-06-02'], 'temperature_2m_max': [25, 26],
+                  'temperature_2m_min': [15, 16], 'sunshine_duration': [3600, 7200]},
+    }
+    target = datetime(2025, 6, 2)
+
+    async def fake_get(params):
+        return data
+
+    with patch.object(WeatherService, '_get_json_async', side_effect=fake_get), \
+         patch.object(WeatherService, '_get_json', return_value=data):
+        async_result = asyncio.run(WeatherService.fetch_forecast_async(34.0, -118.0, target))
+        sync_result = WeatherService.fetch_forecast(34.0, -118.0, target)
+
+    assert async_result == sync_result
+    assert async_result['pres_change'] == 5.0
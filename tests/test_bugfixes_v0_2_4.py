@@ -151,8 +151,8 @@ def test_hourly_forecast_details(monkeypatch):
         sys.modules['forecasting.feature_engine'].FeatureEngine.get_circadian_priors.return_value = [0.1] * 24
         
         # We also need to mock DB path for the location check
-        monkeypatch.setattr("forecasting.inference.get_latest_location_from_db", lambda x: (34.05, -118.25))
-        monkeypatch.setattr("forecasting.inference.get_recent_history", lambda x: pd.DataFrame())
+        monkeypatch.setattr("forecasting.inference.get_latest_location_from_db", lambda *args, **kwargs: (34.05, -118.25))
+        monkeypatch.setattr("forecasting.inference.get_recent_history", lambda *args, **kwargs: pd.DataFrame())
 
         from forecasting.inference import get_hourly_forecast
         
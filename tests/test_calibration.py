@@ -12,7 +12,7 @@ from forecasting import inference
 
 class TestCalibration(unittest.TestCase):
     
-    @patch('forecasting.inference.get_prediction_for_date')
+    @patch('forecasting.inference.predict_days')
     @patch('forecasting.heuristic_predictor.HeuristicPredictor')
     @patch('forecasting.inference.WeatherService')
     # It seems get_circadian_priors is imported from feature_engine in inference.py?
@@ -40,10 +40,10 @@ class TestCalibration(unittest.TestCase):
         mock_heuristic_cls.return_value = mock_predictor
         
         # Mock Daily Prediction (High Risk - The Truth)
-        mock_daily_pred.return_value = {
+        mock_daily_pred.return_value = [({
             'probability': 80.0, # 80% Daily Risk
             'risk_level': 'High'
-        }
+        }, None)]
         
         # Execute
         results = inference.get_hourly_forecast("2025-01-01")
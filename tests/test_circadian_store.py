@@ -0,0 +1,91 @@
+"""
+Tests for the persisted circadian onset histogram.
+"""
+import sqlite3
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+from conftest import log_day, make_log_db
+from forecasting import circadian_store, inference
+from forecasting.feature_engine import FeatureEngine
+from forecasting.prediction_context import PredictionContext
+from services.entry_service import EntryService
+
+
+def _bins(db):
+    conn = sqlite3.connect(db)
+    bins = [w for _, w in conn.execute(f"SELECT hour, weight FROM {circadian_store.TABLE} ORDER BY hour")]
+    conn.close()
+    return bins
+
+
+def _rebuilt_bins(db, half_life):
+    conn = sqlite3.connect(db)
+    with conn:
+        circadian_store.rebuild(conn, half_life)
+    conn.close()
+    return _bins(db)
+
+
+def test_priors_match_the_history_scan(tmp_path):
+    db = str(tmp_path / "circadian.db")
+    make_log_db(db)
+    conn = sqlite3.connect(db)
+    log = pd.read_sql_query("SELECT * FROM migraine_log", conn)
+    conn.close()
+
+    assert circadian_store.get_priors(db) == pytest.approx(FeatureEngine.get_circadian_priors(log))
+
+
+@pytest.mark.parametrize("half_life", [None, 14.0])
+def test_entry_changes_match_a_rebuild(tmp_path, half_life):
+    db = str(tmp_path / "circadian.db")
+    make_log_db(db)
+    circadian_store.get_priors(db, half_life)
+
+    EntryService.add_entry({'Date': log_day(70), 'Time': '06:15', 'Pain Level': 7}, db)
+    conn = sqlite3.connect(db)
+    first_id = conn.execute("SELECT id FROM migraine_log WHERE \"Pain Level\" > 0 AND Time LIKE '%:%' LIMIT 1").fetchone()[0]
+    last_id = conn.execute("SELECT MAX(id) FROM migraine_log").fetchone()[0]
+    conn.close()
+    EntryService.update_entry(first_id, {'Date': log_day(65), 'Time': '22:00', 'Pain Level': 4}, db)
+    EntryService.delete_entry(last_id, db)
+
+    # Weights are relative to the rebuild's anchor day: compare shapes
+    incremental = _bins(db)
+    rebuilt = _rebuilt_bins(db, half_life)
+    assert [w / sum(incremental) for w in incremental] == pytest.approx([w / sum(rebuilt) for w in rebuilt])
+    assert circadian_store.get_priors(db, half_life) == pytest.approx(FeatureEngine.smooth_circadian_priors(incremental))
+
+
+def test_decay_weighs_recent_onsets_more(tmp_path):
+    db = str(tmp_path / "circadian.db")
+    conn = sqlite3.connect(db)
+    EntryService._create_table_if_not_exists(conn)
+    rows = [(log_day(0), "03:00", 5)] * 3 + [(log_day(90), "15:00", 5)]
+    conn.executemany('INSERT INTO migraine_log (Date, Time, "Pain Level") VALUES (?, ?, ?)', rows)
+    conn.commit()
+    conn.close()
+
+    flat = circadian_store.get_priors(db)
+    decayed = circadian_store.get_priors(db, half_life_days=30.0)
+
+    assert flat[3] > flat[15]
+    assert decayed[15] > decayed[3]
+
+
+def test_hourly_forecast_serves_priors_from_memory(tmp_path):
+    db = str(tmp_path / "circadian.db")
+    make_log_db(db)
+    expected = circadian_store.get_priors(db)
+    context = PredictionContext(db, None, (34.05, -118.25), {})
+    weather = [{'time': f'2025-03-01T{h:02d}:00', 'temp': 20, 'humidity': 50} for h in range(24)]
+
+    with patch.object(circadian_store.sqlite3, 'connect', side_effect=AssertionError("no DB read")), \
+         patch.object(FeatureEngine, 'get_circadian_priors', side_effect=AssertionError("no history scan")), \
+         patch('forecasting.inference._daily_anchors', return_value={}):
+        results = inference.get_hourly_forecast("2025-03-01 00:00", context=context, hourly_weather=weather)
+
+    assert [r['details']['circadian_risk'] for r in results] == [round(p, 2) for p in expected]
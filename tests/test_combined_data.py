@@ -0,0 +1,63 @@
+"""
+Tests for the in-memory combined timeline and its optional .npz cache.
+"""
+import os
+import sqlite3
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from forecasting import data_loader
+from services.entry_service import EntryService
+
+
+def _make_inputs(tmp_path, days=45):
+    db = str(tmp_path / "combined.db")
+    conn = sqlite3.connect(db)
+    EntryService._create_table_if_not_exists(conn)
+    dates = pd.date_range("2025-01-01", periods=days).strftime("%Y-%m-%d")
+    conn.executemany(
+        'INSERT INTO migraine_log (Date, Time, "Pain Level", Sleep) VALUES (?, ?, ?, ?)',
+        [(d, "08:00", i % 6, "2") for i, d in enumerate(dates) if i % 3]
+    )
+    conn.commit()
+    conn.close()
+
+    weather_file = str(tmp_path / "weather.csv")
+    pd.DataFrame({'date': dates, 'tavg': np.linspace(2, 20, days), 'pres': 1012.0}).to_csv(weather_file, index=False)
+    return db, weather_file
+
+
+def test_merge_stays_in_memory_unless_exported(tmp_path):
+    db, weather_file = _make_inputs(tmp_path)
+
+    with patch.object(pd.DataFrame, 'to_csv', side_effect=AssertionError("no CSV write")):
+        combined = data_loader.merge_migraine_and_weather_data(weather_data_file=weather_file, db_path=db)
+
+    export = str(tmp_path / "combined.csv")
+    data_loader.merge_migraine_and_weather_data(weather_data_file=weather_file, db_path=db, output_file=export)
+    assert len(combined) == 45 and os.path.exists(export)
+    pd.testing.assert_frame_equal(
+        data_loader.process_combined_data(combined_data_filename=export),
+        data_loader.process_combined_data(input_df=combined),
+        check_dtype=False
+    )
+
+
+def test_binary_cache_is_keyed_by_the_inputs(tmp_path):
+    db, weather_file = _make_inputs(tmp_path)
+    cache_dir = str(tmp_path / "cache")
+
+    built = data_loader.load_combined_data(db, weather_file, cache_dir=cache_dir)
+    with patch.object(data_loader, 'combine_daily', side_effect=AssertionError("cache miss")):
+        cached = data_loader.load_combined_data(db, weather_file, cache_dir=cache_dir)
+    pd.testing.assert_frame_equal(cached, built)
+    first_file = os.listdir(cache_dir)
+
+    EntryService.add_entry({'Date': '2025-02-20', 'Time': '09:00', 'Pain Level': 7}, db)
+    updated = data_loader.load_combined_data(db, weather_file, cache_dir=cache_dir)
+
+    assert updated['Date'].max() == pd.Timestamp("2025-02-20")
+    # The stale entry is replaced, not kept alongside
+    assert len(os.listdir(cache_dir)) == 1 and os.listdir(cache_dir) != first_file
@@ -0,0 +1,70 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sklearn.ensemble import HistGradientBoostingClassifier, HistGradientBoostingRegressor
+
+from forecasting.train_model import export_compiled_ensemble
+from forecasting.inference import CompiledEnsemble, _score_ml
+
+
+def _training_frame(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame({
+        'pressure': rng.normal(1013, 8, n),
+        'humidity': rng.uniform(20, 100, n),
+        'Pain_Lag_1': rng.integers(0, 10, n).astype(float),
+        'prcp': rng.exponential(2, n),
+    })
+    # Sprinkle missing values so the missing-value branches get trained
+    X.loc[rng.random(n) < 0.1, 'humidity'] = np.nan
+    y_clf = ((X['pressure'] < 1010) | (X['Pain_Lag_1'] > 6)).astype(int)
+    y_reg = np.log1p((X['Pain_Lag_1'] * 0.5 + rng.normal(0, 1, n)).clip(0, 10))
+    return X, y_clf, y_reg
+
+
+@pytest.fixture(scope="module")
+def fitted():
+    X, y_clf, y_reg = _training_frame()
+    clf = HistGradientBoostingClassifier(max_depth=5, max_iter=100, random_state=42).fit(X, y_clf)
+    reg = HistGradientBoostingRegressor(max_depth=5, max_iter=100, random_state=42).fit(X, y_reg)
+    return clf, reg
+
+
+def test_compiled_matches_sklearn_batch(fitted):
+    clf, reg = fitted
+    X, _, _ = _training_frame(n=200, seed=1)
+    X.loc[::7, 'pressure'] = np.nan  # missing values never seen in training for this column
+
+    c_clf = CompiledEnsemble(export_compiled_ensemble(clf))
+    c_reg = CompiledEnsemble(export_compiled_ensemble(reg))
+
+    np.testing.assert_allclose(c_clf.predict_proba(X), clf.predict_proba(X), rtol=0, atol=1e-12)
+    np.testing.assert_allclose(c_reg.predict(X), reg.predict(X), rtol=0, atol=1e-12)
+    np.testing.assert_array_equal(c_clf.predict(X), clf.predict(X))
+
+
+def test_compiled_single_row_from_features(fitted):
+    clf, reg = fitted
+    c_clf = CompiledEnsemble(export_compiled_ensemble(clf))
+    c_reg = CompiledEnsemble(export_compiled_ensemble(reg))
+
+    features = {'prcp': 0.0, 'Pain_Lag_1': 7.0, 'humidity': np.nan, 'pressure': 1002.5, 'unused': 1}
+    X = pd.DataFrame([features])
+
+    expected = _score_ml(clf, reg, X)
+    actual = _score_ml(c_clf, c_reg, None, feature_rows=[features])
+    np.testing.assert_allclose(actual[0], expected[0], atol=1e-12)
+    np.testing.assert_allclose(actual[1], expected[1], atol=1e-12)
+
+
+def test_compiled_missing_feature_raises(fitted):
+    clf, _ = fitted
+    c_clf = CompiledEnsemble(export_compiled_ensemble(clf))
+    with pytest.raises(KeyError):
+        c_clf.rows_from_features([{'pressure': 1010.0}])
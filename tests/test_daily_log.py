@@ -0,0 +1,49 @@
+"""
+Tests for the SQL daily aggregation behind the training timeline.
+"""
+import sqlite3
+
+import pandas as pd
+
+from conftest import make_log_db
+from forecasting import data_loader
+from services.entry_service import EntryService
+
+COLUMNS = ['Date', *data_loader.DAILY_LOG_COLUMNS]
+
+
+def test_sql_aggregation_matches_the_pandas_groupby(tmp_path):
+    db = str(tmp_path / "daily.db")
+    make_log_db(db)
+    weather = pd.DataFrame({'date': [], 'tavg': []})
+
+    expected = data_loader.combine_daily(data_loader.load_migraine_log_from_db(db), weather)
+    actual = data_loader.combine_daily(data_loader.load_daily_log(db), weather)
+
+    assert list(actual.columns) == COLUMNS + ['tavg']
+    pd.testing.assert_frame_equal(actual[COLUMNS], expected[COLUMNS], check_dtype=False)
+    # Days without entries are on the timeline, with no pain
+    assert len(actual) == (actual['Date'].max() - actual['Date'].min()).days + 1
+    assert (actual.loc[actual['id'].isna(), 'Pain Level'] == 0).all()
+
+
+def test_daily_rows_for_selected_days(tmp_path):
+    db = str(tmp_path / "daily.db")
+    conn = sqlite3.connect(db)
+    EntryService._create_table_if_not_exists(conn)
+    conn.executemany(
+        'INSERT INTO migraine_log (Date, "Pain Level", Sleep, Latitude, Longitude) VALUES (?, ?, ?, ?, ?)', [
+            ('2025-01-01', 4, '7', None, None),
+            ('2025-01-01', 8, 'n/a', 34.05, -118.25),
+            ('2025-01-01', None, '6', 40.7, -74.0),
+            ('2025-01-02', 2, '', None, None),
+            ('not a date', 9, '5', None, None),
+        ]
+    )
+
+    rows = data_loader.daily_log_rows(conn, ['2025-01-01'])
+    everything = data_loader.daily_log_rows(conn)
+    conn.close()
+
+    assert rows == [('2025-01-01', 8, 6.5, None, 1, 34.05, -118.25)]
+    assert [r[0] for r in everything] == ['2025-01-01', '2025-01-02']
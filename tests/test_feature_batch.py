@@ -0,0 +1,82 @@
+"""
+Tests for FeatureEngine.construct_features_batch (one vectorised pass over many dates).
+"""
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from forecasting.feature_engine import FeatureEngine
+
+
+def _history(seed=3, days=80):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2025-01-01", periods=days, freq="D")
+    keep = rng.random(days) > 0.3  # Gaps: missing days count as no pain
+    return pd.DataFrame({
+        "Date": dates[keep],
+        "Pain Level": rng.integers(0, 11, keep.sum()).astype(float),
+        "Time": "08:00",
+    })
+
+
+def _reference_lags(target, history):
+    """Lags the way construct_features computed them before batching: one dict lookup per day."""
+    pain_map = dict(zip(history["Date"].dt.date, history["Pain Level"]))
+    last_30 = [pain_map.get(target.date() - timedelta(days=i), 0.0) for i in range(1, 31)]
+    return {
+        "Pain_Lag_1": last_30[0], "Pain_Lag_2": last_30[1], "Pain_Lag_3": last_30[2], "Pain_Lag_7": last_30[6],
+        "Pain_Rolling_Mean_3": np.mean(last_30[:3]),
+        "Pain_Rolling_Mean_7": np.mean(last_30[:7]),
+        "Pain_Rolling_Mean_30": np.mean(last_30),
+    }
+
+
+def test_batch_matches_per_day_lags():
+    history = _history()
+    targets = [pd.Timestamp("2025-01-01") + timedelta(days=i) for i in range(-5, 95, 3)]
+
+    X, rows = FeatureEngine.construct_features_batch(targets, history)
+
+    assert len(X) == len(rows) == len(targets)
+    for target, row in zip(targets, rows):
+        for name, value in _reference_lags(target, history).items():
+            assert row[name] == pytest.approx(value), (target, name)
+        assert row["DayOfWeek"] == target.dayofweek
+        assert row["Month_sin"] == pytest.approx(np.sin(2 * np.pi * target.month / 12))
+
+
+def test_single_day_wrapper_matches_batch_row():
+    history = _history()
+    weather = {"tavg": 12.0, "pres": 1012.0, "average_humidity": 70.0, "source": "live"}
+    target = pd.Timestamp("2025-03-10")
+
+    X_one, row_one = FeatureEngine.construct_features(target, history, weather_data=dict(weather))
+    _, rows = FeatureEngine.construct_features_batch([target, target + timedelta(days=1)], history, [dict(weather), None])
+
+    assert row_one == rows[0]
+    assert list(X_one.columns) == list(row_one)
+    assert row_one["humid.*tavg"] == 70.0 * 12.0
+
+
+def test_rows_without_weather_lack_weather_features():
+    history = _history()
+    targets = [pd.Timestamp("2025-03-10"), pd.Timestamp("2025-03-11")]
+
+    X, rows = FeatureEngine.construct_features_batch(targets, history, [{"tavg": 10.0, "pres": 1000.0}, None])
+
+    assert "pres" in rows[0] and "pres" not in rows[1]
+    assert rows[1]["source"] == "unknown"
+    assert np.isnan(X.loc[1, "pres"])
+
+
+def test_pain_map_overrides_history_and_nan_only_affects_its_windows():
+    target = pd.Timestamp("2025-02-01")
+    pain_map = {(target - timedelta(days=1)).date(): 6.0, (target - timedelta(days=5)).date(): float("nan")}
+
+    _, (row,) = FeatureEngine.construct_features_batch([target], _history(), pain_map=pain_map)
+
+    assert row["Pain_Lag_1"] == 6.0
+    assert row["Pain_Rolling_Mean_3"] == 2.0
+    assert np.isnan(row["Pain_Rolling_Mean_7"])
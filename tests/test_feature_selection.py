@@ -5,6 +5,7 @@ import unittest
 import pandas as pd
 import numpy as np
 
+from forecasting import feature_engine
 from forecasting.feature_engine import FeatureEngine
 
 
@@ -112,6 +113,44 @@ class TestFeatureSelection(unittest.TestCase):
         self.assertEqual(dropped, [], "No features should be dropped (none are truly correlated)")
         self.assertEqual(len(selected), 3)
 
+    def test_matches_pandas_pairwise_correlation_with_nans(self):
+        """Pairwise-complete correlations agree with DataFrame.corr, including undefined pairs."""
+        rng = np.random.default_rng(7)
+        signal = rng.normal(size=200)
+        values = np.column_stack([signal * k + rng.normal(scale=0.3, size=200) + 1000 for k in (1, 2, 3)]
+                                 + [rng.normal(size=200), np.full(200, 5.0)])
+        values[rng.random(values.shape) < 0.2] = np.nan
+        df = pd.DataFrame(values, columns=["a", "b", "c", "d", "const"])
+
+        stats = feature_engine._correlation_stats(list(df.columns), values)
+
+        np.testing.assert_allclose(stats.abs_corr(), df.corr().abs().to_numpy(), atol=1e-9)
+        np.testing.assert_array_equal(stats.nan_counts(), df.isna().sum().to_numpy())
+
+    def test_expanding_folds_extend_cached_sums(self):
+        """A frame starting with an earlier frame's rows reuses (and matches) its sums."""
+        feature_engine.clear_correlation_cache()
+        rng = np.random.default_rng(3)
+        signal = rng.normal(size=120)
+        df = pd.DataFrame({
+            "tmax": signal,
+            "tsun": signal * 2.0 + rng.normal(scale=0.01, size=120),
+            "prcp": rng.normal(size=120),
+        })
+        df.iloc[70:, 1] = rng.normal(size=50)  # Correlated only early on
+
+        fold = FeatureEngine.select_features_by_correlation(df.iloc[:60])
+        cached = feature_engine._correlation_cache[tuple(df.columns)][-1]
+        full = FeatureEngine.select_features_by_correlation(df)
+
+        self.assertEqual(fold[1], ["tsun"])
+        self.assertEqual(full[1], [])
+        extended = feature_engine._correlation_cache[tuple(df.columns)][-1]
+        np.testing.assert_array_equal(extended.shift, cached.shift)
+        np.testing.assert_allclose(extended.abs_corr(), df.corr().abs().to_numpy(), atol=1e-9)
+        # Same rows again: served from the cache
+        self.assertIs(feature_engine._correlation_stats(list(df.columns), df.to_numpy()), extended)
+
 
 if __name__ == "__main__":
     unittest.main()
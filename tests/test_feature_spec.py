@@ -0,0 +1,107 @@
+"""
+Tests for the shared feature specification (training / inference parity).
+"""
+import sqlite3
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from forecasting import data_loader, feature_spec
+from forecasting.feature_engine import FeatureEngine
+from services.entry_service import EntryService
+
+WEATHER_KEYS = ['tmin', 'tmax', 'tavg', 'prcp', 'wspd', 'pres', 'average_humidity']
+
+
+def _day(offset):
+    return date(2025, 1, 1) + timedelta(days=offset)
+
+
+def _make_history(tmp_path, days=80, seed=11):
+    rng = np.random.default_rng(seed)
+    db = str(tmp_path / "spec.db")
+    conn = sqlite3.connect(db)
+    EntryService._create_table_if_not_exists(conn)
+    for offset in range(days):
+        if rng.random() < 0.4:
+            conn.execute(
+                'INSERT INTO migraine_log (Date, Time, "Pain Level", Sleep, "Physical Activity") VALUES (?, ?, ?, ?, ?)',
+                (_day(offset).isoformat(), "09:00", int(rng.integers(1, 11)), "2", "1")
+            )
+    conn.commit()
+    conn.close()
+
+    tmin = rng.normal(10, 4, days)
+    weather = pd.DataFrame({
+        'date': [_day(i).isoformat() for i in range(days)],
+        'tmin': tmin,
+        'tmax': tmin + rng.uniform(3, 12, days),
+        'tavg': tmin + 4,  # Not the mid-range: training uses (tmax + tmin) / 2
+        'prcp': rng.uniform(0, 5, days),
+        'wspd': rng.uniform(0, 20, days),
+        'pres': rng.normal(1013, 6, days),
+        'average_humidity': rng.uniform(30, 90, days),
+    })
+    weather_file = str(tmp_path / "weather.csv")
+    weather.to_csv(weather_file, index=False)
+    return db, weather_file, weather
+
+
+def test_inference_matches_training_on_a_historical_date(tmp_path):
+    db, weather_file, weather = _make_history(tmp_path)
+    merged = data_loader.merge_migraine_and_weather_data(
+        weather_data_file=weather_file, db_path=db, output_file=str(tmp_path / "combined.csv"), return_df=True
+    )
+    training = data_loader.process_combined_data(input_df=merged)
+
+    target = pd.Timestamp(_day(60))
+    expected = training.loc[training['Date'] == target].iloc[0]
+
+    # Forecast the same day, with the two days before it (pressure change lags need them)
+    history = data_loader.get_recent_history(db, days=1000)
+    history = history[history['Date'] < target]
+    weathers = [{key: float(weather.loc[i, key]) for key in WEATHER_KEYS} for i in (58, 59, 60)]
+    _, rows = FeatureEngine.construct_features_batch(
+        [target - timedelta(days=2), target - timedelta(days=1), target], history, weathers
+    )
+    actual = rows[2]
+
+    compared = [f.name for f in feature_spec.FEATURES if f.source != 'log' and f.name in training.columns]
+    assert {'tavg', 'tdiff', 'pres_change', 'pres_change_lag1', 'tavg_lag1', 'Pain_Rolling_Mean_30'} <= set(compared)
+    for name in compared:
+        assert actual[name] == pytest.approx(expected[name]), name
+    # What a forecast cannot know uses the declared fallbacks
+    assert actual['Sleep'] == 2.0 and actual['Physical Activity'] == 1.5
+
+
+def test_weather_lags_fall_back_before_the_first_target_day():
+    _, (row,) = FeatureEngine.construct_features_batch(
+        [pd.Timestamp("2025-03-01")], pd.DataFrame({'Date': pd.to_datetime([]), 'Pain Level': []}),
+        [{'tmin': 10.0, 'tmax': 20.0, 'pres': 1010.0, 'pres_change': -3.0}]
+    )
+
+    assert row['tavg'] == 15.0 and row['tavg_lag1'] == 15.0
+    assert row['pres_change'] == -3.0 and row['pres_change_lag1'] == 0.0
+    assert row['Pain_Lag_1'] == 0.0
+
+
+def test_only_the_model_features_are_computed():
+    compiled = [f.name for f in feature_spec.compile_features(['humid.*tavg', 'Month_sin'])]
+
+    # Inputs and the heuristic's Pain_Lag_1 come along, dropped features do not
+    assert compiled == ['tmin', 'tmax', 'average_humidity', 'Month', 'Month_sin', 'tavg', 'humid.*tavg', 'Pain_Lag_1']
+
+    _, (row,) = FeatureEngine.construct_features_batch(
+        [pd.Timestamp("2025-03-01")], pd.DataFrame({'Date': pd.to_datetime([]), 'Pain Level': []}),
+        [{'tmin': 10.0, 'tmax': 20.0, 'average_humidity': 50.0}], feature_names=['humid.*tavg', 'Month_sin']
+    )
+    assert row['humid.*tavg'] == 50.0 * 15.0
+    assert 'tdiff' not in row and 'Pain_Rolling_Mean_30' not in row and 'DayOfWeek' not in row
+
+
+def test_training_columns_are_reproducible_at_inference():
+    columns = ['id', 'Date', 'Pain Level', 'Notes', 'Latitude_x', 'tavg', 'Pain_Lag_1', 'Sleep']
+
+    assert feature_spec.training_columns(columns) == ['tavg', 'Pain_Lag_1', 'Sleep']
@@ -0,0 +1,159 @@
+"""
+Tests for the incrementally maintained daily feature store.
+"""
+import sqlite3
+import time
+from datetime import date, timedelta
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import log_day, make_log_db
+from forecasting import data_loader, feature_store
+from forecasting.data_loader import PAIN_LAG_COLUMNS
+from services.entry_service import EntryService
+
+
+@pytest.fixture(autouse=True)
+def no_weather_history(tmp_path):
+    with patch.object(data_loader, 'weather_data_filename', str(tmp_path / "no_weather.csv")):
+        yield
+
+
+def _store(db):
+    conn = sqlite3.connect(db)
+    feature_store.ensure_current(conn, db)
+    df = pd.read_sql_query(f"SELECT * FROM {feature_store.TABLE} ORDER BY Date", conn)
+    conn.close()
+    return df
+
+
+def _rebuilt(db):
+    conn = sqlite3.connect(db)
+    with conn:
+        feature_store.rebuild(conn, db)
+    conn.close()
+    return _store(db)
+
+
+def test_training_frame_matches_the_merge_pipeline(tmp_path):
+    db = str(tmp_path / "store.db")
+    make_log_db(db)
+
+    merged = data_loader.merge_migraine_and_weather_data(db_path=db, output_file=str(tmp_path / "combined.csv"), return_df=True)
+    expected = data_loader.process_combined_data(input_df=merged)
+    actual = data_loader.process_combined_data(input_df=feature_store.load_training_frame(db), lags_precomputed=True)
+
+    columns = [c for c in expected.columns if c not in feature_store.TEXT_COLUMNS]
+    assert list(actual.columns) == columns
+    pd.testing.assert_frame_equal(actual, expected[columns], check_dtype=False)
+
+
+def test_add_update_delete_match_a_rebuild(tmp_path):
+    db = str(tmp_path / "store.db")
+    make_log_db(db)
+    _store(db)  # Initial build
+
+    EntryService.add_entry({'Date': log_day(40), 'Time': '23:00', 'Pain Level': 10, 'Sleep': '1'}, db)
+    EntryService.add_entry({'Date': log_day(100), 'Time': '09:00', 'Pain Level': 6}, db)  # Extends the timeline
+    incremental = _store(db)
+    assert incremental['Date'].iloc[-1] == log_day(100)
+    pd.testing.assert_frame_equal(incremental, _rebuilt(db))
+
+    conn = sqlite3.connect(db)
+    entry_id = conn.execute("SELECT id FROM migraine_log WHERE Date = ? LIMIT 1", (log_day(20),)).fetchone()[0]
+    conn.close()
+    EntryService.update_entry(entry_id, {'Date': log_day(55), 'Pain Level': 9}, db)  # Moves to another day
+    pd.testing.assert_frame_equal(_store(db), _rebuilt(db))
+
+    conn = sqlite3.connect(db)
+    last_id = conn.execute("SELECT id FROM migraine_log WHERE Date = ?", (log_day(100),)).fetchone()[0]
+    conn.close()
+    EntryService.delete_entry(last_id, db)  # Shrinks the timeline again
+    incremental = _store(db)
+    assert incremental['Date'].iloc[-1] == log_day(89)
+    pd.testing.assert_frame_equal(incremental, _rebuilt(db))
+
+
+def test_edit_only_touches_the_lookback_window(tmp_path):
+    db = str(tmp_path / "store.db")
+    make_log_db(db)
+    before = _store(db)
+
+    EntryService.add_entry({'Date': log_day(10), 'Time': '23:30', 'Pain Level': 10}, db)
+    after = _store(db)
+
+    changed = after.index[(after[PAIN_LAG_COLUMNS + ['Pain Level']].fillna(-1) != before[PAIN_LAG_COLUMNS + ['Pain Level']].fillna(-1)).any(axis=1)]
+    window = range(10, 10 + feature_store.LOOKBACK_DAYS + 1)
+    assert set(changed) <= set(window)
+
+
+def test_external_writes_trigger_a_rebuild(tmp_path):
+    db = str(tmp_path / "store.db")
+    make_log_db(db)
+    _store(db)
+
+    conn = sqlite3.connect(db)
+    conn.execute('INSERT INTO migraine_log (Date, Time, "Pain Level") VALUES (?, ?, ?)', (log_day(30), "10:00", 10))
+    conn.commit()
+    conn.close()
+
+    store = _store(db)
+    assert store.loc[store['Date'] == log_day(30), 'Pain Level'].item() == 10
+    assert store.loc[store['Date'] == log_day(31), 'Pain_Lag_1'].item() == 10
+
+
+def test_recent_pain_feeds_inference_lags(tmp_path):
+    from forecasting import inference
+    from forecasting.feature_engine import FeatureEngine
+
+    db = str(tmp_path / "store.db")
+    make_log_db(db)
+    store = _store(db)
+
+    context = inference.get_prediction_context(db)
+    last = date.fromisoformat(store['Date'].iloc[-1])
+    assert context.pain_map[last] == store['Pain Level'].iloc[-1]
+
+    _, features = FeatureEngine.construct_features(
+        pd.Timestamp(last + timedelta(days=1)), context.history, weather_data={}, pain_map=context.pain_map
+    )
+    assert features['Pain_Lag_1'] == store['Pain Level'].iloc[-1]
+    assert features['Pain_Rolling_Mean_7'] == pytest.approx(store['Pain Level'].iloc[-7:].mean())
+
+
+def test_stale_store_is_rebuilt_off_the_request_path(tmp_path):
+    db = str(tmp_path / "store.db")
+    make_log_db(db)
+    _store(db)
+    conn = sqlite3.connect(db)
+    conn.execute('INSERT INTO migraine_log (Date, Time, "Pain Level") VALUES (?, ?, ?)', (log_day(89), "20:00", 10))
+    conn.commit()
+
+    statements = []
+    conn.set_trace_callback(statements.append)
+    with patch.object(feature_store, 'schedule_rebuild') as mock_schedule:
+        assert feature_store.recent_pain(conn, db_path=db) is None
+    mock_schedule.assert_called_once_with(db)
+    # Freshness comes from the write counter: no log scan, no rebuild in the caller
+    assert not any('FROM migraine_log' in sql or 'INSERT' in sql for sql in statements)
+
+    feature_store.schedule_rebuild(db)
+    for _ in range(200):
+        if feature_store.is_current(conn):
+            break
+        time.sleep(0.01)
+    statements.clear()
+    assert feature_store.recent_pain(conn, db_path=db)[date.fromisoformat(log_day(89))] == 10
+    assert not any('FROM migraine_log' in sql for sql in statements)
+    conn.close()
+
+
+def test_databases_without_a_log_are_left_alone(tmp_path):
+    db = str(tmp_path / "empty.db")
+    conn = sqlite3.connect(db)
+    assert feature_store.recent_pain(conn, db_path=db) is None
+    assert conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()[0] == 0
+    conn.close()
@@ -29,16 +29,13 @@ class TestForceHeuristic(unittest.TestCase):
         # DB Mock to return force_heuristic_mode=True
         mock_conn = MagicMock()
         mock_cursor = MagicMock()
-        # The query is: SELECT value FROM user_settings WHERE key='force_heuristic_mode'
-        # We need to ensure it returns 'true' when asked for that key.
-        
-        # Because connect is called multiple times (once for check, once inside fallback), 
-        # we need to be careful. The first call is the check.
+        # The query is: SELECT key, value FROM user_settings
+        # We need to ensure force_heuristic_mode comes back as 'true'.
         mock_connect.return_value = mock_conn
         mock_conn.cursor.return_value = mock_cursor
         
-        # Mock fetchone to return 'true'
-        mock_cursor.fetchone.return_value = ('true',)
+        # Settings are read as (key, value) rows
+        mock_cursor.fetchall.return_value = [('force_heuristic_mode', 'true')]
         
         # Execute
         result = inference.get_prediction_for_date("2026-01-01")
@@ -0,0 +1,62 @@
+"""
+Tests for the indexed, cached latest-location lookup.
+"""
+import sqlite3
+from unittest.mock import patch
+
+from forecasting import data_loader
+from services.entry_service import EntryService
+
+
+def _make_db(path, rows):
+    conn = sqlite3.connect(path)
+    EntryService._create_table_if_not_exists(conn)
+    conn.executemany('INSERT INTO migraine_log (Date, Time, "Pain Level", Latitude, Longitude) VALUES (?, ?, ?, ?, ?)', rows)
+    conn.commit()
+    conn.close()
+
+
+def test_latest_numeric_location_wins(tmp_path):
+    db = str(tmp_path / "location.db")
+    _make_db(db, [
+        ('2025-03-01', '08:00', 3, 40.7, -74.0),
+        ('2025-03-02', '07:00', 2, 51.5, -0.1),
+        ('2025-03-02', '21:00', 5, 34.05, -118.25),
+        ('2025-03-03', '09:00', 4, None, None),
+        ('2025-03-04', '10:00', 1, 'unknown', ''),
+    ])
+
+    assert data_loader.get_latest_location_from_db(db) == (34.05, -118.25)
+
+
+def test_no_location_and_missing_table(tmp_path):
+    db = str(tmp_path / "location.db")
+    _make_db(db, [('2025-03-01', '08:00', 3, None, None)])
+
+    assert data_loader.get_latest_location_from_db(db) == (None, None)
+    assert data_loader.get_latest_location_from_db(str(tmp_path / "empty.db")) == (None, None)
+
+
+def test_location_is_cached_until_an_entry_changes(tmp_path):
+    db = str(tmp_path / "location.db")
+    _make_db(db, [('2025-03-01', '08:00', 3, 40.7, -74.0)])
+    assert data_loader.get_latest_location_from_db(db) == (40.7, -74.0)
+
+    with patch.object(data_loader.sqlite3, 'connect', side_effect=AssertionError("no DB read")):
+        assert data_loader.get_latest_location_from_db(db) == (40.7, -74.0)
+
+    EntryService.add_entry({'Date': '2025-03-05', 'Time': '12:00', 'Pain Level': 6,
+                            'Latitude': 48.85, 'Longitude': 2.35}, db)
+    assert data_loader.get_latest_location_from_db(db) == (48.85, 2.35)
+
+
+def test_location_query_reads_the_date_index(tmp_path):
+    db = str(tmp_path / "location.db")
+    _make_db(db, [])
+    conn = sqlite3.connect(db)
+    plan = ' '.join(str(row[-1]) for row in conn.execute(
+        'EXPLAIN QUERY PLAN SELECT Latitude, Longitude FROM migraine_log ORDER BY Date DESC, Time DESC LIMIT 1'
+    ))
+    conn.close()
+
+    assert 'idx_migraine_log_date_time' in plan
@@ -0,0 +1,113 @@
+"""
+Tests for the memory-mapped columnar snapshot of migraine_log.
+"""
+import os
+import sqlite3
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from conftest import make_log_db
+from services import log_snapshot
+from services.analysis_service import AnalysisService
+from services.entry_service import EntryService
+
+
+def test_snapshot_columns_and_memory_maps(tmp_path):
+    db = str(tmp_path / "log.db")
+    make_log_db(db)
+    conn = sqlite3.connect(db)
+    log = pd.read_sql_query('SELECT * FROM migraine_log ORDER BY Date, id', conn)
+    conn.close()
+
+    snapshot = log_snapshot.get(db)
+    assert log_snapshot.get(db) is snapshot
+    log_snapshot.clear_memory(db)
+    mapped = log_snapshot.get(db)
+
+    assert isinstance(mapped.pain, np.memmap) and not mapped.pain.flags.writeable
+    assert len(mapped) == mapped.entries == len(log)
+    np.testing.assert_array_equal(mapped.id, log['id'])
+    np.testing.assert_array_equal(mapped.dates(), pd.to_datetime(log['Date']).values.astype('datetime64[D]'))
+    np.testing.assert_array_equal(mapped.pain, pd.to_numeric(log['Pain Level'], errors='coerce'))
+    np.testing.assert_array_equal(mapped.sleep, pd.to_numeric(log['Sleep'], errors='coerce'))
+    expected_minutes = [int(t[:2]) * 60 + int(t[3:]) if isinstance(t, str) and ':' in t else -1 for t in log['Time']]
+    assert list(mapped.minute) == expected_minutes
+
+
+def test_writes_from_any_connection_rebuild_the_snapshot(tmp_path):
+    db = str(tmp_path / "log.db")
+    make_log_db(db)
+    before = log_snapshot.get(db)
+
+    EntryService.add_entry({'Date': '2025-06-01', 'Time': '10:00', 'Pain Level': 4}, db)
+    added = log_snapshot.get(db)
+    assert len(added) == len(before) + 1 and added.epoch_day[-1] == (date(2025, 6, 1) - date(1970, 1, 1)).days
+
+    conn = sqlite3.connect(db)
+    conn.execute('UPDATE migraine_log SET "Pain Level" = 9 WHERE Date = ?', ('2025-06-01',))
+    conn.commit()
+    conn.close()
+    assert log_snapshot.get(db).pain[-1] == 9
+
+    # Only the current version's files are kept
+    files = [f for f in os.listdir(log_snapshot.snapshot_dir(db)) if f.endswith('.npy')]
+    assert len(files) == len(log_snapshot.COLUMNS)
+
+
+def test_analysis_reads_the_snapshot(tmp_path):
+    db = str(tmp_path / "log.db")
+    conn = sqlite3.connect(db)
+    EntryService._create_table_if_not_exists(conn)
+    conn.executemany('INSERT INTO migraine_log (Date, Time, "Pain Level", Medication) VALUES (?, ?, ?, ?)', [
+        ('2024-12-30', '08:00', 6, 'Ibuprofen'),
+        ('2025-02-01', '07:00', 3, ' Ibuprofen'),
+        ('2025-02-01', '19:00', 8, ''),
+        ('2025-02-02', '09:00', 0, 'Ibuprofen'),
+        ('2025-03-10', '10:00', 5, None),
+    ])
+    conn.commit()
+    conn.close()
+
+    stats = AnalysisService.get_analysis_data(db)
+
+    assert stats['yearly_counts'] == {2024: 1, 2025: 2}
+    # Blank medication is "No Medication", a NULL one "None"
+    assert stats['medication_counts'] == {'Ibuprofen': 2, 'No Medication': 1, 'None': 1}
+    assert stats['past_12_months_counts'] == {'December 2024': 1, 'February 2025': 1, 'March 2025': 1}
+    # One migraine per day, the day's latest entry
+    assert stats['avg_pain'] == round((6 + 8 + 5) / 3, 1) and stats['max_pain'] == 8
+
+    trends = AnalysisService.get_trends_data(db, 'all')
+    assert [(t['name'], t['value']) for t in trends] == [('Dec 2024', 1), ('Feb 2025', 1), ('Mar 2025', 1)]
+
+
+def test_unversioned_logs_are_read_but_not_saved(tmp_path):
+    db = str(tmp_path / "log.db")
+    conn = sqlite3.connect(db)
+    conn.execute('CREATE TABLE migraine_log (id INTEGER PRIMARY KEY, Date TEXT, Time TEXT, "Pain Level" INTEGER, '
+                 'Sleep TEXT, "Physical Activity" TEXT, Latitude REAL, Longitude REAL)')
+    conn.execute('INSERT INTO migraine_log (Date, Time, "Pain Level") VALUES (?, ?, ?)', ('2025-01-01', '08:00', 4))
+    conn.execute('INSERT INTO migraine_log (Date, Time, "Pain Level") VALUES (?, ?, ?)', ('not a date', '08:00', 4))
+    conn.commit()
+
+    snapshot = log_snapshot.get(db, conn=conn)
+    conn.close()
+
+    assert len(snapshot) == 1 and snapshot.entries == 2
+    assert not os.path.exists(log_snapshot.snapshot_dir(db))
+
+
+def test_snapshots_live_in_the_cache_area_and_go_with_their_database(tmp_path, snapshot_root):
+    db = str(tmp_path / "profile.db")
+    make_log_db(db)
+    log_snapshot.get(db)
+
+    directory = log_snapshot.snapshot_dir(db)
+    assert directory == os.path.join(snapshot_root, "profile") and os.path.isdir(directory)
+
+    # A reset database (no log any more) drops what was saved for it
+    os.remove(db)
+    log_snapshot.get(db)
+    assert not os.path.exists(directory)
@@ -0,0 +1,90 @@
+"""
+Tests for streaming migraine_log in chunks (data_loader.iter_migraine_log).
+"""
+import sqlite3
+import tracemalloc
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from forecasting import data_loader
+from services import log_snapshot
+from services.entry_service import EntryService
+
+
+def _make_db(path, rows):
+    conn = sqlite3.connect(path)
+    EntryService._create_table_if_not_exists(conn)
+    conn.executemany(
+        'INSERT INTO migraine_log (Date, Time, "Pain Level", Sleep, Notes) VALUES (?, ?, ?, ?, ?)',
+        [(f"2020-{1 + i % 12:02d}-{1 + i % 28:02d}" if i % 97 else "someday", f"{i % 24:02d}:15",
+          i % 10, str(i % 9), "note " * (i % 20)) for i in range(rows)]
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_chunks_are_bounded_and_date_ordered(tmp_path):
+    db = str(tmp_path / "stream.db")
+    _make_db(db, 250)
+
+    chunks = list(data_loader.iter_migraine_log(db, columns=['id', 'Date', 'Pain Level'], chunk_size=40))
+
+    assert [len(c) for c in chunks] == [40] * 6 + [10]
+    assert list(chunks[0].columns) == ['id', 'Date', 'Pain Level']
+    conn = sqlite3.connect(db)
+    expected = pd.read_sql_query('SELECT id, Date, "Pain Level" FROM migraine_log ORDER BY Date, id', conn)
+    conn.close()
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), expected)
+    assert list(data_loader.iter_migraine_log(str(tmp_path / "empty.db"))) == []
+
+
+def test_chunked_snapshot_matches_an_unchunked_read(tmp_path):
+    db = str(tmp_path / "stream.db")
+    _make_db(db, 1000)
+
+    with patch.object(data_loader, 'LOG_CHUNK_SIZE', 64):
+        chunked = log_snapshot.get(db)
+    conn = sqlite3.connect(db)
+    with patch.object(data_loader, 'LOG_CHUNK_SIZE', 10 ** 6):
+        whole = log_snapshot._read_log(conn)
+    conn.close()
+
+    # Rows with an unparseable Date are left out
+    assert len(chunked) == len(whole) == 1000 - 11 and chunked.entries == 1000
+    for name in log_snapshot.COLUMNS:
+        np.testing.assert_array_equal(getattr(chunked, name), getattr(whole, name))
+
+
+def test_snapshot_build_memory_does_not_grow_with_the_log(tmp_path):
+    peaks = []
+    for rows in (1000, 10000):
+        db = str(tmp_path / f"stream_{rows}.db")
+        _make_db(db, rows)
+        with patch.object(data_loader, 'LOG_CHUNK_SIZE', 250):
+            log_snapshot.get(db)  # Warm up imports
+            log_snapshot.clear_memory()
+            EntryService.add_entry({'Date': '2021-01-01', 'Time': '10:00', 'Pain Level': 3}, db)
+            tracemalloc.start()
+            log_snapshot.get(db)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+
+    assert peaks[1] < peaks[0] + (1 << 20)
+
+
+def test_stream_reads_count_and_rows_in_one_transaction(tmp_path):
+    db = str(tmp_path / "stream.db")
+    _make_db(db, 300)
+    conn = sqlite3.connect(db)
+    statements = []
+    conn.set_trace_callback(statements.append)
+
+    with patch.object(data_loader, 'LOG_CHUNK_SIZE', 97):
+        snapshot = log_snapshot._read_log(conn)
+
+    assert statements[0] == 'BEGIN' and not conn.in_transaction
+    # Rows with an unparseable Date (every 97th) are left out
+    assert len(snapshot) == 300 - 4 and snapshot.entries == 300
+    conn.close()
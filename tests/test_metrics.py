@@ -0,0 +1,116 @@
+"""
+Tests for the prediction pipeline latency metrics and Server-Timing header.
+"""
+import asyncio
+import time
+from unittest.mock import patch, MagicMock
+
+import numpy as np
+import pandas as pd
+from fastapi.testclient import TestClient
+
+from services import metrics
+from forecasting.prediction_context import PredictionContext
+
+
+def test_histogram_percentiles():
+    metrics.reset()
+    for ms in range(1, 101):
+        metrics.record("stage.a", float(ms))
+
+    stats = metrics.snapshot()["stage.a"]
+    assert stats["count"] == 100
+    assert stats["p50_ms"] in (50.0, 51.0)
+    assert stats["p95_ms"] in (95.0, 96.0)
+    assert stats["max_ms"] == 100.0
+    assert stats["mean_ms"] == 50.5
+    metrics.reset()
+
+
+def test_timed_sync_and_async():
+    metrics.reset()
+
+    @metrics.timed("stage.sync")
+    def work():
+        time.sleep(0.01)
+        return 1
+
+    @metrics.timed("stage.async")
+    async def async_work():
+        await asyncio.sleep(0.01)
+        return 2
+
+    token = metrics.begin_request()
+    assert work() == 1
+    assert asyncio.run(async_work()) == 2
+    spans = metrics.end_request(token)
+
+    stats = metrics.snapshot()
+    assert stats["stage.sync"]["count"] == 1 and stats["stage.sync"]["max_ms"] >= 10
+    assert stats["stage.async"]["count"] == 1
+    assert [name for name, _ in spans] == ["stage.sync", "stage.async"]
+    # Spans outside a request are not collected
+    work()
+    assert metrics.snapshot()["stage.sync"]["count"] == 2
+    metrics.reset()
+
+
+def test_server_timing_header_sums_repeated_stages():
+    header = metrics.server_timing_header([("weather.forecast", 10.0), ("model.score", 1.25), ("weather.forecast", 5.0)], 20.0)
+    assert header == 'weather-forecast;dur=15.0;desc="x2", model-score;dur=1.2, total;dur=20.0'
+
+
+def test_prediction_response_carries_server_timing_and_metrics():
+    from api.main import app
+    from api.dependencies import get_db_path_dep
+
+    metrics.reset()
+    history = pd.DataFrame({'Date': pd.to_datetime(['2030-01-01']), 'Pain Level': [3]})
+    context = PredictionContext("/tmp/metrics.db", history, (None, None), {})
+    clf = MagicMock()
+    clf.feature_names_in_ = np.array(['Pain_Lag_1', 'DayOfWeek'])
+    clf.predict_proba.side_effect = lambda X: np.column_stack([np.full(len(X), 0.6), np.full(len(X), 0.4)])
+    reg = MagicMock()
+    reg.predict.side_effect = lambda X: np.zeros(len(X))
+
+    app.dependency_overrides[get_db_path_dep] = lambda: "/tmp/metrics.db"
+    try:
+        with patch('forecasting.inference.get_prediction_context', return_value=context), \
+             patch('forecasting.inference.load_models', return_value=(clf, reg)), \
+             patch('forecasting.inference._latest_model_version', return_value="1"):
+            client = TestClient(app)
+            response = client.get("/api/v1/prediction/future?date=2030-01-02")
+            stats = client.get("/api/v1/metrics")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    timing = response.headers["Server-Timing"]
+    for stage in ("predict-daily", "features-construct", "model-score", "total"):
+        assert stage in timing
+    assert "Server-Timing" not in stats.headers
+
+    stages = stats.json()["stages"]
+    assert stages["predict.daily"]["count"] == 1
+    assert stages["model.score"]["count"] == 1
+    assert set(stages["predict.daily"]) == {"count", "mean_ms", "p50_ms", "p95_ms", "max_ms"}
+    metrics.reset()
+
+
+def test_hourly_forecast_is_timed_as_a_whole():
+    from forecasting import inference
+
+    metrics.reset()
+    history = pd.DataFrame({'Date': pd.to_datetime(['2030-01-01']), 'Pain Level': [3]})
+    context = PredictionContext("/tmp/metrics.db", history, (None, None), {})
+
+    with patch('forecasting.inference._daily_anchors', return_value={}), \
+         patch('forecasting.inference._circadian_priors', return_value=[1.0] * 24) as mock_priors:
+        token = metrics.begin_request()
+        inference.get_hourly_forecast("2030-01-02 00:00", context=context, hourly_weather=[])
+        spans = metrics.end_request(token)
+
+    assert mock_priors.call_count == 1
+    assert [name for name, _ in spans].count("predict.hourly") == 1
+    assert metrics.snapshot()["predict.hourly"]["count"] == 1
+    metrics.reset()
@@ -79,6 +79,12 @@ def test_model_versioning_and_cleanup(mock_model_dir):
     clf_files = glob.glob(os.path.join(mock_model_dir, 'best_model_clf_*.pkl'))
     assert len(clf_files) == 2
     
+def _seed_models(version, clf, reg):
+    """Pretends the default database's pair `version` is already loaded."""
+    inf.unload_models()
+    inf._loaded_models[inf.MODEL_DIR] = {'version': version, 'clf': clf, 'reg': reg, 'last_used': time.monotonic()}
+
+
 @patch('joblib.load')
 @patch('os.path.exists')
 @patch('glob.glob')
@@ -91,17 +97,16 @@ def test_inference_cache_invalidation(mock_glob, mock_exists, mock_load):
     mock_glob.return_value = [os.path.join(inf.MODEL_DIR, 'best_model_clf_2000.pkl')]
     
     # Reset inference globals for clean state
-    inf._prediction_cache = {"some_date": "cached_result"}
-    inf._clf_model = "old_model"
-    inf._reg_model = "old_model"
-    inf._loaded_model_version = "1000"
+    inf._prediction_cache.clear()
+    inf._prediction_cache.set(("db", "some_date"), "cached_result")
+    _seed_models("1000", "old_model", "old_model")
     
     inf.load_models()
         
     # Cache should be cleared
     assert len(inf._prediction_cache) == 0
     # Models should be loaded from the "2000" path
-    assert inf._loaded_model_version == "2000"
+    assert inf._loaded_models[inf.MODEL_DIR]['version'] == "2000"
     # joblib.load should have been called twice (clf and reg)
     assert mock_load.call_count == 2
     
@@ -110,3 +115,138 @@ def test_inference_cache_invalidation(mock_glob, mock_exists, mock_load):
     # Verify mmap_mode='r' was passed
     assert kwargs.get('mmap_mode') == 'r'
 
+
+def test_promotion_writes_manifest(mock_model_dir):
+    """The manifest records version, features, selected features, metrics and file hashes."""
+    import json
+    import pandas as pd
+    import numpy as np
+    from forecasting.train_model import TrainingManager
+    from forecasting import model_registry
+
+    manager = TrainingManager()
+    manager.cv_metrics = {'folds': 5, 'accuracy': 0.8, 'mae': 1.2, 'thresholds': [0.5]}
+    X = pd.DataFrame({"A": np.arange(40.0), "B": np.arange(40.0) * 2, "C": np.random.rand(40)})
+    y_bin = pd.Series([0, 1] * 20)
+    y_reg = pd.Series(np.random.rand(40))
+    manager.train_final_and_save(X, y_bin, y_reg, np.ones(40))
+
+    with open(os.path.join(mock_model_dir, model_registry.MANIFEST_NAME)) as f:
+        manifest = json.load(f)
+
+    assert manifest['features'] == ['A', 'B', 'C']
+    assert manifest['selected_features'] == ['A', 'C']  # B is perfectly correlated with A
+    assert manifest['cv_metrics']['accuracy'] == 0.8
+    for info in manifest['files'].values():
+        path = os.path.join(mock_model_dir, info['path'])
+        assert model_registry.file_sha256(path) == info['sha256']
+    # No temp files left behind
+    assert not glob.glob(os.path.join(mock_model_dir, '*.tmp'))
+
+    # Array-backed copies ship with the pair and are what inference loads
+    assert {'compiled_clf', 'compiled_reg'}.issubset(manifest['files'])
+    inf.unload_models()
+    clf, reg = inf.load_models()
+    assert isinstance(clf, inf.CompiledEnsemble)
+    assert list(clf.feature_names_in_) == ['A', 'C']
+
+
+def test_inference_loads_from_manifest_without_scanning(mock_model_dir):
+    """With a manifest present, load_models never globs the model directory."""
+    from forecasting import model_registry
+
+    model_registry.promote(mock_model_dir, "3000", {'clf': {'m': 'clf'}, 'reg': {'m': 'reg'}},
+                           dump=joblib.dump, features=['A'], selected_features=['A'])
+    inf.unload_models()
+
+    with patch('glob.glob', side_effect=AssertionError("glob must not be called")):
+        clf, reg = inf.load_models()
+        assert clf == {'m': 'clf'}
+        assert reg == {'m': 'reg'}
+        assert inf._loaded_models[mock_model_dir]['version'] == "3000"
+        # Repeated calls only stat the manifest
+        assert inf.load_models() == (clf, reg)
+
+    inf.unload_models()
+
+
+def test_inference_rejects_tampered_pair(mock_model_dir):
+    """A pair whose hash doesn't match the manifest is never swapped in."""
+    from forecasting import model_registry
+
+    manifest = model_registry.promote(mock_model_dir, "4000", {'clf': {'m': 'clf'}, 'reg': {'m': 'reg'}},
+                                      dump=joblib.dump, features=['A'], selected_features=['A'])
+    with open(os.path.join(mock_model_dir, manifest['files']['reg']['path']), 'ab') as f:
+        f.write(b"half-written")
+
+    _seed_models("1000", "previous_clf", "previous_reg")
+
+    assert inf.load_models() == ("previous_clf", "previous_reg")
+    assert inf._loaded_models[mock_model_dir]['version'] == "1000"
+
+    # The failure is remembered: later requests only stat the manifest
+    with patch.object(model_registry, 'verify_files', side_effect=AssertionError("re-hashed")):
+        assert inf.load_models() == ("previous_clf", "previous_reg")
+        inf.unload_models()
+        assert inf.load_models() == (None, None)
+
+    # A new promotion is verified again
+    model_registry.promote(mock_model_dir, "5000", {'clf': {'m': 'clf5'}, 'reg': {'m': 'reg5'}},
+                           dump=joblib.dump, features=['A'], selected_features=['A'])
+    assert inf.load_models() == ({'m': 'clf5'}, {'m': 'reg5'})
+
+    inf.unload_models()
+
+
+def test_profiles_train_into_their_own_namespace(mock_model_dir):
+    """Each database gets its own model directory; the default one keeps the root."""
+    from forecasting import model_registry
+
+    assert inf.get_model_dir(None) == mock_model_dir
+    assert inf.get_model_dir("/data/migraine_log.db") == mock_model_dir
+    alice_dir = inf.get_model_dir("/data/alice.db")
+    assert alice_dir == os.path.join(mock_model_dir, "profiles", "alice")
+    assert tm.get_model_dir("/data/alice.db") == alice_dir
+
+    model_registry.promote(mock_model_dir, "5000", {'clf': {'m': 'default'}, 'reg': {'m': 'default'}},
+                           dump=joblib.dump, features=['A'], selected_features=['A'])
+    model_registry.promote(alice_dir, "6000", {'clf': {'m': 'alice'}, 'reg': {'m': 'alice'}},
+                           dump=joblib.dump, features=['A'], selected_features=['A'])
+    inf.unload_models()
+
+    assert inf.load_models("/data/migraine_log.db")[0] == {'m': 'default'}
+    assert inf.load_models("/data/alice.db")[0] == {'m': 'alice'}
+    assert inf.load_models("/data/bob.db") == (None, None)
+    assert inf._latest_model_version("/data/alice.db") == "6000"
+    assert inf._latest_model_version("/data/bob.db") is None
+
+    # Switching back and forth never reloads from disk
+    with patch('joblib.load', side_effect=AssertionError("must not reload")):
+        for _ in range(3):
+            assert inf.load_models("/data/alice.db")[0] == {'m': 'alice'}
+            assert inf.load_models(None)[0] == {'m': 'default'}
+
+    inf.unload_models()
+
+
+def test_loaded_models_are_bounded_and_released_when_idle(mock_model_dir):
+    from forecasting import model_registry
+
+    for name in ("a", "b", "c"):
+        model_registry.promote(inf.get_model_dir(f"/data/{name}.db"), "7000", {'clf': name, 'reg': name},
+                               dump=joblib.dump, features=['A'], selected_features=['A'])
+    inf.unload_models()
+
+    with patch.object(inf, 'MODEL_CACHE_MAX_ENTRIES', 2):
+        inf.load_models("/data/a.db")
+        inf.load_models("/data/b.db")
+        inf.load_models("/data/a.db")
+        inf.load_models("/data/c.db")
+        # b was the least recently used
+        assert set(inf._loaded_models) == {inf.get_model_dir("/data/a.db"), inf.get_model_dir("/data/c.db")}
+
+    inf._loaded_models[inf.get_model_dir("/data/a.db")]['last_used'] -= inf.MODEL_IDLE_SECONDS + 1
+    inf.load_models("/data/c.db")
+    assert set(inf._loaded_models) == {inf.get_model_dir("/data/c.db")}
+
+    inf.unload_models()
@@ -0,0 +1,127 @@
+"""
+Tests for background precomputation of the dashboard forecasts,
+including stale-while-revalidate serving.
+"""
+import time
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from api.main import app
+from api.dependencies import get_db_path_dep
+from forecasting import precompute, inference
+
+
+DB = "/tmp/precompute_test.db"
+
+
+def _wait_for_revalidation(timeout=2.0):
+    deadline = time.time() + timeout
+    while precompute._inflight and time.time() < deadline:
+        time.sleep(0.01)
+
+
+@patch('forecasting.precompute._model_version', return_value="1")
+def test_snapshot_fresh_then_stale_after_write(mock_version):
+    with patch('forecasting.precompute._compute', return_value=[{"date": "x"}]):
+        precompute.refresh(DB, 'forecast')
+    snapshot = precompute.lookup(DB, 'forecast')
+    assert snapshot.result == [{"date": "x"}]
+    assert snapshot.stale is False
+
+    # Entry writes go through clear_prediction_cache: the old result is still
+    # served, flagged stale, while a background refresh replaces it.
+    with patch('forecasting.precompute._compute', return_value=[{"date": "y"}]) as mock_compute:
+        inference.clear_prediction_cache(DB)
+        stale = precompute.lookup(DB, 'forecast')
+        assert stale.result == [{"date": "x"}]
+        assert stale.stale is True
+        _wait_for_revalidation()
+        assert mock_compute.call_count == 1
+
+    refreshed = precompute.lookup(DB, 'forecast')
+    assert refreshed.result == [{"date": "y"}]
+    assert refreshed.stale is False
+
+
+@patch('forecasting.precompute._compute', return_value={"probability": 10.0})
+def test_rollover_is_never_served_but_new_model_is_served_stale(mock_compute):
+    with patch('forecasting.precompute._model_version', return_value="1"):
+        precompute.refresh(DB, 'future')
+        assert precompute.lookup(DB, 'future').stale is False
+
+        # Local midnight rolled over: yesterday's "tomorrow" is the wrong date
+        precompute._snapshots[(DB, 'future')]['period'] = '1999-01-01'
+        assert precompute.lookup(DB, 'future') is None
+
+        precompute.refresh(DB, 'future')
+
+    # Retraining promoted a new version
+    with patch('forecasting.precompute._model_version', return_value="2"), \
+         patch('forecasting.precompute.revalidate') as mock_revalidate:
+        assert precompute.lookup(DB, 'future').stale is True
+        mock_revalidate.assert_called_once_with(DB, 'future')
+
+
+@patch('forecasting.precompute._model_version', return_value="1")
+def test_too_old_snapshot_blocks_for_recompute(mock_version):
+    with patch('forecasting.precompute._compute', return_value={"probability": 10.0}):
+        precompute.refresh(DB, 'future')
+    precompute._snapshots[(DB, 'future')]['computed_at'] -= precompute.MAX_STALE_SECONDS + 1
+    assert precompute.lookup(DB, 'future') is None
+
+
+@patch('forecasting.precompute._model_version', return_value="1")
+def test_write_during_computation_discards_result(mock_version):
+    def compute_while_entry_written(db_path, product):
+        precompute.mark_dirty(db_path)
+        return {"probability": 99.0}
+
+    with patch('forecasting.precompute._compute', side_effect=compute_while_entry_written):
+        precompute.refresh(DB, 'future')
+    assert precompute.lookup(DB, 'future') is None
+
+
+@patch('forecasting.precompute._model_version', return_value="1")
+def test_run_once_fills_every_tracked_product(mock_version):
+    computed = []
+    with patch('forecasting.precompute._compute', side_effect=lambda db, product: computed.append(product) or product):
+        precompute.track(DB)
+        precompute._run_once()
+        precompute._run_once()  # Everything fresh: nothing recomputed
+    assert sorted(computed) == sorted(precompute.PRODUCTS)
+
+
+@patch('forecasting.precompute._model_version', return_value="1")
+def test_routes_serve_snapshots_with_freshness_metadata(mock_version):
+    app.dependency_overrides[get_db_path_dep] = lambda: DB
+    try:
+        with patch('forecasting.precompute._compute', side_effect=lambda db, product: {"product": product}):
+            for product in precompute.PRODUCTS:
+                precompute.refresh(DB, product)
+
+        with patch('forecasting.inference.get_prediction_for_date', side_effect=AssertionError("recomputed")), \
+             patch('forecasting.inference.get_weekly_forecast', side_effect=AssertionError("recomputed")), \
+             patch('forecasting.inference.get_hourly_forecast', side_effect=AssertionError("recomputed")):
+            client = TestClient(app)
+
+            future = client.get("/api/v1/prediction/future").json()
+            assert future["product"] == "future"
+            assert future["stale"] is False
+            assert future["cache_age_seconds"] >= 0
+            assert "computed_at" in future
+
+            forecast = client.get("/api/v1/prediction/forecast")
+            assert forecast.json() == {"product": "forecast"}
+            assert forecast.headers["X-Stale"] == "false"
+            assert int(forecast.headers["Age"]) >= 0
+
+            # Stale: returned immediately with the flag, refreshed in the background
+            precompute.mark_dirty(DB)
+            with patch('forecasting.precompute.revalidate') as mock_revalidate:
+                hourly = client.get("/api/v1/prediction/hourly")
+            assert hourly.json() == {"product": "hourly"}
+            assert hourly.headers["X-Stale"] == "true"
+            mock_revalidate.assert_called_once_with(DB, 'hourly')
+    finally:
+        app.dependency_overrides.clear()
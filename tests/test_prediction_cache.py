@@ -0,0 +1,80 @@
+"""
+Tests for the bounded, tenant-aware prediction cache.
+"""
+import time
+from unittest.mock import patch
+
+import pandas as pd
+
+from forecasting.prediction_cache import PredictionCache
+from forecasting import inference
+
+
+def test_lru_eviction_drops_least_recently_used():
+    cache = PredictionCache(max_entries=2, ttl_seconds=60)
+    cache.set(("a.db", "2025-01-01"), {"p": 1})
+    cache.set(("a.db", "2025-01-02"), {"p": 2})
+
+    # Touch the first entry so the second becomes the LRU victim
+    assert cache.get(("a.db", "2025-01-01")) == {"p": 1}
+    cache.set(("a.db", "2025-01-03"), {"p": 3})
+
+    assert cache.get(("a.db", "2025-01-02")) is None
+    assert cache.get(("a.db", "2025-01-01")) == {"p": 1}
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire_after_ttl():
+    cache = PredictionCache(max_entries=8, ttl_seconds=0.05)
+    cache.set(("a.db", "2025-01-01"), {"p": 1})
+    assert cache.get(("a.db", "2025-01-01")) == {"p": 1}
+
+    time.sleep(0.06)
+    assert cache.get(("a.db", "2025-01-01")) is None
+
+    stats = cache.stats()
+    assert stats["expirations"] == 1
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_invalidate_only_touches_one_database():
+    cache = PredictionCache()
+    cache.set(("a.db", "2025-01-01"), 1)
+    cache.set(("b.db", "2025-01-01"), 2)
+
+    cache.invalidate("a.db")
+
+    assert cache.get(("a.db", "2025-01-01")) is None
+    assert cache.get(("b.db", "2025-01-01")) == 2
+
+
+@patch('forecasting.inference.load_models', return_value=(None, None))
+@patch('forecasting.inference._latest_model_version', return_value=None)
+@patch('forecasting.inference.get_latest_location_from_db', return_value=(None, None))
+@patch('forecasting.inference.get_recent_history')
+def test_prediction_cache_is_keyed_by_database(mock_history, mock_loc, mock_version, mock_load, tmp_path):
+    """Two databases asking for the same date must not share a cached result."""
+    mock_history.return_value = pd.DataFrame({'Date': pd.to_datetime([]), 'Pain Level': []})
+    inference.clear_prediction_cache()
+
+    import sqlite3
+    db_a = str(tmp_path / "a.db")
+    db_b = str(tmp_path / "b.db")
+    for db, baseline in ((db_a, '0.1'), (db_b, '0.6')):
+        conn = sqlite3.connect(db)
+        conn.execute("CREATE TABLE user_settings (key TEXT PRIMARY KEY, value TEXT)")
+        conn.execute("INSERT INTO user_settings VALUES ('baseline_risk', ?)", (baseline,))
+        conn.commit()
+        conn.close()
+
+    res_a = inference.get_prediction_for_date("2025-01-01", db_path=db_a)
+    res_b = inference.get_prediction_for_date("2025-01-01", db_path=db_b)
+    assert res_a["probability"] != res_b["probability"]
+
+    # Second call for db_a is served from cache
+    hits_before = inference.get_prediction_cache_stats()["hits"]
+    assert inference.get_prediction_for_date("2025-01-01", db_path=db_a) == res_a
+    assert inference.get_prediction_cache_stats()["hits"] == hits_before + 1
+
+    inference.clear_prediction_cache()
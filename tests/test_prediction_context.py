@@ -0,0 +1,68 @@
+"""
+Tests for the request-scoped PredictionContext.
+"""
+import sqlite3
+from datetime import date, timedelta
+from unittest.mock import patch
+
+from forecasting import feature_store, inference
+
+# History is windowed on the last days before today
+YESTERDAY = (date.today() - timedelta(days=1)).isoformat()
+TODAY = date.today().isoformat()
+
+
+def _make_db(path):
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE migraine_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            Date TEXT, Time TEXT, "Pain Level" INTEGER,
+            Sleep TEXT, "Physical Activity" TEXT,
+            Latitude REAL, Longitude REAL
+        )
+    """)
+    conn.execute("CREATE TABLE user_settings (key TEXT PRIMARY KEY, value TEXT)")
+    conn.execute("""INSERT INTO migraine_log (Date, Time, "Pain Level", Latitude, Longitude)
+                    VALUES (?, '08:00', 4, 40.7, -74.0)""", (YESTERDAY,))
+    conn.execute("INSERT INTO user_settings VALUES ('baseline_risk', '0.3')")
+    conn.commit()
+    # Built up front: a stale store is rebuilt on a background thread
+    feature_store.ensure_current(conn, path)
+    conn.close()
+
+
+def test_context_loads_everything_over_one_connection(tmp_path):
+    db = str(tmp_path / "ctx.db")
+    _make_db(db)
+
+    real_connect = sqlite3.connect
+    with patch('forecasting.inference.sqlite3.connect', side_effect=real_connect) as spy:
+        context = inference.get_prediction_context(db)
+
+    assert spy.call_count == 1
+    assert context.location == (40.7, -74.0)
+    assert context.user_priors == {'baseline_risk': 0.3}
+    assert list(context.history['Pain Level']) == [4]
+
+
+@patch('forecasting.inference.load_models', return_value=(None, None))
+@patch('forecasting.inference.WeatherService.fetch_hourly', return_value=[])
+@patch('forecasting.inference.WeatherService.fetch_weekly', return_value={})
+def test_context_is_reused_until_the_database_changes(mock_weekly, mock_hourly, mock_load, tmp_path):
+    db = str(tmp_path / "ctx.db")
+    _make_db(db)
+
+    with patch('forecasting.inference.get_recent_history', wraps=inference.get_recent_history) as spy:
+        inference.get_weekly_forecast(db_path=db)
+        inference.get_hourly_forecast("2025-01-02 00:00", db_path=db)
+        assert spy.call_count == 1
+
+        conn = sqlite3.connect(db)
+        conn.execute("""INSERT INTO migraine_log (Date, Time, "Pain Level") VALUES (?, '09:00', 7)""", (TODAY,))
+        conn.commit()
+        conn.close()
+
+        context = inference.get_prediction_context(db)
+        assert spy.call_count == 2
+        assert list(context.history['Pain Level']) == [4, 7]
@@ -0,0 +1,83 @@
+"""
+Tests for the windowed, per-day history query used for pain lags.
+"""
+import sqlite3
+from datetime import date, timedelta
+
+from forecasting import data_loader
+from services.entry_service import EntryService
+
+
+def _make_db(path, rows):
+    conn = sqlite3.connect(path)
+    EntryService._create_table_if_not_exists(conn)
+    conn.executemany('INSERT INTO migraine_log (Date, Time, "Pain Level", Notes) VALUES (?, ?, ?, ?)', rows)
+    conn.commit()
+    conn.close()
+
+
+def _day(offset):
+    return (date(2025, 6, 30) - timedelta(days=offset)).isoformat()
+
+
+def test_several_entries_per_day_aggregate_to_the_max(tmp_path):
+    db = str(tmp_path / "history.db")
+    _make_db(db, [
+        (_day(1), '07:00', 3, 'morning'),
+        (_day(1), '18:00', 8, 'evening'),
+        (_day(1), '05:00', 0, 'pain free check-in'),
+        (_day(0), '09:00', 2, ''),
+    ])
+
+    history = data_loader.get_recent_history(db, days=5, end_date=date(2025, 6, 30))
+
+    assert list(history.columns) == ['Date', 'Pain Level', 'Time']
+    assert [d.strftime('%Y-%m-%d') for d in history['Date']] == [_day(1), _day(0)]
+    assert list(history['Pain Level']) == [8, 2]
+    # Time is the first onset, not the pain-free entry
+    assert list(history['Time']) == ['07:00', '09:00']
+
+
+def test_window_counts_days_not_rows(tmp_path):
+    db = str(tmp_path / "history.db")
+    # Ten entries a day for 90 days
+    _make_db(db, [(_day(offset), f'{h:02d}:00', offset % 10, '') for offset in range(90) for h in range(10)])
+
+    history = data_loader.get_recent_history(db, days=60, end_date=date(2025, 6, 30))
+
+    assert len(history) == 61
+    assert history['Date'].min().strftime('%Y-%m-%d') == _day(60)
+    assert history['Date'].is_monotonic_increasing
+
+
+def test_historical_windows_leave_out_later_entries(tmp_path):
+    db = str(tmp_path / "history.db")
+    _make_db(db, [(_day(12), '08:00', 4, ''), (_day(10), '08:00', 5, ''), (_day(9), '08:00', 9, '')])
+
+    history = data_loader.get_recent_history(db, days=5, end_date=date.fromisoformat(_day(10)))
+
+    assert [d.strftime('%Y-%m-%d') for d in history['Date']] == [_day(12), _day(10)]
+    assert list(history['Pain Level']) == [4, 5]
+
+
+def test_missing_table_gives_an_empty_frame(tmp_path):
+    history = data_loader.get_recent_history(str(tmp_path / "empty.db"))
+
+    assert history.empty
+    assert list(history.columns) == ['Date', 'Pain Level', 'Time']
+
+
+def test_history_query_uses_the_date_time_index(tmp_path):
+    db = str(tmp_path / "history.db")
+    conn = sqlite3.connect(db)
+    # A log created before the index existed gets it on its next open
+    conn.execute('CREATE TABLE migraine_log (id INTEGER PRIMARY KEY, Date TEXT, Time TEXT, "Pain Level" INTEGER)')
+    EntryService._create_table_if_not_exists(conn)
+
+    plan = ' '.join(str(row[-1]) for row in conn.execute(
+        'EXPLAIN QUERY PLAN SELECT Date, MAX("Pain Level") FROM migraine_log WHERE Date >= ? AND Date < ? GROUP BY Date',
+        ('2025-01-01', '2025-03-01')
+    ))
+    conn.close()
+
+    assert 'idx_migraine_log_date_time' in plan
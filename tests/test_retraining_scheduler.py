@@ -71,7 +71,10 @@ class TestStalenessCheck:
             {"Date": "2020-06-01", "Time": "08:00", "Pain Level": 4},
         ])
 
-        model_dir = str(tmp_path / "models")
+        from forecasting.model_registry import namespace_dir
+        models_root = str(tmp_path / "models")
+        # Models live in the database's own namespace
+        model_dir = namespace_dir(models_root, db)
         os.makedirs(model_dir, exist_ok=True)
 
         # Create a fake .pkl with a very old mtime (1970)
@@ -81,7 +84,7 @@ class TestStalenessCheck:
         os.utime(pkl, (1000, 1000))  # Unix timestamp 1000 = Jan 1, 1970
 
         from forecasting import retraining_scheduler as sched
-        with patch.object(sched, '_MODEL_DIR', model_dir):
+        with patch.object(sched, '_MODEL_DIR', models_root):
             count = sched.get_entries_since_last_training(db)
 
         assert count > 0, "Entries dated after the model's mtime should be counted"
@@ -93,7 +96,10 @@ class TestStalenessCheck:
             {"Date": "2020-01-01", "Time": "08:00", "Pain Level": 2},
         ])
 
-        model_dir = str(tmp_path / "models")
+        from forecasting.model_registry import namespace_dir
+        models_root = str(tmp_path / "models")
+        # Models live in the database's own namespace
+        model_dir = namespace_dir(models_root, db)
         os.makedirs(model_dir, exist_ok=True)
 
         # Create a fake .pkl with a future mtime
@@ -104,10 +110,12 @@ class TestStalenessCheck:
         os.utime(pkl, (future_ts, future_ts))
 
         from forecasting import retraining_scheduler as sched
-        with patch.object(sched, '_MODEL_DIR', model_dir):
+        with patch.object(sched, '_MODEL_DIR', models_root):
             count = sched.get_entries_since_last_training(db)
+            other_profile_trained = sched.get_last_trained_date(str(tmp_path / "other.db"))
 
         assert count == 0, "No entries should count as new when model is fresher than all data"
+        assert other_profile_trained is None, "Another profile's model must not count as this one's"
 
 
 # ─── run_training_safely (concurrency lock) ───────────────────────────────────
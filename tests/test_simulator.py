@@ -0,0 +1,148 @@
+"""
+Tests for the batched what-if simulator (Issue #63).
+"""
+import itertools
+import time
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+from sklearn.ensemble import HistGradientBoostingClassifier
+
+from forecasting import feature_spec, simulator
+from forecasting.inference import CompiledEnsemble
+from forecasting.prediction_context import PredictionContext
+from forecasting.train_model import export_compiled_ensemble
+
+FEATURES = ['tavg', 'pres', 'pres_change', 'average_humidity', 'humid.*tavg', 'Sleep',
+            'Physical Activity', 'Pain_Lag_1', 'Pain_Rolling_Mean_3', 'DayOfWeek_sin', 'DayOfWeek_cos']
+
+BASE = {
+    'tavg': 20.0, 'pres': 1012.0, 'pres_change': 0.0, 'average_humidity': 50.0, 'humid.*tavg': 1000.0,
+    'Sleep': 2.0, 'Physical Activity': 1.5, 'Pain_Lag_1': 3.0, 'Pain_Rolling_Mean_3': 2.0,
+    'DayOfWeek': 2, 'DayOfWeek_sin': np.sin(4 * np.pi / 7), 'DayOfWeek_cos': np.cos(4 * np.pi / 7),
+}
+
+
+@pytest.fixture(scope="module")
+def fitted():
+    rng = np.random.default_rng(3)
+    n = 600
+    X = pd.DataFrame({
+        'tavg': rng.uniform(0, 40, n), 'pres': rng.uniform(985, 1035, n), 'pres_change': rng.normal(0, 4, n),
+        'average_humidity': rng.uniform(20, 100, n), 'Sleep': rng.integers(1, 4, n).astype(float),
+        'Physical Activity': rng.integers(0, 4, n).astype(float), 'Pain_Lag_1': rng.integers(0, 10, n).astype(float),
+    })
+    X['humid.*tavg'] = X['average_humidity'] * X['tavg']
+    X['Pain_Rolling_Mean_3'] = X['Pain_Lag_1'] / 2
+    dow = rng.integers(0, 7, n)
+    X['DayOfWeek_sin'] = np.sin(2 * np.pi * dow / 7)
+    X['DayOfWeek_cos'] = np.cos(2 * np.pi * dow / 7)
+    y = ((X['tavg'] > 28) & (X['pres'] < 1000) | (X['Sleep'] < 2) | (dow == 0)).astype(int)
+    clf = HistGradientBoostingClassifier(max_depth=5, max_iter=100, random_state=0).fit(X[FEATURES], y)
+    return clf, CompiledEnsemble(export_compiled_ensemble(clf))
+
+
+def _row(base, **values):
+    row = dict(base)
+    row.update(values)
+    if 'tavg' in values or 'average_humidity' in values:
+        row['humid.*tavg'] = row['average_humidity'] * row['tavg']
+    if 'DayOfWeek' in values:
+        row['DayOfWeek_sin'] = np.sin(2 * np.pi * row['DayOfWeek'] / 7)
+        row['DayOfWeek_cos'] = np.cos(2 * np.pi * row['DayOfWeek'] / 7)
+    if 'Pain_Lag_1' in values:
+        row['Pain_Rolling_Mean_3'] = base['Pain_Rolling_Mean_3'] + (row['Pain_Lag_1'] - base['Pain_Lag_1']) / 3
+    return row
+
+
+def test_grid_matches_row_by_row_scoring(fitted):
+    clf, ens = fitted
+    overrides = {'tavg': [5, 25, 35], 'pres': {'start': 990, 'stop': 1030, 'step': 20},
+                 'DayOfWeek': [0, 3], 'Pain_Lag_1': [0, 7]}
+    result = simulator.simulate(ens, BASE, overrides)
+
+    combos = list(itertools.product([5, 25, 35], [990, 1010, 1030], [0, 3], [0, 7]))
+    rows = pd.DataFrame([_row(BASE, tavg=t, pres=p, DayOfWeek=d, Pain_Lag_1=l) for t, p, d, l in combos])
+    expected = clf.predict_proba(rows[FEATURES])[:, 1]
+
+    assert result['grid_size'] == len(combos) == 36
+    best = combos[int(np.argmax(expected))]
+    assert result['argmax']['values'] == dict(zip(['tavg', 'pres', 'DayOfWeek', 'Pain_Lag_1'], map(float, best)))
+    assert result['argmax']['probability'] == round(float(expected.max()) * 100, 1)
+
+    tavg_means = [round(float(expected[[c[0] == t for c in combos]].mean()) * 100, 1) for t in (5, 25, 35)]
+    assert [m['mean_probability'] for m in result['marginals']['tavg']] == tavg_means
+    assert result['surface']['x_axis'] == 'tavg' and result['surface']['y_axis'] == 'pres'
+    assert np.array(result['surface']['mean_probability']).shape == (3, 3)
+
+
+def test_full_study_grid_is_fast(fitted):
+    _, ens = fitted
+    overrides = {
+        'tavg': [5.0, 15.0, 25.0, 35.0], 'pres': [990.0, 1000.0, 1015.0, 1030.0],
+        'humidity': [20.0, 50.0, 80.0], 'pres_change': {'start': -5, 'stop': 5, 'step': 2},
+        'Sleep': [1.0, 2.0, 3.0], 'Physical Activity': [0.0, 1.0, 2.0, 3.0],
+        'Pain_Lag_1': [0.0, 3.0, 7.0, 9.0], 'DayOfWeek': list(range(7)),
+    }
+    t0 = time.perf_counter()
+    result = simulator.simulate(ens, BASE, overrides, surface_axes=['tavg', 'pres'])
+    elapsed = time.perf_counter() - t0
+
+    assert result['grid_size'] == 4 * 4 * 3 * 6 * 3 * 4 * 4 * 7
+    assert len(result['surface']['x_values']) == 4
+    assert elapsed < 2.0
+
+
+def test_invalid_overrides_rejected(fitted):
+    _, ens = fitted
+    with pytest.raises(ValueError):
+        simulator.simulate(ens, BASE, {'Pain_Lag_7': [1, 2]})
+    with pytest.raises(ValueError):
+        simulator.simulate(ens, BASE, {'tavg': {'start': 0, 'stop': 10, 'step': 0}})
+    with patch.object(simulator, 'MAX_GRID_POINTS', 10):
+        with pytest.raises(ValueError):
+            simulator.simulate(ens, BASE, {'tavg': list(range(4)), 'pres': list(range(4))})
+
+
+def test_derived_columns_follow_the_feature_spec():
+    # A weatherless base row: inference scores humid.*tavg with humidity as 0
+    tavg = np.array([10.0, 30.0])
+    derived = simulator._derived_columns({'tavg': tavg}, {'Pain_Lag_1': 0.0})
+    expected = feature_spec.evaluate('humid.*tavg', {'average_humidity': np.full(2, np.nan), 'tavg': tavg})
+    np.testing.assert_array_equal(derived['humid.*tavg'], expected)
+    assert list(derived['humid.*tavg']) == [0.0, 0.0]
+    assert np.isnan(simulator._derived_columns({'average_humidity': np.array([60.0])}, {})['humid.*tavg']).all()
+
+
+def test_simulate_endpoint(fitted):
+    from api.main import app
+    from api.dependencies import get_db_path_dep
+    clf, _ = fitted
+
+    context = PredictionContext("/tmp/sim.db", None, (None, None), {})
+    app.dependency_overrides[get_db_path_dep] = lambda: "/tmp/sim.db"
+    try:
+        with patch('forecasting.inference.get_prediction_context', return_value=context), \
+             patch('forecasting.inference.build_daily_features', return_value=(None, dict(BASE))), \
+             patch('forecasting.inference.load_models', return_value=(clf, None)):
+            client = TestClient(app)
+            response = client.post("/api/v1/prediction/simulate", json={
+                "date": "2025-06-01",
+                "overrides": {"tavg": [5, 35], "Sleep": {"start": 1, "stop": 3, "step": 1}},
+            })
+            bad = client.post("/api/v1/prediction/simulate", json={"overrides": {"id": [1]}})
+        with patch('forecasting.inference.get_prediction_context', return_value=context), \
+             patch('forecasting.inference.load_models', return_value=(None, None)):
+            no_model = client.post("/api/v1/prediction/simulate", json={"overrides": {"tavg": [5]}})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body['grid_size'] == 6
+    assert set(body['argmax']['values']) == {'tavg', 'Sleep'}
+    assert bad.status_code == 400
+    assert no_model.status_code == 409
@@ -0,0 +1,188 @@
+"""
+Tests for the travel itinerary forecaster (Issue #51).
+"""
+import asyncio
+import datetime
+import time
+from unittest.mock import patch, MagicMock
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from forecasting import inference, travel
+from forecasting.prediction_context import PredictionContext
+from services.weather_service import WeatherService
+
+TODAY = datetime.date.today()
+
+
+def _day(offset):
+    return (TODAY + datetime.timedelta(days=offset)).strftime("%Y-%m-%d")
+
+
+def _weather(tavg, lat, lon):
+    return {
+        'tavg': tavg, 'tmin': tavg - 5, 'tmax': tavg + 5, 'prcp': 0, 'wspd': 5, 'pres': 1015, 'tsun': 10,
+        'average_humidity': 50, 'pres_change': 0, 'midday_humidity': 50, 'Latitude': lat, 'Longitude': lon
+    }
+
+
+def _context():
+    history = pd.DataFrame({'Date': pd.to_datetime([_day(-1)]), 'Pain Level': [4]})
+    return PredictionContext("travel.db", history, (34.05, -118.25), {})
+
+
+def _clf():
+    clf = MagicMock()
+    clf.feature_names_in_ = np.array(['tavg', 'Pain_Lag_1'])
+    clf.predict_proba.side_effect = lambda X: np.column_stack([1 - X['tavg'] / 100, X['tavg'] / 100])
+    reg = MagicMock()
+    reg.predict.side_effect = lambda X: np.zeros(len(X))
+    return clf, reg
+
+
+def test_plan_coalesces_cells_and_clips_to_forecast_window():
+    legs = travel.parse_itinerary([
+        {'start_date': _day(1), 'end_date': _day(3), 'lat': 48.8566, 'lon': 2.3322, 'label': 'Paris'},
+        {'start_date': _day(4), 'end_date': _day(5), 'lat': 51.5074, 'lon': -0.1278},
+        # Same ~0.1 degree cell as the first leg
+        {'start_date': _day(8), 'end_date': _day(30), 'lat': 48.8700, 'lon': 2.3400},
+        {'start_date': _day(40), 'lat': 40.4168, 'lon': -3.7038},
+    ])
+    plan = travel.plan_fetches(legs, today=TODAY)
+
+    assert legs[0].cell == legs[2].cell == (48.9, 2.3)
+    assert set(plan) == {(48.9, 2.3), (51.5, -0.1)}
+    start, end = plan[(48.9, 2.3)]
+    assert start == TODAY + datetime.timedelta(days=1)
+    assert end == TODAY + datetime.timedelta(days=travel.FORECAST_HORIZON_DAYS - 1)
+
+
+@pytest.mark.parametrize("legs", [
+    [],
+    [{'start_date': '2025-06-05', 'end_date': '2025-06-01', 'lat': 0, 'lon': 0}],
+    [{'start_date': '06/01/2025', 'lat': 0, 'lon': 0}],
+    [{'start_date': '2025-06-01', 'lat': 95, 'lon': 0}],
+    [{'start_date': '2025-01-01', 'end_date': '2025-12-31', 'lat': 0, 'lon': 0}],
+])
+def test_invalid_itineraries_rejected(legs):
+    with pytest.raises(ValueError):
+        travel.parse_itinerary(legs)
+
+
+def test_all_leg_days_scored_in_one_batch():
+    inference.clear_prediction_cache()
+    legs = travel.parse_itinerary([
+        {'start_date': _day(1), 'end_date': _day(3), 'lat': 10.0, 'lon': 10.0, 'label': 'A'},
+        {'start_date': _day(4), 'end_date': _day(6), 'lat': 20.0, 'lon': 20.0, 'label': 'B'},
+    ])
+    weather_by_cell = {
+        (10.0, 10.0): {_day(i): _weather(20, 10.0, 10.0) for i in range(1, 4)},
+        # Day 6 has no weather (e.g. beyond the horizon)
+        (20.0, 20.0): {_day(i): _weather(40, 20.0, 20.0) for i in range(4, 6)},
+    }
+    clf, reg = _clf()
+    heuristic = {'date': _day(6), 'probability': 5.0, 'risk_level': 'Low', 'predicted_pain': 0.0}
+
+    with patch('forecasting.inference.load_models', return_value=(clf, reg)), \
+         patch('forecasting.inference._latest_model_version', return_value="1"), \
+         patch('forecasting.inference._run_heuristic_fallback', return_value=heuristic) as mock_heuristic:
+        result = travel.forecast_itinerary(legs, _context(), weather_by_cell)
+
+    assert clf.predict_proba.call_count == 1
+    assert len(clf.predict_proba.call_args[0][0]) == 5
+    assert mock_heuristic.call_count == 1
+    assert result['days_scored'] == 6
+    assert [d['risk_probability'] for d in result['legs'][0]['days']] == [20.0, 20.0, 20.0]
+    assert [d['risk_probability'] for d in result['legs'][1]['days']] == [40.0, 40.0, 5.0]
+    assert result['legs'][1]['days'][2]['weather_available'] is False
+    assert result['peak']['label'] == 'B' and result['peak']['risk_probability'] == 40.0
+
+
+def test_weatherless_legs_never_share_the_live_cache_key():
+    inference.clear_prediction_cache()
+    context = _context()
+    legs = travel.parse_itinerary([{'start_date': _day(1), 'lat': 35.68, 'lon': 139.69, 'label': 'Tokyo'}])
+    home = {'date': _day(1), 'probability': 35.0, 'risk_level': 'Medium', 'predicted_pain': 0.0,
+            'source': 'live (Heuristic)'}
+    weatherless = {'date': _day(1), 'probability': 10.0, 'risk_level': 'Low', 'predicted_pain': 0.0,
+                   'source': 'unknown (Heuristic)'}
+    live_key = inference._prediction_cache_key(context, _day(1), None, None)
+
+    with patch('forecasting.inference.load_models', return_value=(None, None)), \
+         patch('forecasting.inference._latest_model_version', return_value=None), \
+         patch('forecasting.inference._run_heuristic_fallback', return_value=weatherless):
+        # The failed fetch leaves the leg without weather
+        inference._prediction_cache.set(live_key, home)
+        result = travel.forecast_itinerary(legs, context, {})
+        assert result['legs'][0]['days'][0]['risk_probability'] == 10.0
+
+        inference.clear_prediction_cache()
+        travel.forecast_itinerary(legs, context, {})
+        assert inference.get_cached_prediction(_day(1), context) is None
+    inference.clear_prediction_cache()
+
+
+def test_parse_range_covers_long_windows():
+    start = datetime.datetime(2025, 6, 1)
+    hours = pd.date_range(start - datetime.timedelta(days=1), periods=31 * 24, freq='h')
+    data = {
+        'hourly': {
+            'time': [h.strftime('%Y-%m-%dT%H:%M') for h in hours],
+            'temperature_2m': [float(h.day) for h in hours],
+            'relative_humidity_2m': [50.0] * len(hours),
+            'surface_pressure': [1000.0 + h.day for h in hours],
+            'precipitation': [0.0] * len(hours),
+            'wind_speed_10m': [3.0] * len(hours),
+        },
+        'daily': {},
+    }
+    parsed = WeatherService.parse_range(data, start, 30, 1.0, 2.0)
+
+    assert len(parsed) == 30
+    assert parsed['2025-06-15']['tavg'] == 15.0
+    assert parsed['2025-06-15']['pres_change'] == 1.0
+    assert WeatherService.parse_weekly(data, start, 1.0, 2.0) == {k: parsed[k] for k in list(parsed)[:7]}
+
+
+def test_itinerary_endpoint_fetches_cells_concurrently():
+    from api.main import app
+    from api.dependencies import get_db_path_dep
+
+    calls = []
+
+    async def fake_fetch(start, end, lat, lon):
+        calls.append((lat, lon))
+        await asyncio.sleep(0.2)
+        return {(start + datetime.timedelta(days=i)).strftime("%Y-%m-%d"): _weather(30, lat, lon)
+                for i in range((end - start).days + 1)}
+
+    legs = [{'start_date': _day(1 + i), 'end_date': _day(3 + i), 'lat': 10.0 + i, 'lon': 5.0, 'label': f'L{i}'}
+            for i in range(10)]
+    legs[9]['lat'] = 10.02  # Shares leg 0's cell
+    clf, reg = _clf()
+
+    app.dependency_overrides[get_db_path_dep] = lambda: "travel.db"
+    try:
+        with patch('forecasting.inference.get_prediction_context', return_value=_context()), \
+             patch('forecasting.inference.load_models', return_value=(clf, reg)), \
+             patch('forecasting.inference._latest_model_version', return_value="1"), \
+             patch('services.weather_service.WeatherService.fetch_range_async', side_effect=fake_fetch):
+            client = TestClient(app)
+            t0 = time.perf_counter()
+            response = client.post("/api/v1/prediction/itinerary", json={"legs": legs})
+            elapsed = time.perf_counter() - t0
+            bad = client.post("/api/v1/prediction/itinerary", json={"legs": []})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    body = response.json()
+    assert len(calls) == 9
+    assert body['days_scored'] == 30
+    assert clf.predict_proba.call_count == 1
+    # Nine 0.2s fetches run concurrently, not back to back
+    assert elapsed < 1.0
+    assert bad.status_code == 400
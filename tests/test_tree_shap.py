@@ -0,0 +1,133 @@
+"""
+Tests for the TreeSHAP risk decomposition (Issue #62).
+"""
+import itertools
+import math
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import HistGradientBoostingClassifier, HistGradientBoostingRegressor
+
+from forecasting import explain, inference
+from forecasting.inference import CompiledEnsemble
+from forecasting.train_model import export_compiled_ensemble
+
+
+@pytest.fixture(scope="module")
+def ensemble():
+    rng = np.random.default_rng(0)
+    n = 500
+    X = pd.DataFrame({
+        'pres_change': rng.normal(0, 4, n),
+        'average_humidity': rng.uniform(20, 100, n),
+        'Pain_Lag_1': rng.integers(0, 10, n).astype(float),
+        'Sleep': rng.integers(1, 4, n).astype(float),
+    })
+    X.loc[rng.random(n) < 0.1, 'average_humidity'] = np.nan
+    y = ((X['pres_change'].abs() > 4) | (X['Pain_Lag_1'] > 6) | (X['Sleep'] < 2)).astype(int)
+    clf = HistGradientBoostingClassifier(max_depth=5, max_iter=100, random_state=0).fit(X, y)
+    return CompiledEnsemble(export_compiled_ensemble(clf)), X
+
+
+def _path_dependent_value(ens, x, known):
+    """E[f(x) | x_S] under the trees' cover distribution (Lundberg's EXPVALUE)."""
+    def walk(node):
+        if ens.is_leaf[node]:
+            return ens.value[node]
+        f = ens.feature[node]
+        left, right = ens.left[node], ens.right[node]
+        if f in known:
+            v = x[f]
+            go_left = ens.missing_left[node] if np.isnan(v) else v <= ens.threshold[node]
+            return walk(left if go_left else right)
+        return (ens.count[left] * walk(left) + ens.count[right] * walk(right)) / ens.count[node]
+    return ens.baseline + sum(walk(int(r)) for r in ens.roots)
+
+
+def test_matches_brute_force_shapley(ensemble):
+    ens, X = ensemble
+    rows = X.iloc[:3].to_numpy().copy()
+    rows[0, 1] = np.nan  # Missing humidity follows the trained missing-value branches
+    phi = explain.TreeShapTables(ens).shap_values(rows)
+
+    m = rows.shape[1]
+    for x, row_phi in zip(rows, phi):
+        expected = np.zeros(m)
+        for i in range(m):
+            others = [j for j in range(m) if j != i]
+            for k in range(m):
+                weight = math.factorial(k) * math.factorial(m - k - 1) / math.factorial(m)
+                for subset in itertools.combinations(others, k):
+                    s = set(subset)
+                    expected[i] += weight * (_path_dependent_value(ens, x, s | {i}) - _path_dependent_value(ens, x, s))
+        np.testing.assert_allclose(row_phi, expected, atol=1e-10)
+
+
+def test_local_accuracy_over_forecast_rows(ensemble):
+    ens, X = ensemble
+    rows = X.iloc[:7].to_numpy()
+    tables = explain.TreeShapTables(ens)
+    phi = tables.shap_values(rows)
+    np.testing.assert_allclose(tables.base_value + phi.sum(axis=1), ens.raw_predict(rows), atol=1e-10)
+
+
+def test_explanations_cached_by_model_version_and_row(ensemble):
+    ens, X = ensemble
+    explain.clear_cache()
+    rows = X.iloc[:7].to_numpy()
+
+    with patch.object(explain.TreeShapTables, 'shap_values', autospec=True,
+                      side_effect=explain.TreeShapTables.shap_values) as spy:
+        first = explain.explain_rows(ens, rows, model_version="v1")
+        second = explain.explain_rows(ens, rows, model_version="v1")
+        explain.explain_rows(ens, rows, model_version="v2")
+
+    assert first == second
+    assert spy.call_count == 2  # v1 once (all 7 rows in one pass), v2 once
+    assert len(spy.call_args_list[0].args[1]) == 7
+    assert list(first[0]['contributions'])[0] == max(
+        first[0]['contributions'], key=lambda k: abs(first[0]['contributions'][k]))
+
+
+@patch('forecasting.inference._load_user_settings', return_value={})
+@patch('forecasting.inference._latest_model_version', return_value="shap-1")
+@patch('forecasting.inference.get_latest_location_from_db', return_value=(34.05, -118.25))
+@patch('forecasting.inference.get_recent_history')
+@patch('forecasting.inference.load_models')
+def test_weekly_forecast_with_explanations(mock_load, mock_history, mock_loc, mock_version, mock_settings, tmp_path):
+    start = datetime(2025, 6, 1)
+    features = ['tavg', 'pres_change', 'Pain_Lag_1', 'DayOfWeek']
+    rng = np.random.default_rng(1)
+    X = pd.DataFrame({
+        'tavg': rng.uniform(5, 35, 300), 'pres_change': rng.normal(0, 4, 300),
+        'Pain_Lag_1': rng.integers(0, 10, 300).astype(float), 'DayOfWeek': rng.integers(0, 7, 300).astype(float),
+    })
+    y = ((X['tavg'] > 28) | (X['pres_change'] < -3)).astype(int)
+    clf = CompiledEnsemble(export_compiled_ensemble(
+        HistGradientBoostingClassifier(max_depth=5, max_iter=50, random_state=0).fit(X[features], y)))
+    reg = CompiledEnsemble(export_compiled_ensemble(
+        HistGradientBoostingRegressor(max_depth=5, max_iter=50, random_state=0).fit(X[features], np.log1p(X['Pain_Lag_1']))))
+    mock_load.return_value = (clf, reg)
+    mock_history.return_value = pd.DataFrame({'Date': pd.to_datetime(['2025-05-31']), 'Pain Level': [6]})
+
+    weather_map = {
+        (start + timedelta(days=i)).strftime("%Y-%m-%d"): {
+            'tavg': 20 + 3 * i, 'tmin': 15, 'tmax': 30, 'prcp': 0, 'wspd': 5, 'pres': 1012,
+            'tsun': 10, 'average_humidity': 50, 'pres_change': -1.0 * i, 'midday_humidity': 50,
+            'Latitude': 34.05, 'Longitude': -118.25,
+        } for i in range(7)
+    }
+    db_path = str(tmp_path / "shap.db")
+    plain = inference.get_weekly_forecast(start, db_path=db_path, weather_map=weather_map)
+    explained = inference.get_weekly_forecast(start, db_path=db_path, weather_map=weather_map, explain=True)
+
+    assert all('explanation' not in day for day in plain)
+    for plain_day, day in zip(plain, explained):
+        assert day['risk_probability'] == plain_day['risk_probability']
+        e = day['explanation']
+        assert set(e['contributions']) == set(features)
+        prob = 1 / (1 + math.exp(-(e['base_value'] + sum(e['contributions'].values()))))
+        assert abs(prob * 100 - day['risk_probability']) < 0.1
@@ -0,0 +1,107 @@
+"""
+Tests for the hourly-derived daily weather features (Issues #54, #55, #57, #58).
+"""
+import datetime
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from forecasting import data_loader
+from services import weather_features
+from services.weather_service import WeatherService
+
+
+def _response(start, days, temp, pres, humidity=60.0):
+    hours = pd.date_range(start, periods=days * 24, freq='h')
+    n = len(hours)
+
+    def series(value):
+        return list(value(np.arange(n))) if callable(value) else [value] * n
+
+    return {
+        'hourly': {
+            'time': [h.strftime('%Y-%m-%dT%H:%M') for h in hours],
+            'temperature_2m': series(temp),
+            'relative_humidity_2m': series(humidity),
+            'surface_pressure': series(pres),
+            'precipitation': [0.1] * n,
+            'wind_speed_10m': [4.0] * n,
+        },
+        'daily': {},
+    }
+
+
+def test_pressure_crash_is_detected_across_midnight():
+    # Steady 1015 hPa, then a 6 hPa fall from 21:00 on day 1 to 01:00 on day 2
+    def pres(i):
+        return np.where(i < 22, 1015.0, np.maximum(1015.0 - 1.5 * (i - 21), 1009.0))
+
+    parsed = WeatherService.parse_range(_response("2025-03-01", 3, 10.0, pres), datetime.date(2025, 3, 1), 3, 1.0, 2.0)
+
+    assert parsed['2025-03-01']['pres_drop_6h'] == pytest.approx(3.0)
+    assert parsed['2025-03-01']['pres_crash'] == 0.0
+    assert parsed['2025-03-02']['pres_drop_6h'] == pytest.approx(6.0)
+    assert parsed['2025-03-02']['pres_crash'] == 1.0
+    assert parsed['2025-03-03']['pres_drop_6h'] == 0.0
+
+
+def test_instability_and_shape_features():
+    temp = lambda i: 10.0 + (i % 24) ** 2 / 20.0  # Skewed daily curve
+    parsed = weather_features.daily_features(_response("2025-03-01", 2, temp, 1010.0), ['2025-03-01', '2025-03-02'])
+    hours = np.array([temp(h) for h in range(24)])
+    centred = hours - hours.mean()
+
+    day = parsed['2025-03-02']
+    assert day['tavg'] == pytest.approx(hours.mean())
+    assert day['temp_hourly_std'] == pytest.approx(hours.std())
+    assert day['temp_hourly_skew'] == pytest.approx(np.mean(centred ** 3) / hours.std() ** 3)
+    assert day['temp_hourly_kurtosis'] == pytest.approx(np.mean(centred ** 4) / hours.std() ** 4 - 3)
+    # Flat pressure has no shape
+    assert day['pres_hourly_skew'] == 0.0 and day['pres_change'] == 0.0
+
+
+def test_dew_point_and_wet_bulb_reference_values():
+    assert weather_features.dew_point(20.0, 50.0) == pytest.approx(9.3, abs=0.05)
+    assert weather_features.dew_point(25.0, 100.0) == pytest.approx(25.0)
+    # Stull (2011): 20 C at 50% RH -> 13.7 C
+    assert weather_features.wet_bulb(20.0, 50.0) == pytest.approx(13.7, abs=0.05)
+
+    day = weather_features.daily_features(_response("2025-07-01", 1, lambda i: 15.0 + i / 4, 1010.0, 50.0), ['2025-07-01'])
+    assert day['2025-07-01']['max_dew_point'] == pytest.approx(float(weather_features.dew_point(15.0 + 23 / 4, 50.0)))
+
+
+def test_partial_and_missing_days():
+    data = _response("2025-03-01", 2, 12.0, 1012.0)
+    for name in ('time', 'temperature_2m', 'relative_humidity_2m', 'surface_pressure', 'precipitation', 'wind_speed_10m'):
+        data['hourly'][name] = data['hourly'][name][:30]  # Day 2 ends at 05:00
+    data['hourly']['temperature_2m'][26] = None
+
+    parsed = weather_features.daily_features(data, ['2025-02-28', '2025-03-01', '2025-03-02'])
+
+    assert set(parsed) == {'2025-03-01', '2025-03-02'}
+    assert parsed['2025-03-02']['tavg'] == 12.0
+    assert parsed['2025-03-02']['midday_humidity'] == 60.0  # No 12:00 reading: the day's mean
+
+
+def test_weather_history_feeds_training(tmp_path):
+    weather_file = str(tmp_path / "weather.csv")
+    start = datetime.date(2025, 3, 1)
+    response = _response("2025-02-28", 41, lambda i: 10.0 + (i % 24) / 4, lambda i: 1010.0 + (i % 48) / 8)
+    fetched = WeatherService.parse_range(response, start, 40, 34.0, -118.0)
+
+    with patch('services.weather_service.WeatherService.fetch_archive', return_value=fetched) as mock_fetch:
+        assert data_loader.update_weather_history(34.0, -118.0, start, start + datetime.timedelta(days=39), weather_file) == 40
+    mock_fetch.assert_called_once()
+
+    history = data_loader.load_weather_data(weather_file)
+    assert list(history['date'][:2]) == ['2025-03-01', '2025-03-02']
+    assert 'Latitude' not in history.columns
+
+    log = pd.DataFrame({'Date': ['2025-03-05'], 'Time': ['08:00'], 'Pain Level': [5], 'Sleep': [2], 'Physical Activity': [1]})
+    training = data_loader.process_combined_data(input_df=data_loader.combine_daily(log, history))
+    row = training.iloc[0]
+    expected = fetched[row['Date'].strftime('%Y-%m-%d')]
+    for name in weather_features.HOURLY_FEATURES:
+        assert row[name] == pytest.approx(expected[name]), name
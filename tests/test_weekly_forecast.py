@@ -0,0 +1,101 @@
+"""
+Tests for the single-pass (batched) weekly forecast.
+"""
+from datetime import datetime, timedelta
+from unittest.mock import patch, MagicMock
+
+import numpy as np
+import pandas as pd
+
+from forecasting import inference
+
+
+def _weather_map(start):
+    weather = {}
+    for i in range(7):
+        d = (start + timedelta(days=i)).strftime("%Y-%m-%d")
+        weather[d] = {
+            'tavg': 25 + i, 'tmin': 20 + i, 'tmax': 30 + i, 'prcp': 0, 'wspd': 5,
+            'pres': 1015, 'tsun': 10, 'average_humidity': 50,
+            'pres_change': 0, 'midday_humidity': 50,
+            'Latitude': 34.05, 'Longitude': -118.25
+        }
+    return weather
+
+
+@patch('forecasting.inference._load_user_settings', return_value={})
+@patch('forecasting.inference._latest_model_version', return_value="1")
+@patch('forecasting.inference.WeatherService.fetch_weekly')
+@patch('forecasting.inference.get_latest_location_from_db', return_value=(34.05, -118.25))
+@patch('forecasting.inference.get_recent_history')
+@patch('forecasting.inference.load_models')
+def test_weekly_forecast_scores_in_one_batch(mock_load, mock_history, mock_loc, mock_weather, mock_version, mock_settings, tmp_path):
+    inference.clear_prediction_cache()
+    start = datetime(2025, 6, 1)
+    mock_weather.return_value = _weather_map(start)
+    mock_history.return_value = pd.DataFrame({
+        'Date': pd.to_datetime(['2025-05-30', '2025-05-31']),
+        'Pain Level': [0, 6]
+    })
+
+    clf = MagicMock()
+    clf.feature_names_in_ = np.array(['tavg', 'Pain_Lag_1', 'DayOfWeek'])
+    clf.predict_proba.side_effect = lambda X: np.column_stack([1 - X['tavg'] / 100, X['tavg'] / 100])
+    reg = MagicMock()
+    reg.predict.side_effect = lambda X: np.log1p(X['Pain_Lag_1'].to_numpy(dtype=float))
+    mock_load.return_value = (clf, reg)
+
+    db = str(tmp_path / "weekly.db")
+    result = inference.get_weekly_forecast(start, db_path=db)
+
+    assert len(result) == 7
+    assert clf.predict_proba.call_count == 1
+    assert reg.predict.call_count == 1
+    assert len(clf.predict_proba.call_args[0][0]) == 7
+    # Day 0: tavg 25 -> 25%
+    assert result[0]['risk_probability'] == 25.0
+    assert result[6]['risk_probability'] == 31.0
+    # Pain_Lag_1 is only non-zero for the first forecast day (yesterday was a 6)
+    assert result[0]['predicted_pain'] == 6.0
+    assert result[1]['predicted_pain'] == 0.0
+
+    # A second call is served entirely from the prediction cache
+    inference.get_weekly_forecast(start, db_path=db)
+    assert clf.predict_proba.call_count == 1
+    inference.clear_prediction_cache()
+
+
+@patch('forecasting.inference._load_user_settings', return_value={})
+@patch('forecasting.inference._latest_model_version', return_value="1")
+@patch('forecasting.inference.WeatherService.fetch_forecast')
+@patch('forecasting.inference.WeatherService.fetch_weekly')
+@patch('forecasting.inference.get_latest_location_from_db', return_value=(34.05, -118.25))
+@patch('forecasting.inference.get_recent_history')
+@patch('forecasting.inference.load_models')
+def test_days_missing_from_the_weekly_fetch_use_live_weather(mock_load, mock_history, mock_loc, mock_weekly, mock_forecast,
+                                                            mock_version, mock_settings, tmp_path):
+    inference.clear_prediction_cache()
+    start = datetime(2025, 6, 1)
+    weather = _weather_map(start)
+    missing = (start + timedelta(days=3)).strftime("%Y-%m-%d")
+    live = weather.pop(missing)
+    mock_weekly.return_value = weather
+    mock_forecast.side_effect = lambda lat, lon, day: dict(live, tavg=60, tmin=55, tmax=65)
+    mock_history.return_value = pd.DataFrame({'Date': pd.to_datetime(['2025-05-31']), 'Pain Level': [0]})
+
+    clf = MagicMock()
+    clf.feature_names_in_ = np.array(['tavg', 'Pain_Lag_1'])
+    clf.predict_proba.side_effect = lambda X: np.column_stack([1 - X['tavg'] / 100, X['tavg'] / 100])
+    reg = MagicMock()
+    reg.predict.side_effect = lambda X: np.zeros(len(X))
+    mock_load.return_value = (clf, reg)
+
+    db = str(tmp_path / "weekly.db")
+    result = inference.get_weekly_forecast(start, db_path=db)
+
+    assert mock_forecast.call_count == 1
+    assert result[3]['risk_probability'] == 60.0
+    # Cached as that day's live prediction, scored with its live weather
+    context = inference.get_prediction_context(db)
+    assert inference.get_cached_prediction(missing, context)['probability'] == 60.0
+    inference.clear_prediction_cache()